@@ -1,24 +1,207 @@
 # stdlib
-import __main__
 import os
 import sys
-import time
+import stat
 import logging
 import datetime
 import subprocess
-import threading  # noqa: F401
-from typing import Any, List, Optional  # noqa: F401
+import threading
+from typing import IO, Any, Dict, List, Optional, Tuple  # noqa: F401
 
 # third party
 
 # app
 import constants
+import input_output
+import report
+import results
 import system
 from stdlib import abspath
+from watchdog import hosting_disk
 
 SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
 
 
+async def wait_event(event, interval=0.25):
+    # type: (threading.Event, float) -> None
+    # threading.Events get set from other threads (S.M.A.R.T. watchdog, ctrl + c), so poll them
+    import asyncio
+    while not event.is_set():
+        await asyncio.sleep(interval)
+
+
+async def worker_kill(process):
+    # type: (asyncio.subprocess.Process) -> int
+    import asyncio
+    if process.returncode is None:
+        if sys.platform == 'win32':
+            # takes the whole tree, the worker may have its own telemetry children
+            taskkill = await asyncio.create_subprocess_exec('taskkill', '/pid', str(process.pid), '/f', '/t')
+            await taskkill.wait()
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+    return await process.wait()
+
+
+async def worker_run(key, cmd, log_filepath, aggregate, timeout=-1, drive_stop_event=None, stop_event=None):
+    # type: (str, List[str], str, report.Aggregate, float|int, Optional[threading.Event], Optional[threading.Event]) -> int  # noqa: E501
+    '''
+    Description:
+        run one worker to completion, its logs go to log_filepath, its progress reports into aggregate
+        killed early on timeout, on drive_stop_event (S.M.A.R.T. watchdog) or stop_event, or if cancelled
+
+    Returns:
+        int
+            exit code
+    '''
+    import asyncio
+    with open(log_filepath, 'wb') as log:
+        process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, limit=constants.MB)
+        logging.debug('drive %s pid %s', key, process.pid)
+
+        def on_report(key, message):
+            # type: (str, dict) -> None
+            aggregate.update(key, message)
+            if message['kind'] == 'error':
+                logging.error('drive %s: %s', key, message.get('message', ''))
+            elif message['kind'] == 'step':
+                logging.info('drive %s: starting %s', key, message.get('step', ''))
+
+        relay = asyncio.create_task(report.relay(key, process.stdout, log, on_report))
+        waits = {asyncio.create_task(process.wait()): ''}
+        if drive_stop_event is not None:
+            waits[asyncio.create_task(wait_event(drive_stop_event))] = 'failed its S.M.A.R.T. watchdog'
+        if stop_event is not None:
+            waits[asyncio.create_task(wait_event(stop_event))] = 'stopped'
+        try:
+            done, _ = await asyncio.wait(waits, timeout=timeout if timeout > 0 else None, return_when='FIRST_COMPLETED')
+            reasons = [waits[task] for task in done if waits[task]]
+            if not done:
+                reasons = [f'timed out after {timeout} sec']
+            if reasons and process.returncode is None:
+                logging.error('drive %s %s, killing it!', key, reasons[0])
+        finally:
+            for task in waits:
+                task.cancel()
+            exit_code = await worker_kill(process)
+            try:
+                await relay
+            except Exception:
+                # only this drive's log suffers, not the whole run
+                logging.error('drive %s: unable to relay its output to "%s"', key, log_filepath, exc_info=True)
+
+    row = aggregate.finish(key, exit_code)
+    log_ = logging.info if exit_code == 0 else logging.error
+    log_('drive %s %s after %0.0f sec', key, row['state'], row['updated'] - aggregate.started)
+    return exit_code
+
+
+async def orchestrate(workers, poll=150.0, timeout=-1, drive_stop_events=None, stop_event=None):
+    # type: (Dict[str, Tuple[List[str], str]], float|int, float|int, Optional[Dict[str, threading.Event]], Optional[threading.Event]) -> Dict[str, int]  # noqa: E501
+    '''
+    Description:
+        run every worker at once and await them, a table of everyones progress every poll seconds
+
+    Arguments:
+        workers: Dict[str, Tuple[List[str], str]]
+            key (drive) to (cmd, log_filepath)
+        timeout: float|int
+            default -1, else each worker gets killed after this many seconds
+        drive_stop_events: Optional[Dict[str, threading.Event]]
+            key to the event that kills just that worker (see watchdog.SmartWatchdog), workers without one dont
+
+    Returns:
+        Dict[str, int]
+            key to exit code, -1 if it never finished
+    '''
+    import asyncio
+    aggregate = report.Aggregate(list(workers))
+    exit_codes = {key: -1 for key in workers}
+    drive_stop_events = drive_stop_events or {}
+
+    async def run(key, cmd, log_filepath):
+        exit_codes[key] = await worker_run(
+            key,
+            cmd,
+            log_filepath,
+            aggregate,
+            timeout=timeout,
+            drive_stop_event=drive_stop_events.get(key, None),
+            stop_event=stop_event,
+        )
+        logging.info('%s', aggregate.table())
+
+    async def tables():
+        while True:
+            await asyncio.sleep(poll)
+            logging.info('%s', aggregate.table())
+
+    table_task = asyncio.create_task(tables())
+    try:
+        await asyncio.gather(*(run(key, cmd, log_filepath) for key, (cmd, log_filepath) in workers.items()))
+    finally:
+        table_task.cancel()
+    return exit_codes
+
+
+async def drive_cleanup(data_filepath, in_place=False, drive_letter=''):
+    # type: (str, bool, str) -> None
+    import asyncio
+    if not in_place and os.path.isfile(data_filepath):
+        try:
+            await asyncio.to_thread(os.remove, data_filepath)
+        except Exception:
+            logging.error('unable to delete "%s"', data_filepath, exc_info=True)
+    if drive_letter:
+        try:
+            await asyncio.to_thread(system.delete_partitions, include_partitions=[drive_letter])
+        except Exception:
+            logging.error('unable to remove partition %s', drive_letter, exc_info=True)
+
+
+async def cleanup(drives):
+    # type: (List[Tuple[str, bool, str]]) -> None
+    '''
+    Description:
+        every drive at once, (data_filepath, in_place, drive_letter): remove the file, then the partition if any
+    '''
+    import asyncio
+    await asyncio.gather(*(drive_cleanup(*drive) for drive in drives))
+
+
+def target_to_data_filepath(target, key, operation='health'):
+    # type: (str, str, str) -> Tuple[str, bool]
+    '''
+    Description:
+        where the i/o goes for a health target, and whether its written in place
+        >>> target_to_data_filepath('/mnt/d', '0')  # ('/mnt/d/0-health.dat', False)
+        >>> target_to_data_filepath('/dev/sdb', '1')  # ('/dev/sdb', True)
+        >>> target_to_data_filepath('/tmp/disk.img', '2')  # ('/tmp/disk.img', True)
+    '''
+    if os.path.isdir(target):
+        return abspath(target, f'{key}-{operation}.dat'), False
+    if os.path.exists(target) and (stat.S_ISBLK(os.stat(target).st_mode) or os.path.isfile(target)):
+        return os.path.abspath(target), True
+    raise ValueError(f'target {target!r} is not a directory, block device or file image!')
+
+
+def target_stop_key(cdi, data_filepath):
+    # type: (Dict[str, dict], str) -> str
+    '''
+    Description:
+        what watchdog.SmartWatchdog knows the drive hosting data_filepath by, its serial, else its disk number,
+            '' if no drive in cdi hosts it (block devices, no S.M.A.R.T.)
+        >>> target_stop_key({'1': {'Drive Letter': '/mnt/a', 'Serial Number': 'S6B0'}}, '/mnt/a/0-health.dat')  # 'S6B0'
+    '''
+    disk_number = hosting_disk(cdi, data_filepath)
+    if not disk_number:
+        return ''
+    serial = str(cdi[disk_number].get('Serial Number', '') or '')
+    return disk_number if serial in ('', '???') else serial
+
+
 def health(
     # delete
     ignore_partitions=constants.IGNORE_PARTITIONS,
@@ -33,12 +216,19 @@ def health(
     chunk_size=constants.CHUNK_SIZE,
     # general/telemetry
     poll=150.0,
+    worker_report_every=5.0,
+    worker_timeout=-1,
+    pin_workers=constants.PIN_WORKERS,
+    targets=constants.TARGETS,
     log_level=constants.LOG_LEVEL,
     log_every=64 * constants.GB,
+    no_telemetry=constants.NO_TELEMETRY,
+    no_admin=constants.NO_ADMIN,
+    no_crystaldiskinfo=constants.NO_CRYSTALDISKINFO,
     stop_event=constants.STOP_EVENT,
     **kwargs
 ):
-    # type: (List[str], Optional[List[str]], int, int, int, float|int, int, float|int, str, int, threading.Event, Any) -> None  # noqa: E501
+    # type: (List[str], Optional[List[str]], int, int, int, float|int, int, float|int, float|int, float|int, bool, List[str], str, int, bool, bool, bool, threading.Event, Any) -> Dict[str, int]  # noqa: E501
     '''
     Description:
         Launch a pre-determined flow upon every relevant disk. WARNING: DO NOT RUN IN A HIGHLY POPULATED PC!
@@ -63,47 +253,70 @@ def health(
                 say the byte_array length 32, data_filepath length 64, chunk_size 4
                 we will generate 64 / 4 = 16 "windows" to jump around and compare
         poll: float|int
-            interval between sampling
+            interval between progress tables, completion and failure are reported as they happen regardless
+        worker_report_every: float|int
+            default 5 sec, how often every worker reports its progress (bytes, throughput, latency, step, errors)
+        worker_timeout: float|int
+            default -1, else kill any drive's worker still going after this many seconds
+        pin_workers: bool
+            default False, workers float, else each gets its own cores (hyperthread siblings kept together)
+        targets: List[str]
+            default [], repartition every disk (admin), else run on these instead, no admin or partitions:
+                directories get a data file, file images and block devices are written over in place
         log_every: int
             default 1GB, log a progress report every X bytes
+        no_telemetry: bool
+            default False, else theres no S.M.A.R.T. to tell which drive hosts each target, so no per drive stop
+        no_admin: bool
+            same as no_telemetry for targets
+        no_crystaldiskinfo: bool
+            same as no_telemetry for targets
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
 
     Returns:
-        None
+        Dict[str, int]
+            drive (disk number, or position in targets) to its worker's exit code, -1 if it never finished
     '''
+    import asyncio
     operation = 'health'
-
-    if system.admin_detect() != 0:
-        raise RuntimeError('Must be run as administrator or sudo!')
-
-    logging.info('deleting partitions...')
-    _ = system.delete_partitions(ignore_partitions=ignore_partitions, include_partitions=include_partitions)
-
-    disk_number_to_letter_dict = system.read_disks(
-        ignore_partitions=ignore_partitions, include_partitions=include_partitions
-    )
-    disk_numbers = list(disk_number_to_letter_dict)
-    logging.info('discovered disks %s...', disk_numbers)
-
-    logging.info('creating partitions...')
-    disk_number_to_letter_dict = system.create_partitions(disk_numbers=disk_numbers)
-    if disk_numbers and (len(disk_numbers) != len(disk_number_to_letter_dict)):
-        raise RuntimeError(
-            f'Number of disks != number of partitions created! '
-            f'{len(disk_numbers)} != {len(disk_number_to_letter_dict)} | {disk_number_to_letter_dict}'
+    # key: (data_filepath, in_place, drive_letter to remove the partition of)
+    drives = {}  # type: Dict[str, Tuple[str, bool, str]]
+    # key: what the S.M.A.R.T. watchdog knows its drive by, see watchdog.SmartWatchdog.stop
+    stop_keys = {}  # type: Dict[str, str]
+    if targets:
+        for t, target in enumerate(targets):
+            data_filepath, in_place = target_to_data_filepath(target, str(t), operation=operation)
+            drives[str(t)] = (data_filepath, in_place, '')
+        logging.info('flowing on %d targets without touching partitions...', len(drives))
+        smart_polled = not (no_telemetry or no_admin or no_crystaldiskinfo)
+        cdi = results.latest(wait=constants.TARGET_SMART_WAIT) if smart_polled else {}
+        for key, (data_filepath, _, _) in drives.items():
+            stop_key = target_stop_key(cdi, data_filepath)
+            if stop_key:
+                stop_keys[key] = stop_key
+            elif smart_polled:
+                logging.warning(
+                    'no S.M.A.R.T. drive hosts target %s ("%s"), the watchdog cant stop it alone', key, data_filepath
+                )
+    else:
+        drives = health_partitions(
+            ignore_partitions=ignore_partitions, include_partitions=include_partitions, operation=operation
         )
+        stop_keys = {key: key for key in drives}
 
-    popens = []
-    logging.info('flowing on %d partitions/drives...', len(disk_number_to_letter_dict))
+    workers = {}  # type: Dict[str, Tuple[List[str], str]]
     started = datetime.datetime.now()
     output_dirpath = constants.TEMP_DIRPATH
-    for drive_number, drive_letter in disk_number_to_letter_dict.items():
-        data_filepath = abspath(f'{drive_letter}:/{drive_number}-{operation}.dat')
-        stdout = abspath(f'{output_dirpath}/{drive_number}-{operation}.stdout')
+    os.makedirs(output_dirpath, exist_ok=True)
+    cpu_sets = system.cpu_sets(len(drives)) if pin_workers else []
+    # one copy of the pattern in memory that every worker attaches to, rather than one each
+    pattern = input_output.pattern_share(size=size, value=value, stop_event=stop_event) if size > 0 else None
+    for d, (key, (data_filepath, in_place, _)) in enumerate(drives.items()):
+        stdout = abspath(f'{output_dirpath}/{key}-{operation}.stdout')
         cmd = [
             sys.executable,
-            __main__.__file__,
+            os.path.join(SCRIPT_DIRPATH, 'main.py'),
             # flow control
             'flow',
             '--steps',
@@ -134,49 +347,88 @@ def health(
             cmd += ['--value', value]
         if chunk_size != constants.CHUNK_SIZE:
             cmd += ['--chunk-size', chunk_size]
+        if worker_report_every > 0:
+            cmd += ['--report-every', worker_report_every]
+        if in_place:
+            cmd += ['--in-place']
+        if cpu_sets:
+            cmd += ['--cpus'] + cpu_sets[d]
+        if pattern:
+            cmd += ['--pattern-name', pattern.name]
 
         cmd_strs = [str(ele) for ele in cmd]
-        logging.debug('drive %s (%s): %s', drive_number, drive_letter, subprocess.list2cmdline(cmd_strs))
-        with open(stdout, 'wb') as sout:
-            popen = subprocess.Popen(cmd_strs, stdout=sout)
-            popens.append(popen)
-    exit_codes = [-1] * len(popens)
-    # pids = [popen.pid for popen in popens]
+        logging.debug('drive %s (%s): %s', key, data_filepath, subprocess.list2cmdline(cmd_strs))
+        workers[key] = (cmd_strs, stdout)
 
+    # the S.M.A.R.T. watchdog (see watchdog.SmartWatchdog) sets these if the drive goes bad
+    drive_stop_events = {
+        key: constants.DRIVE_STOP_EVENTS.setdefault(stop_key, threading.Event())
+        for key, stop_key in stop_keys.items()
+    }
+    exit_codes = {key: -1 for key in workers}
     try:
-        while True:
-            now = datetime.datetime.now()
-            logging.info('elapsed: %s', now - started)
-            for p, popen in enumerate(popens):
-                exit_code = popen.poll()
-                if isinstance(exit_code, int):
-                    exit_codes[p] = exit_code
-
-            if all([ele != -1 for ele in exit_codes]):
-                logging.info('All %r finished!', operation)
-                break
-            time.sleep(poll)
+        exit_codes = asyncio.run(
+            orchestrate(
+                workers,
+                poll=poll,
+                timeout=worker_timeout,
+                drive_stop_events=drive_stop_events,
+                stop_event=stop_event,
+            )
+        )
+        logging.info('All %r finished after %s!', operation, datetime.datetime.now() - started)
     except KeyboardInterrupt:
+        # asyncio.run already cancelled every worker, which kills its process on the way out
         logging.warning('ctrl + c detected! killing processes, removing resources...')
         logging.debug('ctrl + c detected! killing processes, removing resources...', exc_info=True)
 
     stop_event.set()
-    for popen in popens:
-        if popen.poll() is None:
-            popen.kill()
-            subprocess.Popen(['taskkill', '/pid', str(popen.pid), '/f', '/t'], shell=True).wait()
-    for drive_number, drive_letter in disk_number_to_letter_dict.items():
-        data_filepath = abspath(f'{drive_letter}:/{drive_number}-{operation}.dat')
-        if os.path.isfile(data_filepath):
-            try:
-                os.remove(data_filepath)
-            except Exception:
-                logging.error('unable to delete ""%s', data_filepath, exc_info=True)
+    for stop_key in stop_keys.values():
+        constants.DRIVE_STOP_EVENTS.pop(stop_key, None)
 
-    logging.info('removing partitions...')
-    system.delete_partitions(include_partitions=list(disk_number_to_letter_dict.values()))
+    logging.info('removing files and partitions...')
+    asyncio.run(cleanup(list(drives.values())))
+    if pattern:
+        input_output.pattern_unshare(pattern.name)
 
     logging.info('closing resources...')
-    failures = [exit_code != 0 for exit_code in exit_codes]
+    failures = {key: exit_code for key, exit_code in exit_codes.items() if exit_code != 0}
     if failures:
-        logging.error('Failed! %d / %d processes failed with exit codes: %s!', len(failures), len(popens), failures)
+        logging.error('Failed! %d / %d processes failed with exit codes: %s!', len(failures), len(workers), failures)
+    return exit_codes
+
+
+def health_partitions(ignore_partitions=constants.IGNORE_PARTITIONS, include_partitions=None, operation='health'):
+    # type: (List[str], Optional[List[str]], str) -> Dict[str, Tuple[str, bool, str]]
+    '''
+    Description:
+        the classic health setup: wipe every partition that isnt ignored and give every raw disk a fresh one
+
+    Returns:
+        Dict[str, Tuple[str, bool, str]]
+            disk number to (data_filepath, in_place, drive_letter)
+    '''
+    if system.admin_detect() != 0:
+        raise RuntimeError('Must be run as administrator or sudo!')
+
+    logging.info('deleting partitions...')
+    _ = system.delete_partitions(ignore_partitions=ignore_partitions, include_partitions=include_partitions)
+
+    disk_number_to_letter_dict = system.read_disks(
+        ignore_partitions=ignore_partitions, include_partitions=include_partitions
+    )
+    disk_numbers = list(disk_number_to_letter_dict)
+    logging.info('discovered disks %s...', disk_numbers)
+
+    logging.info('creating partitions...')
+    disk_number_to_letter_dict = system.create_partitions(disk_numbers=disk_numbers)
+    if disk_numbers and (len(disk_numbers) != len(disk_number_to_letter_dict)):
+        raise RuntimeError(
+            f'Number of disks != number of partitions created! '
+            f'{len(disk_numbers)} != {len(disk_number_to_letter_dict)} | {disk_number_to_letter_dict}'
+        )
+
+    return {
+        str(drive_number): (abspath(f'{drive_letter}:/{drive_number}-{operation}.dat'), False, drive_letter)
+        for drive_number, drive_letter in disk_number_to_letter_dict.items()
+    }
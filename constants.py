@@ -5,7 +5,7 @@ import logging
 import datetime
 import threading
 import multiprocessing
-from typing import List  # noqa: F401
+from typing import Dict, List  # noqa: F401
 
 APP_NAME = 'chriscarl.tools.analyze-disk-performance'
 NOW = datetime.datetime.now()
@@ -17,6 +17,9 @@ DATA_FILEPATH = os.path.join(TEMP_DIRPATH, 'data.dat')
 PERF_FILEPATH = os.path.join(TEMP_DIRPATH, 'performance.csv')
 SUMMARY_FILEPATH = os.path.join(TEMP_DIRPATH, 'summary.csv')
 SMART_FILEPATH = os.path.join(TEMP_DIRPATH, 'smart.csv')
+INCIDENT_FILEPATH = os.path.join(TEMP_DIRPATH, 'incidents.jsonl')
+# memory backed, so i/o here measures the tool rather than a drive, see microbench
+TMPFS_DIRPATH = '/dev/shm' if os.path.isdir('/dev/shm') else TEMP_DIRPATH
 
 KB = 1024**1
 MB = 1024**2
@@ -38,8 +41,20 @@ ALL_DRIVES = False
 NO_TELEMETRY = False
 NO_ADMIN = False
 NO_DELETE = False
+IN_PLACE = False
+# name of a shared memory pattern to attach to rather than making one, see input_output.pattern_share
+PATTERN_NAME = ''
 # by default none, its too dangerous to set a partition to create without information
 DISK_NUMBERS = []  # type: List[str|int]
+# by default none, health repartitions every disk it finds
+TARGETS = []  # type: List[str]
+# by default none, flow runs against data_filepath alone
+FLOW_TARGETS = []  # type: List[str]
+FLOW_REPORT_EVERY = 10.0
+# see flow.flow_stats, modified z-score past which an iteration is an outlier (-1 to keep them all), and how wide
+# the 95% confidence interval can be, as a fraction of the mean, before there werent enough iterations to trust it
+FLOW_OUTLIERS = 3.5
+FLOW_CI_MAX = 0.05
 # DEFAULTS = {
 #     'VALUE': VALUE,
 #     'DURATION': DURATION,
@@ -63,6 +78,16 @@ LOG_FORMAT = '%(asctime)s - %(levelname)10s - %(funcName)48s - %(message)s'
 
 LOG_EVERY = 1 * GB
 
+# telemetry store, see store.TelemetryStore
+STORE_FLUSH_ROWS = 64
+STORE_FLUSH_INTERVAL = 60.0
+STORE_SEGMENT_ROWS = 100000
+# raw samples for the last hour, then 1 minute buckets for a day, then 1 hour buckets forever
+ROLLUP_RAW_RETENTION = 3600
+ROLLUP_TIERS = [(60, 24 * 3600), (3600, -1)]
+ROLLUP_PRUNE_INTERVAL = 60
+ROLLUP_IGNORE_KEYS = ['datetime', 'Disk Number']
+
 CRYSTALDISKINFO_EXE = 'DiskInfo64.exe' if sys.platform == 'win32' else 'DiskInfo64'
 CRYSTALDISKINFO_TXT = ''
 CRYSTAL_ERROR_KEYS = [
@@ -71,11 +96,13 @@ CRYSTAL_ERROR_KEYS = [
     'Uncorrectable Error Count',
     # intel
     'Media and Data Integrity Errors',
-    'Number of Error Information Log Entries'
+    'Number of Error Information Log Entries',
     # sandisk
     'End-to-End Error Detection/Correction Count',
     'Reported Uncorrectable Errors',
 ]
+# errors that count entries in the drive's error log rather than errors on the media
+CRYSTAL_LOG_KEYS = ['Number of Error Information Log Entries']
 CRYSTAL_KEYS = [
     'Health Status',
     'Disk Number',
@@ -87,6 +114,38 @@ CRYSTAL_KEYS = [
     'Host Reads',
     'Host Writes',
 ] + CRYSTAL_ERROR_KEYS
+SMARTCTL_EXE = 'smartctl.exe' if sys.platform == 'win32' else 'smartctl'
+SMART_SOURCES = ['crystaldiskinfo', 'smartctl']
+SMART_SOURCE = SMART_SOURCES[0] if sys.platform == 'win32' else SMART_SOURCES[1]
+TELEMETRY_MODES = ['process', 'thread']
+TELEMETRY_MODE = TELEMETRY_MODES[0]
+# see watchdog.rule_check, evaluated on every S.M.A.R.T. poll, [] to disable
+SMART_RULES = [
+    # any media/uncorrectable error is one too many
+    dict(
+        name='errors', keys=[key for key in CRYSTAL_ERROR_KEYS if key not in CRYSTAL_LOG_KEYS], delta=1, scope='drive'
+    ),
+    # NVMe logs plenty that isnt the media's fault (unsupported admin commands, the S.M.A.R.T. polls themselves),
+    # only a burst of them during a run means something
+    dict(name='error_log', keys=CRYSTAL_LOG_KEYS, delta=100, scope='drive'),
+    dict(name='health', health=['Caution', 'Bad'], scope='drive'),
+]
+# see watchdog.io_watchdog, a single read/write this slow is a stall, -1 to disable
+STALL_SECONDS = 120.0
+# bytes/sec averaged over FLOOR_WINDOW seconds, -1 to disable
+THROUGHPUT_FLOOR = -1
+FLOOR_WINDOW = 60.0
+STALL_ACTIONS = ['log', 'cancel', 'abort']
+STALL_ACTION = STALL_ACTIONS[0]
+STALL_EXIT_CODE = 3
+IO_WATCHDOG_POLL = 1.0
+# seconds between a worker's progress reports, see report.py, -1 to not report
+REPORT_EVERY = -1
+# logical cpus a process pins itself to (threads inherit), [] to float, see system.cpu_pin
+CPUS = []  # type: List[int]
+# health gives every worker its own set of cores, see system.cpu_sets
+PIN_WORKERS = False
+CPU_TOPOLOGY_DIRPATH = '/sys/devices/system/cpu'
 IGNORE_PARTITIONS = ['A', 'B', 'C']
 
 OPERATIONS = ['perf', 'fill', 'perf+fill', 'loop', 'write', 'perf+write', 'health', 'perf+fill+read', 'smartmon']
@@ -94,6 +153,91 @@ OPERATIONS = ['perf', 'fill', 'perf+fill', 'loop', 'write', 'perf+write', 'healt
 WRITE_MODES = ['burnin', 'fulpak']
 WRITE_MODE = WRITE_MODES[0]
 
+# see timing, clock reads at import to measure the clock's own overhead, and batched repeats anything quicker than
+# TIMING_MIN_BATCH seconds until a batch takes that long
+TIMING_SAMPLES = 1000
+TIMING_MIN_BATCH = 0.01
+TIMING_MAX_CALLS = 1000000
+
+# see input_output.Syncer, what write workloads do to make their data durable before elapsed stops
+SYNCS = ['none', 'end', 'bytes', 'op', 'dsync']
+SYNC = SYNCS[0]
+SYNC_EVERY = 64 * MB
+
+# see workload.io_workload
+RWS = ['read', 'write']
+RW = RWS[0]
+ACCESSES = ['seq', 'rand']
+ACCESS = ACCESSES[0]
+IODEPTH = 1
+NUMJOBS = 1
+ENGINES = ['auto', 'sync', 'psync']
+ENGINE = ENGINES[0]
+# see workload.suite, CrystalDiskMark's defaults: (name, access, chunk_size, iodepth, numjobs)
+SUITE_TESTS = [
+    ('SEQ1M Q8T1', 'seq', MB, 8, 1),
+    ('SEQ1M Q1T1', 'seq', MB, 1, 1),
+    ('RND4K Q32T16', 'rand', 4 * KB, 32, 16),
+    ('RND4K Q1T1', 'rand', 4 * KB, 1, 1),
+]
+SUITE_RUNS = 5
+SUITE_DURATION = 5.0
+SUITE_REST = 5.0
+
+# see filesystem, the trees next to data_filepath, tree_fanout directories per level, tree_depth levels deep
+TREE_DEPTH = 2
+TREE_FANOUT = 16
+SMALLFILES_COUNT = 10000
+SMALLFILES_SIZES = [4 * KB, 16 * KB, 64 * KB]
+METADATA_COUNT = 10000
+
+# see flow.sweep, every cell is appended as its done, pass an existing one to resume
+SWEEP_FILEPATH = os.path.join(TEMP_DIRPATH, 'sweep.csv')
+SWEEP_STEPS = ['io_workload', 'write_burnin', 'write_fulpak', 'read_seq', 'read_rand']
+# by default none, the one --size/--chunk-size/--iodepth/--numjobs
+SWEEP_SIZES = []  # type: List[int]
+SWEEP_CHUNK_SIZES = []  # type: List[int]
+SWEEP_IODEPTHS = []  # type: List[int]
+SWEEP_NUMJOBS = []  # type: List[int]
+
+# see workload.autotune, what it found is kept per target outside of TEMP_DIRPATH so later runs can --tuned
+AUTOTUNE_OBJECTIVES = ['throughput', 'iops']
+AUTOTUNE_OBJECTIVE = AUTOTUNE_OBJECTIVES[0]
+AUTOTUNE_SLO = -1.0  # p99 usec, -1 for none
+AUTOTUNE_TRIAL = 2.0
+AUTOTUNE_PASSES = 3
+AUTOTUNE_CHUNK_SIZES = [4 * KB, 16 * KB, 64 * KB, 256 * KB, MB, 4 * MB]
+AUTOTUNE_IODEPTHS = [1, 2, 4, 8, 16, 32]
+AUTOTUNE_NUMJOBS = [1, 2, 4, 8, 16]
+TUNED = False
+TUNED_FILEPATH = os.path.join(os.path.dirname(TEMP_DIRPATH), 'tuned.json')
+
+# see results, every run's step results in one place, outside of TEMP_DIRPATH so compare can look back across runs
+RESULTS_FILEPATH = os.path.join(os.path.dirname(TEMP_DIRPATH), 'results.sqlite')
+RESULTS_STEPS = [
+    'write_burnin', 'write_fulpak', 'read_seq', 'read_rand', 'io_workload', 'suite', 'autotune', 'smallfiles',
+    'metadata'
+]
+NO_RESULTS = False
+COMPARE_BASELINE = ''  # the median of every earlier run, else a run_id
+COMPARE_THRESHOLD = 0.10
+COMPARE_DEVICES = []  # type: List[str]
+COMPARE_TREND = 5
+
+# see workload.calibrate, the tool's own ceiling, measured where the device costs next to nothing
+CALIBRATION_FILEPATH = os.path.join(os.path.dirname(TEMP_DIRPATH), 'calibration.json')
+CALIBRATE_CHUNK_SIZES = [4 * KB, 64 * KB, MB]
+CALIBRATE_DURATION = 2.0
+CALIBRATE_SIZE = 16 * MB
+# past this fraction of the ceiling a result says more about the tool than the disk
+CALIBRATE_WARN = 0.8
+NULL_FILEPATH = os.devnull
+ZERO_FILEPATH = '/dev/zero' if os.path.exists('/dev/zero') else ''
+
 # arg defaults
 CPU_COUNT = multiprocessing.cpu_count()
 STOP_EVENT = threading.Event()
+# disk number or serial -> event that stops only that drive's workload, see watchdog.SmartWatchdog
+DRIVE_STOP_EVENTS = {}  # type: Dict[str, threading.Event]
+# seconds health waits for the first S.M.A.R.T. poll to tell which drive hosts each of its targets
+TARGET_SMART_WAIT = 60.0
@@ -0,0 +1,450 @@
+'''
+Description:
+    workloads where the filesystem is the point rather than the bytes, lots of small files in a directory tree
+    every phase runs on numjobs threads, each its own slice of the files, and is timed op by op
+
+    smallfiles creates, writes (and syncs), reads back and deletes smallfiles_count files of smallfiles_sizes
+    metadata moves no data at all, mkdir, create, stat, readdir, rename, unlink and rmdir rates of an empty tree
+
+Layout:
+    the tree sits next to data_filepath, data.dat -> data.smallfiles/, tree_depth levels of tree_fanout directories
+    with the files spread over the leaves, ex) depth 2, fanout 16: 256 leaves, data.smallfiles/d03/d11/f00000042
+'''
+# stdlib
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple  # noqa: F401
+
+# app
+import constants as con
+import timing
+from stdlib import bytes_to_size
+from watchdog import IOProgress
+from input_output import create_bytearray, Syncer
+from workload import latency_stats
+
+
+def tree_root(data_filepath, step):
+    # type: (str, str) -> str
+    '''
+    Description:
+        >>> tree_root('/mnt/d/data.dat', 'smallfiles')  # '/mnt/d/data.smallfiles'
+    '''
+    if os.path.exists(data_filepath) and not os.path.isfile(data_filepath):
+        raise ValueError(f'{step} needs a filesystem, data_filepath "{data_filepath}" is not a regular file!')
+    return f'{os.path.splitext(os.path.abspath(data_filepath))[0]}.{step}'
+
+
+def tree_leaves(root, tree_depth=con.TREE_DEPTH, tree_fanout=con.TREE_FANOUT):
+    # type: (str, int, int) -> List[str]
+    '''
+    Description:
+        every leaf directory of the tree, in order, just the root at depth 0
+    '''
+    leaves = [root]
+    for _ in range(tree_depth):
+        leaves = [os.path.join(leaf, f'd{i:02d}') for leaf in leaves for i in range(tree_fanout)]
+    return leaves
+
+
+def tree_levels(root, tree_depth=con.TREE_DEPTH, tree_fanout=con.TREE_FANOUT):
+    # type: (str, int, int) -> List[List[str]]
+    '''
+    Description:
+        every directory under the root, level by level, a level's parents are all in the one before it
+    '''
+    return [tree_leaves(root, tree_depth=depth, tree_fanout=tree_fanout) for depth in range(1, tree_depth + 1)]
+
+
+def tree_remove(root, numjobs=con.NUMJOBS):
+    # type: (str, int) -> None
+    '''
+    Description:
+        remove the tree and whatever is left in it, files then directories deepest first, numjobs at a time
+    '''
+    if not os.path.isdir(root):
+        return
+    levels = {}  # type: Dict[int, List[str]]
+    files = []  # type: List[str]
+    for dirpath, _, filenames in os.walk(root):
+        levels.setdefault(dirpath.count(os.sep), []).append(dirpath)
+        files.extend(os.path.join(dirpath, filename) for filename in filenames)
+    with ThreadPoolExecutor(max_workers=max(numjobs, 1)) as executor:
+        list(executor.map(os.remove, files))
+        for depth in sorted(levels, reverse=True):
+            list(executor.map(os.rmdir, levels[depth]))
+
+
+def phase(name, op, items, target='', numjobs=con.NUMJOBS, stop_event=con.STOP_EVENT):
+    # type: (str, Callable[..., int], List[tuple], str, int, threading.Event) -> Dict[str, Any]
+    '''
+    Description:
+        op(*item) for every item, numjobs threads each taking every numjobs-th one, every op timed on its own
+        ops_per_sec and throughput are over the phase's wall clock, not the sum of the ops, see timing
+
+    Arguments:
+        name: str
+            what the phase is called in the results and in IOProgress, so the io watchdog sees it
+        op: Callable[..., int]
+            does one, returns the bytes it moved, 0 if none
+        items: List[tuple]
+        target: str
+            the tree, its what the phase reports progress against
+        numjobs: int
+        stop_event: threading.Event
+
+    Returns:
+        Dict[str, Any]
+            phase, ops, bytes, elapsed, ops_per_sec, throughput (bytes/s), lat_*_us
+    '''
+    latencies = []  # type: List[List[float]]
+    totals = []  # type: List[int]
+    errors = []  # type: List[BaseException]
+    lock = threading.Lock()
+
+    def run(job):
+        # type: (int) -> None
+        lats = []  # type: List[float]
+        done = 0
+        try:
+            with IOProgress(target or name, key=f'{target}#{name}.{job}') as progress:
+                for index in range(job, len(items), numjobs):
+                    if progress.stopped(stop_event):
+                        break
+                    progress.begin(name, index)
+                    start = timing.ticks()
+                    done += progress.end(op(*items[index]))
+                    lats.append(timing.since(start))
+        except BaseException as be:
+            errors.append(be)
+        finally:
+            with lock:
+                latencies.append(lats)
+                totals.append(done)
+
+    start = timing.ticks()
+    with ThreadPoolExecutor(max_workers=numjobs, thread_name_prefix=name) as executor:
+        list(executor.map(run, range(numjobs)))
+    elapsed = timing.since(start)
+    if errors:
+        raise errors[0]
+
+    flat = [lat for lats in latencies for lat in lats]
+    result = dict(
+        phase=name,
+        ops=len(flat),
+        bytes=sum(totals),
+        elapsed=elapsed,
+        ops_per_sec=len(flat) / elapsed if elapsed > 0 else 0.0,
+        throughput=sum(totals) / elapsed if elapsed > 0 else 0.0,
+    )
+    result.update(latency_stats(flat))
+    result['latencies'] = flat
+    return result
+
+
+def phases_merge(name, phases):
+    # type: (str, List[Dict[str, Any]]) -> Dict[str, Any]
+    '''
+    Description:
+        phases that had to run one after the other (tree levels) as the one phase
+    '''
+    latencies = [lat for phase in phases for lat in phase['latencies']]
+    bytes_io = sum(phase['bytes'] for phase in phases)
+    elapsed = sum(phase['elapsed'] for phase in phases)
+    result = dict(
+        phase=name,
+        ops=len(latencies),
+        bytes=bytes_io,
+        elapsed=elapsed,
+        ops_per_sec=len(latencies) / elapsed if elapsed > 0 else 0.0,
+        throughput=bytes_io / elapsed if elapsed > 0 else 0.0,
+    )
+    result.update(latency_stats(latencies))
+    result['latencies'] = latencies
+    return result
+
+
+def phases_result(phases, **config):
+    # type: (List[Dict[str, Any]], Any) -> Dict[str, Any]
+    '''
+    Description:
+        every phase together as one io_workload shaped result, then each phase's own as {phase}_{metric}
+    '''
+    import pandas as pd
+    ops = sum(phase['ops'] for phase in phases)
+    bytes_io = sum(phase['bytes'] for phase in phases)
+    elapsed = sum(phase['elapsed'] for phase in phases)
+    result = dict(config, bytes=bytes_io, ops=ops, elapsed=elapsed)
+    result.update(
+        throughput=bytes_io / elapsed if elapsed > 0 else 0.0,
+        iops=ops / elapsed if elapsed > 0 else 0.0,
+    )
+    result.update(latency_stats([lat for phase in phases for lat in phase.pop('latencies')]))
+    for phase in phases:
+        result.update({f'{phase["phase"]}_{k}': v for k, v in phase.items() if k != 'phase'})
+    df = pd.DataFrame(phases).set_index('phase')
+    df['ops_per_sec'] = df['ops_per_sec'].map(lambda ops_per_sec: f'{ops_per_sec:0.0f}')
+    df['throughput'] = df['throughput'].map(lambda throughput: f'{bytes_to_size(throughput)}/s' if throughput else '')
+    columns = ['ops', 'elapsed', 'ops_per_sec'] + (['throughput'] if bytes_io else [])
+    logging.info(
+        '%s ops in %0.3f sec\n%s', ops, elapsed, df[columns + ['lat_p50_us', 'lat_p99_us', 'lat_max_us']].to_string()
+    )
+    return result
+
+
+def smallfiles(
+    data_filepath=con.DATA_FILEPATH,
+    value=con.VALUE,
+    smallfiles_count=con.SMALLFILES_COUNT,
+    smallfiles_sizes=con.SMALLFILES_SIZES,
+    sync=con.SYNC,
+    sync_every=con.SYNC_EVERY,
+    tree_depth=con.TREE_DEPTH,
+    tree_fanout=con.TREE_FANOUT,
+    numjobs=con.NUMJOBS,
+    no_delete=con.NO_DELETE,
+    stop_event=con.STOP_EVENT,
+    **kwargs
+):
+    # type: (str, int, int, List[int], str, int, int, int, int, bool, threading.Event, Any) -> Dict[str, Any]
+    '''
+    Description:
+        lots of small files rather than one big one, phase by phase, every file before the next phase starts
+            - create: open (exclusive), write, sync as the sync policy says, close
+            - read: open, read it all, close
+            - delete: unlink
+
+    Arguments:
+        data_filepath: str
+            the tree goes next to it, see the module docstring
+        value: int
+            -1 for random, else, [0,255] repeat the same value for all bytes written
+        smallfiles_count: int
+            default 10000, files
+        smallfiles_sizes: List[int]
+            default [4KB, 16KB, 64KB], file sizes, handed out in turn
+        sync: str
+            default none, see input_output.Syncer, a file at a time, end/op sync each one before its closed,
+                bytes every sync_every bytes of it, the time it takes is also reported on its own
+        sync_every: int
+            default 64MB, bytes between syncs when sync is bytes
+        tree_depth: int
+            default 2, levels of directories
+        tree_fanout: int
+            default 16, directories per level
+        numjobs: int
+            default 1, threads per phase
+        no_delete: bool
+            default False, skip the delete phase and leave the tree
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        Dict[str, Any]
+            all the phases together like io_workload, then per phase (create_, read_, delete_) ops, elapsed,
+            ops_per_sec (files/s), throughput and lat_*_us, and sync_elapsed, syncs and sync_lat_*_us
+    '''
+    if smallfiles_count < 1 or not smallfiles_sizes:
+        raise ValueError(f'need files and sizes, provided {smallfiles_count} and {smallfiles_sizes}!')
+    if numjobs < 1:
+        raise ValueError(f'numjobs must be positive, provided {numjobs}!')
+    root = tree_root(data_filepath, 'smallfiles')
+    if os.path.exists(root):
+        raise FileExistsError(f'"{root}" already exists, remove it or point data_filepath elsewhere!')
+    leaves = tree_leaves(root, tree_depth=tree_depth, tree_fanout=tree_fanout)
+    files = [
+        (os.path.join(leaves[i % len(leaves)], f'f{i:08d}'), smallfiles_sizes[i % len(smallfiles_sizes)])
+        for i in range(smallfiles_count)
+    ]
+    pattern = memoryview(create_bytearray(max(smallfiles_sizes), value=value))
+    flags = getattr(os, 'O_BINARY', 0)
+    Syncer(sync, sync_every)  # bad policies fail here rather than in every thread
+    sync_latencies = []  # type: List[float]
+
+    def create(filepath, size):
+        # type: (str, int) -> int
+        syncer = Syncer(sync, sync_every)
+        fd = syncer.opener(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | flags)
+        try:
+            written = 0
+            while written < size:
+                written += syncer.wrote(fd, os.write(fd, pattern[written:size]))
+            syncer.end(fd)
+        finally:
+            os.close(fd)
+            sync_latencies.extend(syncer.latencies)
+        return written
+
+    def read(filepath, size):
+        # type: (str, int) -> int
+        fd = os.open(filepath, os.O_RDONLY | flags)
+        try:
+            done = 0
+            while True:
+                chunk = os.read(fd, size)
+                if not chunk:
+                    return done
+                done += len(chunk)
+        finally:
+            os.close(fd)
+
+    def delete(filepath, size):
+        # type: (str, int) -> int
+        os.remove(filepath)
+        return 0
+
+    logging.info(
+        '%d files of %s in %d directories under "%s", numjobs=%d, sync=%s', smallfiles_count,
+        ', '.join(bytes_to_size(size) for size in smallfiles_sizes), len(leaves), root, numjobs, sync
+    )
+    for leaf in leaves:
+        os.makedirs(leaf, exist_ok=True)
+    phases = []  # type: List[Dict[str, Any]]
+    try:
+        for name, op in [('create', create), ('read', read), ('delete', delete)]:
+            if stop_event.is_set() or (name == 'delete' and no_delete):
+                break
+            phases.append(phase(name, op, files, target=root, numjobs=numjobs, stop_event=stop_event))
+    finally:
+        if not no_delete:
+            tree_remove(root, numjobs=numjobs)
+    result = phases_result(
+        phases, files=smallfiles_count, numjobs=numjobs, tree_depth=tree_depth, tree_fanout=tree_fanout,
+        sync=sync
+    )
+    if sync != 'none':
+        result.update(sync_elapsed=sum(sync_latencies), syncs=len(sync_latencies))
+        result.update({f'sync_{k}': v for k, v in latency_stats(sync_latencies).items()})
+    return result
+
+
+def metadata(
+    data_filepath=con.DATA_FILEPATH,
+    metadata_count=con.METADATA_COUNT,
+    tree_depth=con.TREE_DEPTH,
+    tree_fanout=con.TREE_FANOUT,
+    numjobs=con.NUMJOBS,
+    no_delete=con.NO_DELETE,
+    stop_event=con.STOP_EVENT,
+    **kwargs
+):
+    # type: (str, int, int, int, int, bool, threading.Event, Any) -> Dict[str, Any]
+    '''
+    Description:
+        filesystem metadata rates, no data moves at all, phase by phase, each one done everywhere before the next
+            - mkdir: every directory of the tree, a level at a time so the parents are there
+            - create: metadata_count empty files over the leaves
+            - stat: every file
+            - readdir: every directory, all of its entries
+            - rename: every file, within its directory
+            - unlink: every file
+            - rmdir: every directory, deepest level first
+
+    Arguments:
+        data_filepath: str
+            the tree goes next to it, see the module docstring
+        metadata_count: int
+            default 10000, files
+        tree_depth: int
+            default 2, levels of directories
+        tree_fanout: int
+            default 16, directories per level
+        numjobs: int
+            default 1, threads per phase
+        no_delete: bool
+            default False, skip unlink and rmdir and leave the tree
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        Dict[str, Any]
+            all the phases together like io_workload, then per phase (mkdir_, create_, stat_, ...) ops, elapsed,
+            ops_per_sec and lat_*_us
+    '''
+    if metadata_count < 1 or tree_depth < 1 or tree_fanout < 1:
+        raise ValueError(f'need files and a tree, provided {metadata_count}, {tree_depth} and {tree_fanout}!')
+    if numjobs < 1:
+        raise ValueError(f'numjobs must be positive, provided {numjobs}!')
+    root = tree_root(data_filepath, 'metadata')
+    if os.path.exists(root):
+        raise FileExistsError(f'"{root}" already exists, remove it or point data_filepath elsewhere!')
+    levels = tree_levels(root, tree_depth=tree_depth, tree_fanout=tree_fanout)
+    directories = [(dirpath, ) for level in levels for dirpath in level]
+    files = [(os.path.join(levels[-1][i % len(levels[-1])], f'f{i:08d}'), ) for i in range(metadata_count)]
+    renamed = [(f'{filepath}.renamed', ) for filepath, in files]
+    flags = getattr(os, 'O_BINARY', 0)
+
+    def mkdir(dirpath):
+        # type: (str) -> int
+        os.mkdir(dirpath)
+        return 0
+
+    def create(filepath):
+        # type: (str) -> int
+        os.close(os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | flags))
+        return 0
+
+    def stat(filepath):
+        # type: (str) -> int
+        os.stat(filepath)
+        return 0
+
+    def readdir(dirpath):
+        # type: (str) -> int
+        with os.scandir(dirpath) as entries:
+            for _ in entries:
+                pass
+        return 0
+
+    def rename(filepath):
+        # type: (str) -> int
+        os.rename(filepath, f'{filepath}.renamed')
+        return 0
+
+    def unlink(filepath):
+        # type: (str) -> int
+        os.remove(filepath)
+        return 0
+
+    def rmdir(dirpath):
+        # type: (str) -> int
+        os.rmdir(dirpath)
+        return 0
+
+    logging.info(
+        '%d files in %d directories (%d deep, %d wide) under "%s", numjobs=%d', metadata_count, len(directories),
+        tree_depth, tree_fanout, root, numjobs
+    )
+    os.makedirs(root)
+    phases = []  # type: List[Dict[str, Any]]
+    kwargs = dict(target=root, numjobs=numjobs, stop_event=stop_event)
+    try:
+        for name, op, items in [
+            ('mkdir', mkdir, levels),
+            ('create', create, files),
+            ('stat', stat, files),
+            ('readdir', readdir, directories),
+            ('rename', rename, files),
+            ('unlink', unlink, renamed),
+            ('rmdir', rmdir, levels[::-1]),
+        ]:
+            if stop_event.is_set() or (name in ['unlink', 'rmdir'] and no_delete):
+                break
+            if op in (mkdir, rmdir):
+                # a level at a time, every directory's parent (mkdir) or children (rmdir) taken care of first
+                by_level = [phase(name, op, [(dirpath, ) for dirpath in level], **kwargs) for level in items]
+                phases.append(phases_merge(name, by_level))
+            else:
+                phases.append(phase(name, op, items, **kwargs))
+    finally:
+        if not no_delete:
+            tree_remove(root, numjobs=numjobs)
+    return phases_result(
+        phases, files=metadata_count, directories=len(directories), numjobs=numjobs, tree_depth=tree_depth,
+        tree_fanout=tree_fanout
+    )
@@ -1,13 +1,16 @@
 # stdlib
 from __future__ import print_function, division
 import os
+import csv
+import math
+import time
+import datetime
+import itertools
 import pprint
 import logging
 import inspect
 import threading  # noqa: F401
-from typing import List, Any, Callable  # noqa: F401
-
-# 3rd party
+from typing import List, Any, Callable, Dict, Optional  # noqa: F401
 
 # app imports
 import constants
@@ -15,7 +18,13 @@ import input_output
 import smart
 import system
 import stdlib
+import report
 import benchmarks
+import workload
+import filesystem
+import timing
+import results
+from stdlib import bytes_to_size
 
 SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
 
@@ -26,6 +35,12 @@ FUNCS = [
     input_output.write_fulpak,
     input_output.read_seq,
     input_output.read_rand,
+    workload.io_workload,
+    workload.suite,
+    workload.autotune,
+    workload.calibrate,
+    filesystem.smallfiles,
+    filesystem.metadata,
     smart.telemetry,
     smart.telemetry_loop,
     # TODO: test
@@ -35,10 +50,16 @@ FUNCS = [
 ]  # type: List[Callable]
 FUNC_MAP = {func.__name__: func for func in FUNCS}
 FUNC_NAMES = [func.__name__ for func in FUNCS]
+# two sided 95% student's t by degrees of freedom, 1 to 30, past that its close enough to normal
+T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120,
+    2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+]
+STATS_METRICS = ['throughput', 'iops', 'lat_p99_us', 'elapsed']
 
 
-def flow_run(steps, stop_event=constants.STOP_EVENT, **kwargs):
-    # type: (List[str], threading.Event, Any) -> None
+def flow_run(steps, carry=None, stop_event=constants.STOP_EVENT, **kwargs):
+    # type: (List[str], Optional[dict], threading.Event, Any) -> Dict[str, dict]
     '''
     Description:
         Run other functions in a long line
@@ -46,36 +67,267 @@ def flow_run(steps, stop_event=constants.STOP_EVENT, **kwargs):
     Arguments:
         steps: List[str]
             functions to run in a flow
+        carry: Optional[dict]
+            default None, else whatever the steps produce (the byte_array) is kept here for the next flow_run
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
         **kwargs: varkwarguments
 
     Returns:
-        None
+        Dict[str, dict]
+            "<position>-<step>" to the STATS_METRICS it got, for the steps that finished
     '''
+    carry = {} if carry is None else carry
+    kwargs.update(carry)
+    metrics = {}  # type: Dict[str, dict]
     for s, step in enumerate(steps):
         if stop_event.is_set():
             break
         func = FUNC_MAP[step]
         logging.info('starting %s / %s - %r', s + 1, len(steps), func.__name__)
+        report.step(step)
 
         signature = inspect.signature(func)
         # prepend = f'{step}_'
         # unmodified_kwargs = {k[len(prepend):]: v for k, v in kwargs.items() if k.startswith(prepend)}
         subkwargs = {k: kwargs[k] for k in signature.parameters if k in kwargs}  # unmodified_kwargs
+        if 'stop_event' in signature.parameters:
+            subkwargs['stop_event'] = stop_event  # this job's, not necessarily everyone's
         # otherwise its too much to print
         logging.debug(pprint.pformat({k: v for k, v in subkwargs.items() if k not in ['byte_array']}, indent=2))
 
-        res = func(**subkwargs)
-        if isinstance(res, bytearray):
-            kwargs['byte_array'] = res
-        elif isinstance(res, tuple) and len(res) == 3 and isinstance(res[2], bytearray):
+        start = timing.ticks()
+        res = results.recorded(
+            func,
+            subkwargs,
+            step=step,
+            results_filepath=kwargs.get('results_filepath', ''),
+            calibration_filepath=kwargs.get('calibration_filepath', ''),
+        )
+        if not stop_event.is_set():  # cut short, it'd only drag the stats down
+            metrics[f'{s + 1}-{step}'] = {
+                k: v for k, v in results.result_metrics(res, timing.since(start)).items() if k in STATS_METRICS
+            }
+        if isinstance(res, (bytearray, memoryview)):
+            kwargs['byte_array'] = carry['byte_array'] = res
+        elif isinstance(res, tuple) and len(res) == 3 and isinstance(res[2], (bytearray, memoryview)):
             _, _, byte_array = res  # bytes_io, elapsed
-            kwargs['byte_array'] = byte_array
+            kwargs['byte_array'] = carry['byte_array'] = byte_array
         elif func == system.delete_partitions:
             kwargs['disk_numbers'] = res
         elif func == system.create_partitions:
             kwargs['disk_number_to_letter_dict'] = res
+    return metrics
+
+
+def mad_outliers(values, threshold=constants.FLOW_OUTLIERS):
+    # type: (List[float], float) -> List[bool]
+    '''
+    Description:
+        which values are outliers by modified z-score (0.6745 * distance from the median / median absolute deviation)
+        robust where mean/stdev arent, the outlier itself cant drag the yardstick, needs 3+ values, -1 for none
+        >>> mad_outliers([100, 101, 99, 100, 40])  # [False, False, False, False, True]
+    '''
+    import numpy as np
+    arr = np.asarray(values, dtype=float)
+    if threshold <= 0 or len(arr) < 3:
+        return [False] * len(arr)
+    median = np.median(arr)
+    mad = np.median(np.abs(arr - median))
+    if mad == 0:
+        # at least half of them are exactly the median, anything that isnt is out
+        return [bool(value != median) for value in arr]
+    return [bool(abs(0.6745 * (value - median) / mad) > threshold) for value in arr]
+
+
+def flow_stats(
+    iterations, flow_outliers=constants.FLOW_OUTLIERS, flow_ci_max=constants.FLOW_CI_MAX, description='flow'
+):
+    # type: (List[Dict[str, dict]], float, float, str) -> pd.DataFrame
+    '''
+    Description:
+        every step's STATS_METRICS across iterations (what flow_run returned each time) reduced to
+        n, outliers rejected, mean, stdev, 95% confidence interval (+/-), min, max
+        warns when the interval is wider than flow_ci_max of the mean, with about how many iterations would do
+    '''
+    import pandas as pd
+    import numpy as np
+    rows = []
+    keys = []  # type: List[str]
+    for metrics in iterations:
+        keys.extend(key for key in metrics if key not in keys)
+    for key in keys:
+        for metric in STATS_METRICS:
+            values = [metrics[key][metric] for metrics in iterations if metrics.get(key, {}).get(metric) is not None]
+            if not values:
+                continue
+            outliers = mad_outliers(values, threshold=flow_outliers)
+            kept = np.asarray([value for value, outlier in zip(values, outliers) if not outlier], dtype=float)
+            n = len(kept)
+            mean = float(kept.mean())
+            stdev = float(kept.std(ddof=1)) if n > 1 else float('nan')
+            t = T_95[n - 2] if 1 < n <= len(T_95) + 1 else 1.96
+            ci = t * stdev / math.sqrt(n) if n > 1 else float('nan')
+            rows.append(
+                dict(
+                    step=key, metric=metric, n=n, rejected=len(values) - n, mean=mean, stdev=stdev, ci=ci,
+                    min=float(kept.min()), max=float(kept.max())
+                )
+            )
+            if metric != 'throughput' or mean <= 0 or n < 2 or ci / mean <= flow_ci_max:
+                continue
+            # n such that t * stdev / sqrt(n) is within flow_ci_max of the mean, with the normal's t
+            needed = math.ceil((1.96 * stdev / (flow_ci_max * mean))**2)
+            logging.warning(
+                '%r %s throughput varies too much run to run to trust, +/-%0.1f%% at 95%% over %d iterations, '
+                'want +/-%0.1f%%, that takes about %d', description, key, 100 * ci / mean, n, 100 * flow_ci_max,
+                max(needed, n + 1)
+            )
+
+    df = pd.DataFrame(rows, columns=['step', 'metric', 'n', 'rejected', 'mean', 'stdev', 'ci', 'min', 'max'])
+    if len(df):
+        table = df.copy()
+        for column in ['mean', 'stdev', 'ci', 'min', 'max']:
+            table[column] = [
+                ('' if value != value else f'{bytes_to_size(value)}/s' if metric == 'throughput' else f'{value:0.3f}')
+                for metric, value in zip(df['metric'], df[column])
+            ]
+        table['ci'] = [f'+/-{value}' if value else '' for value in table['ci']]
+        logging.info('%r across %d iterations\n%s', description, len(iterations), table.to_string(index=False))
+    return df
+
+
+def flow_one(
+    steps=FUNC_NAMES,
+    flow_iterations=constants.ITERATIONS,
+    flow_duration=constants.DURATION,
+    flow_no_delete_end=constants.NO_DELETE,
+    flow_outliers=constants.FLOW_OUTLIERS,
+    flow_ci_max=constants.FLOW_CI_MAX,
+    stop_event=constants.STOP_EVENT,
+    **kwargs,
+):
+    # type: (List[str], int, float|int, bool, float, float, threading.Event, Any) -> pd.DataFrame
+    '''
+    Description:
+        Run other functions serially against one data_filepath, see flow
+    '''
+    description = f'flow-{"+".join(steps)}'
+    try:
+        iterations = stdlib.loop_or_elapsed(
+            flow_run,
+            (steps, ),
+            # the pattern outlives the iteration, rather than being regenerated or reloaded every time
+            dict(kwargs, carry={}, stop_event=stop_event),
+            description=description,
+            result_behavior='append',
+            iterations=flow_iterations,
+            duration=flow_duration,
+            stop_event=stop_event,
+        )
+        return flow_stats(iterations, flow_outliers=flow_outliers, flow_ci_max=flow_ci_max, description=description)
+    finally:
+        if not flow_no_delete_end and not kwargs.get('in_place', False):
+            logging.warning('Finally deleting data_filepath at the end of the flow...')
+            if os.path.isfile(kwargs['data_filepath']):
+                os.remove(kwargs['data_filepath'])
+
+
+def flow_log(seen, elapsed, jobs):
+    # type: (Dict[int, tuple], float, Dict[str, threading.Thread]) -> None
+    '''
+    Description:
+        throughput of every target and all of them together since the last call
+    '''
+    import pandas as pd
+    targets = report.progress_deltas(seen)
+    rows = []
+    for data_filepath, job in jobs.items():
+        target = targets.get(data_filepath, dict(op='', bytes=0))
+        rows.append(
+            dict(
+                target=data_filepath,
+                state='running' if job.is_alive() else 'done',
+                op=target['op'],
+                throughput=f'{bytes_to_size(target["bytes"] / elapsed)}/s',
+            )
+        )
+    total = sum(target['bytes'] for target in targets.values())
+    rows.append(dict(target='total', state='', op='', throughput=f'{bytes_to_size(total / elapsed)}/s'))
+    logging.info('throughput\n%s', pd.DataFrame(rows).to_string(index=False))
+
+
+def flow_targets_run(
+    data_filepaths,
+    steps=FUNC_NAMES,
+    flow_report_every=constants.FLOW_REPORT_EVERY,
+    stop_event=constants.STOP_EVENT,
+    **kwargs,
+):
+    # type: (List[str], List[str], float|int, threading.Event, Any) -> Dict[str, Any]
+    '''
+    Description:
+        flow_one against every data_filepath at once, one thread each, all sharing one pattern
+        every target stops on its own (its iterations, its duration, its failure), stop_event stops them all
+
+    Returns:
+        Dict[str, Any]
+            data_filepath to what its flow_one returned
+    '''
+    # one pattern for every target, made (or attached to) once
+    pattern_kwargs = {
+        k: kwargs[k] for k in inspect.signature(input_output.get_byte_array).parameters if k in kwargs
+    }
+    pattern_kwargs.update(data_filepath=data_filepaths[0], stop_event=stop_event)
+    kwargs['byte_array'] = input_output.get_byte_array(**pattern_kwargs)
+
+    job_stop_events = {data_filepath: threading.Event() for data_filepath in data_filepaths}
+    target_results = {}  # type: Dict[str, Any]
+    failures = {}  # type: Dict[str, BaseException]
+
+    def job(data_filepath):
+        # type: (str) -> None
+        try:
+            target_results[data_filepath] = flow_one(
+                steps=steps, stop_event=job_stop_events[data_filepath], **dict(kwargs, data_filepath=data_filepath)
+            )
+        except BaseException as be:
+            logging.exception('flow on "%s" failed, the other targets carry on', data_filepath)
+            failures[data_filepath] = be
+
+    jobs = {
+        data_filepath: threading.Thread(target=job, args=(data_filepath, ), name=f'flow-{d}', daemon=True)
+        for d, data_filepath in enumerate(data_filepaths)
+    }
+    seen = {}  # type: Dict[int, tuple]
+    report.progress_deltas(seen)  # from here on, not whatever ran before
+    for thread in jobs.values():
+        thread.start()
+
+    prior = time.perf_counter()
+    try:
+        while any(thread.is_alive() for thread in jobs.values()):
+            if stop_event.wait(0.25):
+                for job_stop_event in job_stop_events.values():
+                    job_stop_event.set()
+            now = time.perf_counter()
+            if flow_report_every > 0 and now - prior >= flow_report_every:
+                flow_log(seen, now - prior, jobs)
+                prior = now
+    except KeyboardInterrupt:
+        logging.warning('ctrl + c detected! stopping every target...')
+        for job_stop_event in job_stop_events.values():
+            job_stop_event.set()
+        for thread in jobs.values():
+            thread.join()
+        raise
+
+    if failures:
+        raise RuntimeError(
+            f'{len(failures)} / {len(jobs)} targets failed: ' +
+            ', '.join(f'"{data_filepath}" ({be!r})' for data_filepath, be in failures.items())
+        )
+    return target_results
 
 
 def flow(
@@ -83,10 +335,14 @@ def flow(
     flow_iterations=constants.ITERATIONS,
     flow_duration=constants.DURATION,
     flow_no_delete_end=constants.NO_DELETE,
+    flow_targets=constants.FLOW_TARGETS,
+    flow_report_every=constants.FLOW_REPORT_EVERY,
+    flow_outliers=constants.FLOW_OUTLIERS,
+    flow_ci_max=constants.FLOW_CI_MAX,
     stop_event=constants.STOP_EVENT,
     **kwargs,
 ):
-    # type: (List[str], int, float|int, bool, threading.Event, Any) -> Any|list|dict
+    # type: (List[str], int, float|int, bool, List[str], float|int, float, float, threading.Event, Any) -> pd.DataFrame|Dict[str, pd.DataFrame]  # noqa: E501
     '''
     Description:
         Run other functions serially
@@ -98,31 +354,241 @@ def flow(
             amount of iterations to keep runing for, leading to stop_event trigger
         flow_duration: float|int
             amount of time to keep runing for, leading to stop_event trigger
+        flow_targets: List[str]
+            default [], else more data_filepaths to run the same steps against at the same time as data_filepath
+            each target has its own iterations/duration/failure, ctrl + c stops them all
+        flow_report_every: float|int
+            with flow_targets, seconds between logging each target's and the total throughput, -1 to not
+        flow_outliers: float
+            default 3.5, iterations whose modified z-score (see mad_outliers) is past this are left out of the stats
+            -1 to keep every iteration
+        flow_ci_max: float
+            default 0.05, warn when the 95% confidence interval of a step's throughput is wider than this fraction
+            of its mean, there werent enough iterations to trust it
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
         **kwargs: varkwarguments
 
     Returns:
-        None
+        pd.DataFrame|Dict[str, pd.DataFrame]
+            every step's stats across iterations, see flow_stats, per data_filepath with flow_targets
     '''
-    try:
-        return stdlib.loop_or_elapsed(
-            flow_run,
-            (steps, ),
-            kwargs,
-            description=f'flow-{"+".join(steps)}',
-            result_behavior='singleton',
-            iterations=flow_iterations,
-            duration=flow_duration,
-            stop_event=stop_event,
+    flow_kwargs = dict(
+        steps=steps,
+        flow_iterations=flow_iterations,
+        flow_duration=flow_duration,
+        flow_no_delete_end=flow_no_delete_end,
+        flow_outliers=flow_outliers,
+        flow_ci_max=flow_ci_max,
+        stop_event=stop_event,
+    )
+    if not flow_targets:
+        return flow_one(**flow_kwargs, **kwargs)
+
+    data_filepaths = [kwargs.pop('data_filepath', constants.DATA_FILEPATH)] + list(flow_targets)
+    if len(set(data_filepaths)) != len(data_filepaths):
+        raise ValueError(f'every target needs its own data_filepath, provided {data_filepaths}!')
+    flow_kwargs.pop('stop_event')
+    return flow_targets_run(
+        data_filepaths, flow_report_every=flow_report_every, stop_event=stop_event, **flow_kwargs, **kwargs
+    )
+
+
+SWEEP_KEYS = ['step', 'data_filepath', 'size', 'chunk_size', 'iodepth', 'numjobs', 'rw', 'access', 'engine']
+SWEEP_COLUMNS = SWEEP_KEYS + [
+    'status', 'error', 'bytes', 'ops', 'elapsed', 'throughput', 'iops', 'lat_mean_us', 'lat_p50_us', 'lat_p99_us',
+    'lat_p999_us', 'lat_max_us', 'finished'
+]
+
+
+def sweep_cells(
+    step, data_filepath, sizes, chunk_sizes, iodepths, numjobs, rw='', access='', engine='', only=None
+):
+    # type: (str, str, List[int], List[int], List[int], List[int], str, str, str, Optional[List[dict]]) -> List[dict]
+    '''
+    Description:
+        the cartesian product, in order, less whatever doesnt match any of only
+        >>> sweep_cells('io_workload', 'D:/data.dat', [GB], [4 * KB, MB], [1, 32], [1], only=[{'chunk_size': '4KB'}])
+        >>> # [{..., 'chunk_size': 4096, 'iodepth': 1, ...}, {..., 'chunk_size': 4096, 'iodepth': 32, ...}]
+    '''
+    only = [
+        {k: stdlib.validate_str_int(k, v) if k in ['size', 'chunk_size'] else v for k, v in criteria.items()}
+        for criteria in only or []
+    ]
+    cells = []
+    for size, chunk_size, iodepth, jobs in itertools.product(sizes, chunk_sizes, iodepths, numjobs):
+        cell = dict(
+            step=step, data_filepath=data_filepath, size=size, chunk_size=chunk_size, iodepth=iodepth, numjobs=jobs,
+            rw=rw, access=access, engine=engine
         )
+        if only and not any(all(cell.get(k) == v for k, v in criteria.items()) for criteria in only):
+            continue
+        cells.append(cell)
+    return cells
+
+
+def sweep_done(sweep_filepath):
+    # type: (str) -> set
+    '''
+    Description:
+        the cells sweep_filepath already has results for, failures get another go
+    '''
+    if not os.path.isfile(sweep_filepath):
+        return set()
+    with open(sweep_filepath, newline='') as r:
+        return {tuple(row[k] for k in SWEEP_KEYS) for row in csv.DictReader(r) if row['status'] == 'ok'}
+
+
+def sweep(
+    sweep_step=constants.SWEEP_STEPS[0],
+    sweep_sizes=constants.SWEEP_SIZES,
+    sweep_chunk_sizes=constants.SWEEP_CHUNK_SIZES,
+    sweep_iodepths=constants.SWEEP_IODEPTHS,
+    sweep_numjobs=constants.SWEEP_NUMJOBS,
+    sweep_only=None,
+    sweep_filepath=constants.SWEEP_FILEPATH,
+    stop_event=constants.STOP_EVENT,
+    **kwargs,
+):
+    # type: (str, List[int], List[int], List[int], List[int], Optional[List[dict]], str, threading.Event, Any) -> pd.DataFrame  # noqa: E501
+    '''
+    Description:
+        Run one workload over every combination of sizes, chunk sizes, iodepths and numjobs, one results row each
+
+    Arguments:
+        sweep_step: str
+            the workload, only io_workload has iodepth and numjobs
+        sweep_sizes: List[int]
+            default [], the one --size, else each of these
+        sweep_chunk_sizes: List[int]
+            default [], the one --chunk-size, else each of these
+        sweep_iodepths: List[int]
+            default [], the one --iodepth, else each of these
+        sweep_numjobs: List[int]
+            default [], the one --numjobs, else each of these
+        sweep_only: Optional[List[dict]]
+            default None for every cell, else only cells matching any of these
+            Ex) [{"iodepth": 1}, {"chunk_size": "4KB", "numjobs": 16}]
+        sweep_filepath: str
+            results csv, every cell is appended as soon as its done
+            cells already in there (status ok) are skipped, so an interrupted sweep picks up where it left off
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        pd.DataFrame
+            every row in sweep_filepath
+    '''
+    import pandas as pd
+    if sweep_step not in constants.SWEEP_STEPS:
+        raise ValueError(f'sweep_step {sweep_step!r} not in {constants.SWEEP_STEPS}!')
+    func = FUNC_MAP[sweep_step]
+    is_io_workload = func is workload.io_workload
+    sizes = sweep_sizes or [kwargs.get('size', constants.SIZE)]
+    chunk_sizes = sweep_chunk_sizes or [kwargs.get('chunk_size', constants.CHUNK_SIZE)]
+    iodepths = sweep_iodepths or [kwargs.get('iodepth', constants.IODEPTH)]
+    numjobs = sweep_numjobs or [kwargs.get('numjobs', constants.NUMJOBS)]
+    if not is_io_workload and (len(iodepths) > 1 or len(numjobs) > 1):
+        raise ValueError(f'{sweep_step} has no iodepth or numjobs, sweep those with io_workload!')
+    data_filepath = kwargs.pop('data_filepath', constants.DATA_FILEPATH)
+    cells = sweep_cells(
+        sweep_step,
+        data_filepath,
+        sizes,
+        chunk_sizes,
+        iodepths,
+        numjobs,
+        rw=kwargs.get('rw', constants.RW) if is_io_workload else '',
+        access=kwargs.get('access', constants.ACCESS) if is_io_workload else '',
+        engine=workload.engine_pick(kwargs.get('engine', constants.ENGINE)) if is_io_workload else '',
+        only=sweep_only,
+    )
+    done = sweep_done(sweep_filepath)
+    todo = [cell for cell in cells if tuple(str(cell[k]) for k in SWEEP_KEYS) not in done]
+    logging.info(
+        'sweeping %d cells of %s, %d already done in "%s"', len(cells), sweep_step, len(cells) - len(todo),
+        sweep_filepath
+    )
+
+    signature = inspect.signature(func)
+    byte_arrays = {}  # type: Dict[int, bytearray|memoryview]
+    os.makedirs(os.path.dirname(sweep_filepath) or '.', exist_ok=True)
+    try:
+        for c, cell in enumerate(todo):
+            if stop_event.is_set():
+                break
+            logging.info('sweep cell %d / %d: %s', c + 1, len(todo), {k: cell[k] for k in SWEEP_KEYS[2:]})
+            report.step(f'{sweep_step} {c + 1}/{len(todo)}')
+            subkwargs = {k: kwargs[k] for k in signature.parameters if k in kwargs}
+            subkwargs.update({k: cell[k] for k in SWEEP_KEYS if k in signature.parameters})
+            # the cells share the file, its removed once at the end
+            subkwargs.update(no_delete=True, stop_event=stop_event)
+            row = dict(cell, status='ok', error='')
+            before = results.smart_snapshot(data_filepath)
+            try:
+                if not is_io_workload:
+                    # made (and the file written) outside the timing, once per size
+                    if cell['size'] not in byte_arrays:
+                        byte_arrays.clear()
+                        byte_arrays[cell['size']] = input_output.get_byte_array(
+                            data_filepath=data_filepath, size=cell['size'], value=kwargs.get('value', constants.VALUE),
+                            in_place=kwargs.get('in_place', False), pattern_name=kwargs.get('pattern_name', ''),
+                            stop_event=stop_event,
+                        )
+                    subkwargs['byte_array'] = byte_arrays[cell['size']]
+                start = timing.ticks()
+                res = func(**subkwargs)
+                elapsed = timing.since(start)
+                if isinstance(res, dict):
+                    row.update({k: v for k, v in res.items() if k not in SWEEP_KEYS})
+                else:
+                    bytes_io = res[0]  # (bytes, elapsed or throughput, byte_array)
+                    row.update(bytes=bytes_io, elapsed=elapsed, throughput=bytes_io / elapsed if elapsed > 0 else 0.0)
+            except Exception as ex:
+                logging.exception('sweep cell %d / %d failed, moving on', c + 1, len(todo))
+                row.update(status='failed', error=repr(ex))
+            if stop_event.is_set():
+                break  # cut short, its redone on resume
+            row['finished'] = datetime.datetime.now().isoformat()
+            new = not os.path.isfile(sweep_filepath)
+            with open(sweep_filepath, 'a', newline='') as a:
+                writer = csv.DictWriter(a, fieldnames=SWEEP_COLUMNS, extrasaction='ignore')
+                if new:
+                    writer.writeheader()
+                writer.writerow(row)
+            if kwargs.get('results_filepath'):
+                results.record(
+                    kwargs['results_filepath'],
+                    sweep_step,
+                    data_filepath,
+                    results.scalars({k: v for k, v in subkwargs.items() if k != 'data_filepath'}),
+                    row,
+                    before=before,
+                    after=results.smart_snapshot(data_filepath),
+                    in_place=kwargs.get('in_place', False),
+                    status=row['status'],
+                    error=row['error'],
+                    calibration_filepath=kwargs.get('calibration_filepath', ''),
+                )
     finally:
-        if not flow_no_delete_end:
-            logging.warning('Finally deleting data_filepath at the end of the flow...')
-            if os.path.isfile(kwargs['data_filepath']):
-                os.remove(kwargs['data_filepath'])
+        if not kwargs.get('no_delete', False) and not kwargs.get('in_place', False):
+            if os.path.isfile(data_filepath):
+                os.remove(data_filepath)
+
+    df = pd.read_csv(sweep_filepath) if os.path.isfile(sweep_filepath) else pd.DataFrame(columns=SWEEP_COLUMNS)
+    if len(df):
+        table = df[[col for col in SWEEP_KEYS[2:] if df[col].notna().any()] + ['status']].copy()
+        table['throughput'] = [f'{bytes_to_size(ele)}/s' if ele == ele else '' for ele in df['throughput']]
+        if df['iops'].notna().any():
+            table['iops'] = df['iops'].round(0)
+            table['p99'] = [f'{ele:0.1f}us' if ele == ele else '' for ele in df['lat_p99_us']]
+        logging.info('sweep results "%s"\n%s', sweep_filepath, table.to_string(index=False))
+    return df
 
 
 FUNCS.append(flow)
+FUNCS.append(sweep)
+FUNCS.append(results.compare)
 FUNC_NAMES = [func.__name__ for func in FUNCS]
 FUNC_MAP.update({func.__name__: func for func in FUNCS})
@@ -1,21 +1,126 @@
 # stdlib
 import os
-import time
 import math
 import random
 import logging
 import threading  # noqa: F401
-from typing import Any, Tuple, Optional  # noqa: F401
-
-# third party
-import psutil
-import pandas as pd
+from multiprocessing import shared_memory, resource_tracker
+from typing import IO, Any, Dict, List, Tuple, Optional  # noqa: F401
 
 # app
 import constants as con
+import timing
 from stdlib import touch, bytes_to_size, diff_bytes
+from watchdog import IOProgress
 
 SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+# pattern_name -> the attached segment, kept open for as long as the process may hand out views of it
+SHARED_PATTERNS = {}  # type: Dict[str, shared_memory.SharedMemory]
+
+
+def usage_path(data_filepath):
+    # type: (str) -> str
+    '''
+    Description:
+        what to hand psutil.disk_usage for the filesystem data_filepath lives on
+        >>> usage_path('D:/data.dat')  # 'D:'
+        >>> usage_path('/mnt/d/data.dat')  # '/mnt/d'
+    '''
+    drive, _ = os.path.splitdrive(data_filepath)
+    return drive or os.path.dirname(os.path.abspath(data_filepath))
+
+
+def target_capacity(data_filepath):
+    # type: (str) -> int
+    '''
+    Description:
+        bytes available to an in place target, the size of a file image or of a block device (getsize says 0 for those)
+    '''
+    with open(data_filepath, 'rb') as rb:
+        return rb.seek(0, os.SEEK_END)
+
+
+def free_bytes(data_filepath, capacity=-1, written=0):
+    # type: (str, int, int) -> int
+    # in place targets are full when we've written their capacity, everything else when the filesystem is
+    import psutil
+    if capacity >= 0:
+        return capacity - written
+    return psutil.disk_usage(usage_path(data_filepath)).free
+
+
+class Syncer(object):
+    '''
+    Description:
+        a write workload's durability policy, and how long it spent syncing, apart from writing
+            - none: never, elapsed may well stop with the data still in the page cache
+            - end: once, before the file is closed
+            - bytes: every sync_every bytes, and at the end
+            - op: after every write
+            - dsync: opened O_DSYNC, every write only returns once its durable, so theres no sync of its own to time
+        fdatasync where the platform has it, fsync otherwise
+        >>> syncer = Syncer(sync, sync_every)
+        >>> with open(data_filepath, 'wb', opener=syncer.opener) as wb:
+        >>>     bytes_written += syncer.wrote(wb, progress.end(wb.write(chunk)))
+        >>>     syncer.end(wb)
+        one per thread, they dont share
+    '''
+
+    def __init__(self, sync=con.SYNC, sync_every=con.SYNC_EVERY):
+        # type: (str, int) -> None
+        if sync not in con.SYNCS:
+            raise ValueError(f'sync {sync!r} not in {con.SYNCS}!')
+        if sync == 'dsync' and not hasattr(os, 'O_DSYNC'):
+            raise ValueError('sync dsync needs O_DSYNC, which this platform doesnt have!')
+        if sync == 'bytes' and sync_every <= 0:
+            raise ValueError(f'sync bytes needs a positive sync_every, provided {sync_every}!')
+        self.policy = sync
+        self.sync_every = sync_every
+        self.flags = os.O_DSYNC if sync == 'dsync' else 0
+        self.pending = 0
+        self.latencies = []  # type: List[float]
+
+    @property
+    def elapsed(self):
+        # type: () -> float
+        return sum(self.latencies)
+
+    def opener(self, path, flags):
+        # type: (str, int) -> int
+        return os.open(path, flags | self.flags)
+
+    def sync(self, f):
+        # type: (IO[bytes]|int) -> None
+        start = timing.ticks()
+        if isinstance(f, int):
+            fd = f
+        else:
+            f.flush()
+            fd = f.fileno()
+        getattr(os, 'fdatasync', os.fsync)(fd)
+        self.latencies.append(timing.since(start))
+        self.pending = 0
+
+    def wrote(self, f, nbytes):
+        # type: (IO[bytes]|int, int) -> int
+        self.pending += nbytes
+        if self.policy == 'op' or (self.policy == 'bytes' and self.pending >= self.sync_every):
+            self.sync(f)
+        return nbytes
+
+    def end(self, f):
+        # type: (IO[bytes]|int) -> None
+        if self.pending and self.policy in ['end', 'bytes', 'op']:
+            self.sync(f)
+
+    def log(self, elapsed):
+        # type: (float) -> None
+        if self.policy == 'dsync':
+            logging.info('sync=dsync, every write was durable before it returned, its all in the %0.3f sec', elapsed)
+        elif self.policy != 'none':
+            logging.info(
+                'sync=%s, %d syncs took %0.3f of the %0.3f sec', self.policy, len(self.latencies), self.elapsed, elapsed
+            )
 
 
 def create_bytearray(
@@ -103,6 +208,7 @@ def create_efficient(
     Returns:
         bytearray
     '''
+    import pandas as pd
     logging.debug('data_filepath="%s", value=%s', data_filepath, value)
     rows = []
     sweetspot_bytearray = bytearray()
@@ -192,21 +298,110 @@ def create(
     return byte_array
 
 
+def pattern_share(size=con.SIZE, value=con.VALUE, no_cheat=con.NO_CHEAT, stop_event=con.STOP_EVENT):
+    # type: (int, int, bool, threading.Event) -> shared_memory.SharedMemory
+    '''
+    Description:
+        create the pattern once in shared memory so any number of workers can attach to it by name, see pattern_attach
+        filled 1MB at a time, so the coordinator never holds a second copy
+        the caller owns it, pattern_unshare() once the workers are done
+
+    Arguments:
+        size: int
+            bytes, must be explicit, auto-determining needs a data_filepath to test against
+        value: int
+            -1 for random, else, [0,255] repeat the same value for all bytes
+        no_cheat: bool
+            default False, if True, every 1MB is freshly random rather than repeated
+
+    Returns:
+        shared_memory.SharedMemory
+    '''
+    if size <= 0:
+        raise ValueError(f'shared pattern needs an explicit size, provided {size}!')
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        mb = create_bytearray(min(size, con.MB), value=value, no_cheat=True)
+        for offset in range(0, size, con.MB):
+            if stop_event.is_set():
+                raise KeyboardInterrupt('stop_event triggered by someone else')
+            if no_cheat and offset > 0:
+                mb = create_bytearray(min(size - offset, con.MB), value=value, no_cheat=True)
+            length = min(size - offset, con.MB)
+            shm.buf[offset:offset + length] = mb[:length]
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    logging.info('shared pattern %r of %s, first 32 bytes: %s', shm.name, bytes_to_size(size), bytes(shm.buf[:32]))
+    SHARED_PATTERNS[shm.name] = shm
+    return shm
+
+
+def pattern_unshare(pattern_name):
+    # type: (str) -> None
+    '''
+    Description:
+        the coordinator is done with a pattern_share()d pattern, the memory goes once every worker has let go
+    '''
+    shm = SHARED_PATTERNS.pop(pattern_name)
+    shm.close()
+    shm.unlink()
+
+
+def pattern_attach(pattern_name, size=con.SIZE):
+    # type: (str, int) -> memoryview
+    '''
+    Description:
+        a read only view of the pattern_share()d pattern, attached once per process no matter how often its asked for
+
+    Arguments:
+        pattern_name: str
+            shared_memory name from the coordinator
+        size: int
+            -1 for all of it, segments are page rounded on some platforms so pass the real size
+    '''
+    if pattern_name not in SHARED_PATTERNS:
+        try:
+            shm = shared_memory.SharedMemory(name=pattern_name, track=False)  # type: ignore  # 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=pattern_name)
+            if os.name == 'posix':
+                # the coordinator owns it, dont let this process' resource tracker unlink it on the way out
+                resource_tracker.unregister(shm._name, 'shared_memory')  # type: ignore
+        SHARED_PATTERNS[pattern_name] = shm
+        logging.info('attached to shared pattern %r of %s', pattern_name, bytes_to_size(shm.size))
+    view = SHARED_PATTERNS[pattern_name].buf.toreadonly()
+    return view[:size] if size > 0 else view
+
+
 def get_byte_array(
     byte_array=None,
     data_filepath=con.DATA_FILEPATH,
     size=con.SIZE,
     value=con.VALUE,
     no_cheat=con.NO_CHEAT,
+    in_place=con.IN_PLACE,
+    pattern_name=con.PATTERN_NAME,
     stop_event=con.STOP_EVENT,
 ):
-    # type: (Optional[bytearray], str, int, int, bool, threading.Event) -> bytearray
-    if isinstance(byte_array, bytearray) and len(byte_array) > 0:
+    # type: (Optional[bytearray|memoryview], str, int, int, bool, bool, str, threading.Event) -> bytearray|memoryview
+    if isinstance(byte_array, (bytearray, memoryview)) and len(byte_array) > 0:
         logging.info(
-            'reusing byte_array of %s from kwarg, first 32 bytes: %s', bytes_to_size(len(byte_array)), byte_array[:32]
+            'reusing byte_array of %s from kwarg, first 32 bytes: %s', bytes_to_size(len(byte_array)),
+            bytes(byte_array[:32])
         )
         return byte_array
 
+    if pattern_name:
+        return pattern_attach(pattern_name, size=size)
+
+    if in_place:
+        # data_filepath is an image or a device, never write it just to make a pattern (or worse, remove it)
+        size = size if size != con.SIZE else con.CHUNK_SIZE
+        logging.info('creating in memory bytearray of size %s for in place target...', bytes_to_size(size))
+        return create_bytearray(size, value=value, no_cheat=no_cheat, stop_event=stop_event)
+
     if size == con.SIZE:
         byte_array = create(
             data_filepath=data_filepath, size=size, value=value, no_cheat=no_cheat, stop_event=stop_event
@@ -246,7 +441,7 @@ def write_fast_append_remove(
     # type: (bytearray, str, int|float, int) -> Tuple[int, float, bytearray]
     touch(data_filepath)
     iteration = 0
-    start = time.time()
+    start = timing.ticks()
     bytes_written = 0
     with open(data_filepath, 'ab') as ab:
         while True:
@@ -254,7 +449,7 @@ def write_fast_append_remove(
 
             bytes_written += ab.write(byte_array)
 
-            elapsed = time.time() - start
+            elapsed = timing.since(start)
             if iteration >= iterations and elapsed > duration:
                 break
     os.remove(data_filepath)
@@ -270,10 +465,14 @@ def write_burnin(
     log_every=con.LOG_EVERY,
     no_cheat=con.NO_CHEAT,
     no_delete=con.NO_DELETE,
+    in_place=con.IN_PLACE,
+    pattern_name=con.PATTERN_NAME,
+    sync=con.SYNC,
+    sync_every=con.SYNC_EVERY,
     stop_event=con.STOP_EVENT,
     **kwargs
 ):
-    # type: (Optional[bytearray], str, int, int, int, int, bool, bool, threading.Event, Any) -> Tuple[int, float, bytearray]  # noqa: E501
+    # type: (Optional[bytearray], str, int, int, int, int, bool, bool, bool, str, str, int, threading.Event, Any) -> Tuple[int, float, bytearray|memoryview]  # noqa: E501
     '''
     Description:
         Optional bytearray, write it to the disk in write mode fashion until the duration or iterations has exceeded
@@ -299,6 +498,15 @@ def write_burnin(
             if size > 1MB, simply repeat 1MB until size is filled up
         no_delete: bool
             default False, opt out of self-cleanup
+        in_place: bool
+            default False, data_filepath is a file image or block device: write over it from the start, within its
+                current size, never truncate or remove it
+        pattern_name: str
+            default '', else attach to this pattern_share()d pattern read only rather than making one
+        sync: str
+            default none, when to make what was written durable, see Syncer, elapsed includes it
+        sync_every: int
+            default 64MB, bytes between syncs when sync is bytes
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
         **kwargs: varkwarguments
@@ -307,33 +515,40 @@ def write_burnin(
         Tuple[int, float, bytearray]
             bytes operated, elapsed in seconds, byte_array
     '''
+    import psutil
     byte_array = get_byte_array(
         byte_array=byte_array,
         data_filepath=data_filepath,
         size=size,
         value=value,
         no_cheat=no_cheat,
+        in_place=in_place,
+        pattern_name=pattern_name,
         stop_event=stop_event,
     )
-    if not isinstance(byte_array, bytearray):
-        raise TypeError(f'byte_array must be of type bytearray, provided {type(byte_array)}!')
+    if not isinstance(byte_array, (bytearray, memoryview)):
+        raise TypeError(f'byte_array must be of type bytearray or memoryview, provided {type(byte_array)}!')
     logging.debug('byte_array=%s, data_filepath="%s"', bytes_to_size(len(byte_array)), data_filepath)
     logging.info(
-        'write_burnin with byte_array of %s, first 32 bytes: %s', bytes_to_size(len(byte_array)), byte_array[0:32]
+        'write_burnin with byte_array of %s, first 32 bytes: %s', bytes_to_size(len(byte_array)),
+        bytes(byte_array[0:32])
     )
 
-    drive_letter, _ = os.path.splitdrive(data_filepath)
+    drive_letter = usage_path(data_filepath)
     bytes_written = 0
     prior_bytes = 0
-    start = time.time()
-    with open(data_filepath, 'wb') as wb:
+    syncer = Syncer(sync, sync_every)
+    start = timing.ticks()
+    with open(
+        data_filepath, 'r+b' if in_place else 'wb', opener=syncer.opener
+    ) as wb, IOProgress(data_filepath) as progress:
         for i in range(0, len(byte_array), chunk_size):
-            if stop_event.is_set():
+            if progress.stopped(stop_event):
                 break
-            bytes_written += wb.write(byte_array[i:i + chunk_size])
+            progress.begin('write', i)
+            bytes_written += syncer.wrote(wb, progress.end(wb.write(byte_array[i:i + chunk_size])))
             if bytes_written > prior_bytes + log_every:
-                end = time.time()
-                elapsed = end - start
+                elapsed = timing.since(start)
                 if elapsed > 0:
                     throughput = bytes_written / elapsed
                 du = psutil.disk_usage(drive_letter)
@@ -342,10 +557,12 @@ def write_burnin(
                     bytes_to_size(bytes_written), elapsed, bytes_to_size(throughput)
                 )
                 prior_bytes = bytes_written
+        syncer.end(wb)
 
-    end = time.time()
-    bytes_written = os.path.getsize(data_filepath)
-    elapsed = end - start
+    elapsed = timing.since(start)
+    syncer.log(elapsed)
+    if not in_place:
+        bytes_written = os.path.getsize(data_filepath)
     throughput = 0.0
     if elapsed > 0:
         throughput = bytes_written / elapsed
@@ -355,7 +572,7 @@ def write_burnin(
         bytes_to_size(throughput)
     )
 
-    if not no_delete:
+    if not no_delete and not in_place:
         logging.warning('removing data_filepath "%s"', data_filepath)
         os.remove(data_filepath)
     return bytes_written, elapsed, byte_array
@@ -370,10 +587,14 @@ def write_fulpak(
     log_every=con.LOG_EVERY,
     no_cheat=con.NO_CHEAT,
     no_delete=con.NO_DELETE,
+    in_place=con.IN_PLACE,
+    pattern_name=con.PATTERN_NAME,
+    sync=con.SYNC,
+    sync_every=con.SYNC_EVERY,
     stop_event=con.STOP_EVENT,
     **kwargs
 ):
-    # type: (Optional[bytearray], str, int, int, int, int, bool, bool, threading.Event, Any) -> Tuple[int, float, bytearray]  # noqa: E501
+    # type: (Optional[bytearray], str, int, int, int, int, bool, bool, bool, str, str, int, threading.Event, Any) -> Tuple[int, float, bytearray|memoryview]  # noqa: E501
     '''
     Description:
         Optional bytearray, write it to the disk repeatedly until the disk screams it can't anymore
@@ -399,6 +620,15 @@ def write_fulpak(
             if size > 1MB, simply repeat 1MB until size is filled up
         no_delete: bool
             default False, opt out of self-cleanup
+        in_place: bool
+            default False, data_filepath is a file image or block device: write over it from the start, within its
+                current size, never truncate or remove it
+        pattern_name: str
+            default '', else attach to this pattern_share()d pattern read only rather than making one
+        sync: str
+            default none, when to make what was written durable, see Syncer, elapsed includes it
+        sync_every: int
+            default 64MB, bytes between syncs when sync is bytes
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
         **kwargs: varkwarguments
@@ -407,37 +637,49 @@ def write_fulpak(
         Tuple[int, float, bytearray]
             bytes operated, elapsed in seconds, byte_array
     '''
+    import psutil
     byte_array = get_byte_array(
         byte_array=byte_array,
         data_filepath=data_filepath,
         size=size,
         value=value,
         no_cheat=no_cheat,
+        in_place=in_place,
+        pattern_name=pattern_name,
         stop_event=stop_event
     )
-    if not isinstance(byte_array, bytearray):
-        raise TypeError(f'byte_array must be of type bytearray, provided {type(byte_array)}!')
+    if not isinstance(byte_array, (bytearray, memoryview)):
+        raise TypeError(f'byte_array must be of type bytearray or memoryview, provided {type(byte_array)}!')
     logging.debug('byte_array=%s, data_filepath="%s"', bytes_to_size(len(byte_array)), data_filepath)
     logging.info(
-        'write_fulpak with byte_array of %s, first 32 bytes: %s', bytes_to_size(len(byte_array)), byte_array[0:32]
+        'write_fulpak with byte_array of %s, first 32 bytes: %s', bytes_to_size(len(byte_array)),
+        bytes(byte_array[0:32])
     )
 
     # write the bulk of the data
-    drive_letter, _ = os.path.splitdrive(data_filepath)
+    drive_letter = usage_path(data_filepath)
     size = len(byte_array)
     prior_bytes = 0
     bytes_written = 0
-    touch(data_filepath)
-    start = time.time()
-    with open(data_filepath, 'ab') as wb:
-        while psutil.disk_usage(drive_letter).free > size:
+    capacity = -1
+    if in_place:
+        capacity = target_capacity(data_filepath)
+        logging.info('writing in place over %s of "%s"', bytes_to_size(capacity), data_filepath)
+    else:
+        touch(data_filepath)
+    syncer = Syncer(sync, sync_every)
+    start = timing.ticks()
+    with open(
+        data_filepath, 'r+b' if in_place else 'ab', opener=syncer.opener
+    ) as wb, IOProgress(data_filepath) as progress:
+        while not progress.stopped(stop_event) and free_bytes(data_filepath, capacity, bytes_written) > size:
             for i in range(0, len(byte_array), chunk_size):
-                if stop_event.is_set():
+                if progress.stopped(stop_event):
                     break
-                bytes_written += wb.write(byte_array[i:i + chunk_size])
+                progress.begin('write', bytes_written)
+                bytes_written += syncer.wrote(wb, progress.end(wb.write(byte_array[i:i + chunk_size])))
                 if bytes_written > prior_bytes + log_every:
-                    end = time.time()
-                    elapsed = end - start
+                    elapsed = timing.since(start)
                     if elapsed > 0:
                         throughput = bytes_written / elapsed
                     du = psutil.disk_usage(drive_letter)
@@ -449,12 +691,11 @@ def write_fulpak(
 
         try:
             # write the last chunk in 1mb increments until disk fills and raises OSError
-            for i in range(size // con.MB):
-                if stop_event.is_set():
+            for i in range(max(1, -(-size // con.MB))):
+                if progress.stopped(stop_event):
                     break
                 if bytes_written > prior_bytes + log_every:
-                    end = time.time()
-                    elapsed = end - start
+                    elapsed = timing.since(start)
                     if elapsed > 0:
                         throughput = bytes_written / elapsed
                     du = psutil.disk_usage(drive_letter)
@@ -464,17 +705,27 @@ def write_fulpak(
                     )
                     prior_bytes = bytes_written
 
-                if psutil.disk_usage(drive_letter).free > con.MB:
+                free = free_bytes(data_filepath, capacity, bytes_written)
+                if free > con.MB:
                     one_mb_array = byte_array[i * con.MB:(i + 1) * con.MB]
-                    bytes_written += wb.write(one_mb_array)
+                    progress.begin('write', bytes_written)
+                    bytes_written += syncer.wrote(wb, progress.end(wb.write(one_mb_array)))
+                elif in_place and free > 0:
+                    # an image has no filesystem to fill up and fail, so fill it to the last byte
+                    progress.begin('write', bytes_written)
+                    one_mb_array = byte_array[i * con.MB:i * con.MB + free]
+                    bytes_written += syncer.wrote(wb, progress.end(wb.write(one_mb_array)))
+                    break
                 else:
                     break
         except OSError:
             pass  # this is expected behavior
+        syncer.end(wb)
 
-    end = time.time()
-    bytes_written = os.path.getsize(data_filepath)
-    elapsed = end - start
+    elapsed = timing.since(start)
+    syncer.log(elapsed)
+    if not in_place:
+        bytes_written = os.path.getsize(data_filepath)
     throughput = 0.0
     if elapsed > 0:
         throughput = bytes_written / elapsed
@@ -484,7 +735,7 @@ def write_fulpak(
         bytes_to_size(throughput)
     )
 
-    if not no_delete:
+    if not no_delete and not in_place:
         logging.warning('removing data_filepath "%s"', data_filepath)
         os.remove(data_filepath)
     return bytes_written, elapsed, byte_array
@@ -498,10 +749,12 @@ def read_seq(
     chunk_size=con.CHUNK_SIZE,
     log_every=con.LOG_EVERY,
     no_cheat=con.NO_CHEAT,
+    in_place=con.IN_PLACE,
+    pattern_name=con.PATTERN_NAME,
     stop_event=con.STOP_EVENT,
     **kwargs
 ):
-    # type: (Optional[bytearray], str, int, int, int, int, bool, threading.Event, Any) -> Tuple[int, float, bytearray]  # noqa: E501
+    # type: (Optional[bytearray], str, int, int, int, int, bool, bool, str, threading.Event, Any) -> Tuple[int, float, bytearray|memoryview]  # noqa: E501
     '''
     Description:
         Write a file to the disk, perhaps random, repeatedly, fill the drive, set size, etc.
@@ -529,6 +782,10 @@ def read_seq(
         no_cheat: bool
             default False, if True, dont apply this one neat trick
             if size > 1MB, simply repeat 1MB until size is filled up
+        in_place: bool
+            default False, data_filepath is a file image or block device, never (re)create it
+        pattern_name: str
+            default '', else attach to this pattern_share()d pattern read only rather than making one
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
         **kwargs: varkwarguments
@@ -537,39 +794,42 @@ def read_seq(
         Tuple[int, float, bytearray]
             bytes operated, elapsed in seconds, byte_array
     '''
+    import psutil
     byte_array = get_byte_array(
         byte_array=byte_array,
         data_filepath=data_filepath,
         size=size,
         value=value,
         no_cheat=no_cheat,
+        in_place=in_place,
+        pattern_name=pattern_name,
         stop_event=stop_event
     )
-    if not isinstance(byte_array, bytearray):
-        raise TypeError(f'byte_array must be of type bytearray, provided {type(byte_array)}!')
+    if not isinstance(byte_array, (bytearray, memoryview)):
+        raise TypeError(f'byte_array must be of type bytearray or memoryview, provided {type(byte_array)}!')
     logging.debug(
         'byte_array=%s, data_filepath="%s", chunk_size=%s', bytes_to_size(len(byte_array)), data_filepath,
         bytes_to_size(chunk_size)
     )
     logging.info(
         'read_seq with byte_array of %s, first 32 bytes: %s, chunk_size=%s', bytes_to_size(len(byte_array)),
-        byte_array[0:32], bytes_to_size(chunk_size)
+        bytes(byte_array[0:32]), bytes_to_size(chunk_size)
     )
 
-    drive_letter, _ = os.path.splitdrive(data_filepath)
+    drive_letter = usage_path(data_filepath)
     bytes_read = 0
     prior_bytes = 0
-    start = time.time()
+    start = timing.ticks()
     iiteration = 0
-    with open(data_filepath, 'rb') as rb:
+    with open(data_filepath, 'rb') as rb, IOProgress(data_filepath) as progress:
+        progress.begin('read', 0)
         read_array = rb.read(chunk_size)
-        bytes_read += len(read_array)
+        bytes_read += progress.end(len(read_array))
         while read_array:
-            if stop_event.is_set():
+            if progress.stopped(stop_event):
                 break
             if bytes_read > prior_bytes + log_every:
-                end = time.time()
-                elapsed = end - start
+                elapsed = timing.since(start)
                 if elapsed > 0:
                     throughput = bytes_read / elapsed
                 du = psutil.disk_usage(drive_letter)
@@ -595,11 +855,11 @@ def read_seq(
                     )
                 )
 
+            progress.begin('read', bytes_read)
             read_array = rb.read(chunk_size)
-            bytes_read += len(read_array)
+            bytes_read += progress.end(len(read_array))
 
-    end = time.time()
-    elapsed = end - start
+    elapsed = timing.since(start)
     throughput = 0.0
     if elapsed > 0:
         throughput = bytes_read / elapsed
@@ -620,10 +880,12 @@ def read_rand(
     log_every=con.LOG_EVERY,
     no_cheat=con.NO_CHEAT,
     chunk_size=con.CHUNK_SIZE,
+    in_place=con.IN_PLACE,
+    pattern_name=con.PATTERN_NAME,
     stop_event=con.STOP_EVENT,
     **kwargs
 ):
-    # type: (Optional[bytearray], str, int, int, int, bool, int, threading.Event, Any) -> Tuple[int, float, bytearray]  # noqa: E501
+    # type: (Optional[bytearray], str, int, int, int, bool, int, bool, str, threading.Event, Any) -> Tuple[int, float, bytearray|memoryview]  # noqa: E501
     '''
     Description:
         Read a file by randomly jumping around with seek and reads
@@ -647,6 +909,10 @@ def read_rand(
                 instead of sequentially asserting, randomly dart around the file
                 say the byte_array length 32, data_filepath length 64, chunk_size 4
                 we will generate 64 / 4 = 16 "windows" to jump around and compare
+        in_place: bool
+            default False, data_filepath is a file image or block device, never (re)create it
+        pattern_name: str
+            default '', else attach to this pattern_share()d pattern read only rather than making one
         stop_event: threading.Event
             a way to short circuit exit if stop_event.is_set()
         **kwargs: varkwarguments
@@ -655,24 +921,27 @@ def read_rand(
         Tuple[int, float, bytearray]
             bytes operated, elapsed in seconds, byte_array
     '''
+    import psutil
     byte_array = get_byte_array(
         byte_array=byte_array,
         data_filepath=data_filepath,
         size=size,
         value=value,
         no_cheat=no_cheat,
+        in_place=in_place,
+        pattern_name=pattern_name,
         stop_event=stop_event
     )
-    if not isinstance(byte_array, bytearray):
-        raise TypeError(f'byte_array must be of type bytearray, provided {type(byte_array)}!')
+    if not isinstance(byte_array, (bytearray, memoryview)):
+        raise TypeError(f'byte_array must be of type bytearray or memoryview, provided {type(byte_array)}!')
     logging.debug('byte_array=%s, data_filepath="%s"', bytes_to_size(len(byte_array)), data_filepath)
     logging.info(
         'read_rand chunk_size %s with byte_array of %s, first 32 bytes: %s', bytes_to_size(chunk_size),
-        bytes_to_size(len(byte_array)), byte_array[0:32]
+        bytes_to_size(len(byte_array)), bytes(byte_array[0:32])
     )
 
-    drive_letter, _ = os.path.splitdrive(data_filepath)
-    filesize = os.path.getsize(data_filepath)
+    drive_letter = usage_path(data_filepath)
+    filesize = target_capacity(data_filepath) if in_place else os.path.getsize(data_filepath)
     arrsize = len(byte_array)
     if arrsize % chunk_size != 0:
         raise TypeError(
@@ -683,19 +952,18 @@ def read_rand(
     # [3840, 9600, 1920, 640, 5760, 4480, 2560, 3200, 5120, 7680, 7040, 6400, 8320, 0, 8960, 1280]
     random.shuffle(idxes)
     bytes_read = 0
-    start = time.time()
+    start = timing.ticks()
     prior_bytes = 0
     i_divs = int(math.log10(len(idxes))) - 1
     if i_divs < 0:
         i_divs = 0
     i_divs = 10**i_divs * 5
-    with open(data_filepath, 'rb') as rb:
+    with open(data_filepath, 'rb') as rb, IOProgress(data_filepath) as progress:
         for i, file_idx in enumerate(idxes):
-            if stop_event.is_set():
+            if progress.stopped(stop_event):
                 break
             if bytes_read > prior_bytes + log_every:
-                end = time.time()
-                elapsed = end - start
+                elapsed = timing.since(start)
                 if elapsed > 0:
                     throughput = bytes_read / elapsed
                 du = psutil.disk_usage(drive_letter)
@@ -707,9 +975,10 @@ def read_rand(
             # if i % i_divs == 0:  # this also works very well TODO: good idiom to have
             #     logging.debug('chunk %s / %s', i + 1, len(idxes))
 
+            progress.begin('read', file_idx)
             _ = rb.seek(file_idx)
             read_array = rb.read(chunk_size)
-            bytes_read += len(read_array)
+            bytes_read += progress.end(len(read_array))
 
             truth_idx = file_idx % arrsize
             # in case we're at the LAST idx, and didnt read much
@@ -718,8 +987,7 @@ def read_rand(
                 '\n'.join([f'on iteration {i}, full array read != write!'] + diff_bytes(read_array, truth_array))
             )
 
-    end = time.time()
-    elapsed = end - start
+    elapsed = timing.since(start)
     throughput = 0.0
     if elapsed > 0:
         throughput = bytes_read / elapsed
@@ -70,6 +70,17 @@ Examples:
             >>> --log-every 16MB
         - S.M.A.R.T. frequency
             >>> --poll 3
+        - S.M.A.R.T. collector in a thread rather than its own process
+            >>> --telemetry-mode thread
+        - S.M.A.R.T. from smartctl rather than CrystalDiskInfo (default off of windows)
+            >>> --smart-source smartctl
+        - stop a drive as soon as its uncorrectables go up by 10, or its health drops below 50%
+            >>> --smart-rules '[{"name": "errors", "keys": ["Uncorrectable Error Count"], "delta": 10},
+            >>>     {"name": "life", "health_percent": 50}]'
+        - S.M.A.R.T. watchdog off
+            >>> --smart-rules []
+        - give up on the step if a single read/write hangs 30 sec or throughput averages < 10MB/s for a minute
+            >>> --stall-seconds 30 --throughput-floor 10MB --floor-window 60 --stall-action cancel
 
     - telemetry
         - loop
@@ -125,9 +136,60 @@ Examples:
             >>>     --flow-duration 60 `
             >>>     --data-filepath I:/tmp --size 4GB --value 69 --chunk-size 64MB --log-every 512MB
 
+        - the same flow against 3 drives at once, one pattern, each stops on its own, ctrl + c stops all
+            >>> python main.py flow --steps write_burnin read_seq --flow-iterations 3 --size 1GB `
+            >>>     --data-filepath D:/tmp.dat --flow-targets E:/tmp.dat F:/tmp.dat
+
+        - random 4KB reads at 1, 8 and 32 deep with 1 and 4 jobs, resumable
+            >>> python main.py sweep --sweep-step io_workload --rw read --access rand --size 1GB --duration 10 `
+            >>>     --sweep-chunk-sizes 4KB --sweep-iodepths 1 8 32 --sweep-numjobs 1 4 `
+            >>>     --sweep-filepath D:/sweep.csv
+
+        - CrystalDiskMark's default profile, numbers comparable with its grid
+            >>> python main.py suite --data-filepath D:/CDM.dat
+            >>> python main.py suite --data-filepath D:/CDM.dat --size 8GB --suite-runs 3 --suite-rest 10
+
+        - the best random 4KB-ish reads that keep p99 under 2ms on D:, then burn in D: with what it found
+            >>> python main.py autotune --data-filepath D:/tune.dat --rw read --access rand `
+            >>>     --autotune-objective iops --autotune-slo 2000
+            >>> python main.py write_burnin --data-filepath D:/tmp.dat --size 4GB --tuned
+
+        - 100k files of 4KB to 64KB, each one synced, 8 threads, files/s and latency per create/read/delete
+            >>> python main.py smallfiles --data-filepath D:/tmp.dat --smallfiles-count 100000 `
+            >>>     --smallfiles-sizes 4KB 64KB --sync end --numjobs 8 --tree-depth 3 --tree-fanout 8
+
+        - writes that are actually on the disk when elapsed stops, sync time is reported apart from write time
+            >>> python main.py write_burnin --data-filepath D:/tmp.dat --size 4GB --sync end
+            >>> python main.py write_fulpak --data-filepath D:/tmp.dat --sync bytes --sync-every 256MB
+            >>> python main.py io_workload --data-filepath D:/tmp.dat --size 1GB --rw write --access rand `
+            >>>     --chunk-size 4KB --iodepth 8 --sync op
+
+        - mkdir, create, stat, readdir, rename, unlink and rmdir per second, 16 threads over a 4 deep tree
+            >>> python main.py metadata --data-filepath D:/tmp.dat --metadata-count 200000 --numjobs 16 `
+            >>>     --tree-depth 4 --tree-fanout 8
+
+    - calibration
+        - the tool's own ceiling, every workload and engine against /dev/null, /dev/zero and tmpfs, once per machine
+            >>> python main.py calibrate --no-telemetry
+        - from then on results are annotated with their percent of it, near 100% is the tool, not the disk
+            >>> python main.py read_seq --data-filepath D:/tmp.dat --size 4GB
+
+    - results
+        - every step of every run lands in one database (--results-filepath, --no-results to not), compare them
+            >>> python main.py compare
+        - just two drives, against a known good run, flag anything 5% worse
+            >>> python main.py compare --compare-devices S6B0NL0T123456 S6B0NL0T654321 `
+            >>>     --compare-baseline 20250801-120000-bench01-4242 --compare-threshold 0.05
+
     - benchmarks
         - health: WARNING delete all partitions that arent in active use, run 3x fulpak write read
             >>> python main.py health
+        - health without admin or repartitioning: a mounted folder, a file image, a raw block device (in place)
+            >>> python main.py health --targets /mnt/scratch /tmp/disk.img /dev/sdb
+        - 16+ drives, each worker on its own cores rather than all of them fighting over the same ones
+            >>> python main.py health --pin-workers
+        - one flow written over an existing image rather than a fresh file
+            >>> python main.py write_fulpak --data-filepath /tmp/disk.img --in-place
 
 TODO:
     write_burnin needs
@@ -153,6 +215,10 @@ import smart
 import system
 import flow
 import stdlib
+import report
+import watchdog
+import workload
+import results
 
 SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
 
@@ -169,6 +235,65 @@ ARGUMENTS = {
         dict(type=str, default=con.CHUNK_SIZE, help='default -1, MUST evenly divide size, friendly', argtype='str-int'),
     'flow_iterations': dict(type=int, default=con.FLOW_ITERATIONS, help='repetitions, -1 for infinitely'),
     'flow_duration': dict(type=float, default=con.FLOW_DURATION, help='in seconds, -1 for infinitely'),
+    'rw': dict(type=str, default=con.RW, choices=con.RWS, help='io_workload reads or writes'),
+    'access': dict(type=str, default=con.ACCESS, choices=con.ACCESSES, help='io_workload in order or at random'),
+    'iodepth': dict(type=int, default=con.IODEPTH, help='io_workload ops each job keeps in flight'),
+    'numjobs': dict(type=int, default=con.NUMJOBS, help='io_workload independent jobs, smallfiles/metadata threads'),
+    'engine': dict(type=str, default=con.ENGINE, choices=con.ENGINES, help='io_workload, auto for the fastest'),
+    'smallfiles_count': dict(type=int, default=con.SMALLFILES_COUNT, help='files smallfiles makes'),
+    'smallfiles_sizes':
+        dict(type=str, nargs='*', default=con.SMALLFILES_SIZES, help='ex) 4KB 64KB, in turn', argtype='str-ints'),
+    'metadata_count': dict(type=int, default=con.METADATA_COUNT, help='files metadata makes'),
+    'tree_depth': dict(type=int, default=con.TREE_DEPTH, help='levels of directories smallfiles/metadata make'),
+    'tree_fanout': dict(type=int, default=con.TREE_FANOUT, help='directories per level'),
+    'sync': dict(type=str, default=con.SYNC, choices=con.SYNCS, help='when writes are made durable, timed apart'),
+    'sync_every': dict(type=str, default=con.SYNC_EVERY, help='bytes between --sync bytes syncs', argtype='str-int'),
+    'suite_runs': dict(type=int, default=con.SUITE_RUNS, help='runs of every suite test, the best counts'),
+    'suite_duration': dict(type=float, default=con.SUITE_DURATION, help='seconds per suite run'),
+    'suite_rest': dict(type=float, default=con.SUITE_REST, help='seconds between suite runs'),
+    'autotune_objective':
+        dict(
+            type=str, default=con.AUTOTUNE_OBJECTIVE, choices=con.AUTOTUNE_OBJECTIVES, help='what autotune maximizes'
+        ),
+    'autotune_slo': dict(type=float, default=con.AUTOTUNE_SLO, help='p99 usec autotune must stay under, -1 for none'),
+    'autotune_trial': dict(type=float, default=con.AUTOTUNE_TRIAL, help='seconds per autotune trial'),
+    'autotune_chunk_sizes':
+        dict(type=str, nargs='*', default=con.AUTOTUNE_CHUNK_SIZES, help='ex) 4KB 64KB 1MB', argtype='str-ints'),
+    'autotune_iodepths': dict(type=int, nargs='*', default=con.AUTOTUNE_IODEPTHS, help='ex) 1 8 32'),
+    'autotune_numjobs': dict(type=int, nargs='*', default=con.AUTOTUNE_NUMJOBS, help='ex) 1 4 16'),
+    'results_filepath':
+        dict(type=str, default=con.RESULTS_FILEPATH, help='sqlite every step result lands in', argtype='path'),
+    'no_results': dict(type=bool, help='dont record step results in results_filepath'),
+    'compare_baseline': dict(type=str, default=con.COMPARE_BASELINE, help='a run_id, default the median of earlier'),
+    'compare_threshold':
+        dict(type=float, default=con.COMPARE_THRESHOLD, help='fraction worse than the baseline that is a regression'),
+    'compare_devices': dict(type=str, nargs='*', default=con.COMPARE_DEVICES, help='serials (or targets) to compare'),
+    'calibrate_chunk_sizes':
+        dict(type=str, nargs='*', default=con.CALIBRATE_CHUNK_SIZES, help='ex) 4KB 64KB 1MB', argtype='str-ints'),
+    'calibrate_duration': dict(type=float, default=con.CALIBRATE_DURATION, help='seconds per calibration cell'),
+    'calibration_filepath':
+        dict(type=str, default=con.CALIBRATION_FILEPATH, help='the tool ceilings calibrate found', argtype='path'),
+    'tuned': dict(type=bool, help='use the chunk size, iodepth and numjobs autotune found for the target'),
+    'tuned_filepath':
+        dict(type=str, default=con.TUNED_FILEPATH, help='where autotune keeps what it found', argtype='path'),
+    'sweep_step': dict(type=str, default=con.SWEEP_STEPS[0], choices=con.SWEEP_STEPS, help='the workload to sweep'),
+    'sweep_sizes':
+        dict(type=str, nargs='*', default=con.SWEEP_SIZES, help='sizes, friendly, ex) 1GB 4GB', argtype='str-ints'),
+    'sweep_chunk_sizes':
+        dict(type=str, nargs='*', default=con.SWEEP_CHUNK_SIZES, help='ex) 4KB 128KB 1MB', argtype='str-ints'),
+    'sweep_iodepths': dict(type=int, nargs='*', default=con.SWEEP_IODEPTHS, help='ex) 1 8 32'),
+    'sweep_numjobs': dict(type=int, nargs='*', default=con.SWEEP_NUMJOBS, help='ex) 1 4 16'),
+    'sweep_only': dict(type=str, help='only these cells, ex) [{"iodepth": 1}, {"chunk_size": "4KB"}]', argtype='json'),
+    'sweep_filepath':
+        dict(type=str, default=con.SWEEP_FILEPATH, help='results csv, pass an old one to resume', argtype='path'),
+    'flow_targets':
+        dict(type=str, nargs='*', default=con.FLOW_TARGETS, help='more data filepaths, all run at the same time'),
+    'flow_outliers':
+        dict(type=float, default=con.FLOW_OUTLIERS, help='drop iterations past this modified z-score, -1 to keep all'),
+    'flow_ci_max':
+        dict(type=float, default=con.FLOW_CI_MAX, help='warn if the 95%% confidence interval is wider, of the mean'),
+    'flow_report_every':
+        dict(type=float, default=con.FLOW_REPORT_EVERY, help='seconds between per target throughput logs'),
     'flow_no_delete_end': dict(type=bool, help='for convenience, --no-delete is set low for subflows, force high?'),
     'byte_array': dict(type=bytearray, default=None, help='WARNING: cannot be passed via cli'),
     'ignore_partitions':
@@ -181,6 +306,10 @@ ARGUMENTS = {
     'disk_number_to_letter_dict': dict(type=str, help='pass as string, ex) {"1": "D:"}', argtype='json'),
     'log_every': dict(type=str, default='4GB', help='i/o log frequency, every X bytes', argtype='str-int'),
     'no_delete': dict(type=bool, help='default False, after operation, self-cleanup'),
+    'pattern_name': dict(type=str, default=con.PATTERN_NAME, help='attach to this shared memory pattern, see health'),
+    'in_place': dict(type=bool, help='data_filepath is a file image or block device, write over it, never remove'),
+    'targets':
+        dict(type=str, nargs='*', default=con.TARGETS, help='dirs/devices/images, skip repartitioning'),
     'no_cheat': dict(type=bool, help='default False, if True, dont apply this trick: if size > 1MB, simply repeat 1MB'),
     'stop_event':
         dict(type=threading.Event, default=con.STOP_EVENT, help='WARNING: cannot be passed via cli', argtype='lock'),
@@ -190,18 +319,47 @@ ARGUMENTS = {
     'no_telemetry': dict(type=bool, help='skip telemetry entirely'),
     'no_admin': dict(type=bool, help='do what you can without admin'),
     'no_crystaldiskinfo': dict(type=bool, help='if disabled, you can run without admin!'),
+    'smart_source':
+        dict(type=str, default=con.SMART_SOURCE, choices=con.SMART_SOURCES, help='where S.M.A.R.T. comes from'),
+    'telemetry_mode':
+        dict(
+            type=str,
+            default=con.TELEMETRY_MODE,
+            choices=con.TELEMETRY_MODES,
+            help='run the collector in its own process, or a thread in this one'
+        ),
+    'smart_rules':
+        dict(type=str, default=con.SMART_RULES, help='json S.M.A.R.T. watchdog rules, [] to disable', argtype='json'),
+    'incident_filepath':
+        dict(type=str, default=con.INCIDENT_FILEPATH, help='S.M.A.R.T. watchdog incidents (jsonl)', argtype='path'),
+    'on_sample': dict(type=object, default=None, help='WARNING: cannot be passed via cli', argtype='callback'),
+    # i/o watchdog
+    'stall_seconds': dict(type=float, default=con.STALL_SECONDS, help='a read/write slower than this is a stall'),
+    'throughput_floor':
+        dict(type=str, default=con.THROUGHPUT_FLOOR, help='bytes/s over floor_window, ex) 10MB', argtype='str-int'),
+    'floor_window': dict(type=float, default=con.FLOOR_WINDOW, help='seconds throughput_floor is averaged over'),
+    'stall_action':
+        dict(type=str, default=con.STALL_ACTION, choices=con.STALL_ACTIONS, help='on a stall or throughput collapse'),
     'smart_filepath':
         dict(type=str, default=con.SMART_FILEPATH, help='dump S.M.A.R.T. from CrystalDiskInfo.', argtype='path'),
     'summary_filepath': dict(type=str, default=con.SUMMARY_FILEPATH, help='afteraction summary', argtype='path'),
     'log_level': dict(type=str, default=con.LOG_LEVEL, choices=con.LOG_LEVELS, help='log level'),
     'log_format': dict(type=str, default=con.LOG_FORMAT, help='log format'),
+    'report_every':
+        dict(type=float, default=con.REPORT_EVERY, help='seconds between json progress reports on stdout, for health'),
+    'worker_report_every': dict(type=float, default=5.0, help='seconds between progress reports from each worker'),
+    'worker_timeout': dict(type=float, default=-1, help='kill any worker still going after this many seconds'),
+    'pin_workers': dict(type=bool, help='give every health worker its own cores (topology aware), default float'),
+    'cpus': dict(type=int, nargs='*', default=con.CPUS, help='pin to these logical cpus, i/o threads included'),
 }  # type: Dict[str, dict]
 ARGUMENT_TYPES = {
     # special
     'str-int': [],
+    'str-ints': [],
     'json': [],
     'path': [],
     'lock': [],
+    'callback': [],
     # choices
     'choice': [],
     'choices': [],
@@ -243,8 +401,10 @@ for k, v in ARGUMENTS.items():
     else:
         ARGUMENT_TYPES['singleton'].append(k)
 ARGUMENT_TO_TYPE = {val: key for key, lst in ARGUMENT_TYPES.items() for val in lst}
-TELEMETRY_SIGNATURE = inspect.signature(smart.telemetry_thread)
+TELEMETRY_SIGNATURE = inspect.signature(smart.telemetry_start)
 TELEMETRY_PARAMETERS = TELEMETRY_SIGNATURE.parameters
+WATCHDOG_SIGNATURE = inspect.signature(watchdog.io_watchdog_start)
+WATCHDOG_PARAMETERS = WATCHDOG_SIGNATURE.parameters
 
 
 def validate_kwargs(args):
@@ -263,6 +423,8 @@ def validate_kwargs(args):
         default = argument_kwargs.get('default', None)
         if argument_type == 'str-int':
             value = stdlib.validate_str_int(argument, v, default=default)
+        elif argument_type == 'str-ints':
+            value = [stdlib.validate_str_int(argument, ele) for ele in v]
         elif argument_type == 'json':
             value = stdlib.validate_json(argument, v)
         elif argument_type == 'path':
@@ -270,6 +432,9 @@ def validate_kwargs(args):
         elif argument_type == 'lock':
             # contains dangerous objects like unpicklables and concurrent primitives
             value = default or type_()
+        elif argument_type == 'callback':
+            # same deal, only ever wired up in code
+            value = v if callable(v) else default
         elif argument_type == 'choice':
             value = stdlib.validate_choice(argument, v, argument_kwargs['choices'])
         elif argument_type == 'choices':
@@ -300,11 +465,30 @@ def post_process_kwargs(args):
             logging.debug('setting no_delete to True thanks to flow_no_delete_end False')
             kwargs['no_delete'] = True
         setattr(args, 'no_delete', kwargs['no_delete'])
-
-
-def config(log_format=con.LOG_FORMAT, log_level=con.LOG_LEVEL, **kwargs):
-    # type: (str, str, Any) -> None
+    if kwargs.get('no_results'):
+        kwargs['results_filepath'] = ''
+    if kwargs.get('tuned'):
+        workload.tuned_apply(kwargs, tuned_filepath=kwargs['tuned_filepath'])
+
+
+def config(
+    log_format=con.LOG_FORMAT,
+    log_level=con.LOG_LEVEL,
+    report_every=con.REPORT_EVERY,
+    cpus=con.CPUS,
+    tuned=con.TUNED,
+    tuned_filepath=con.TUNED_FILEPATH,
+    results_filepath=con.RESULTS_FILEPATH,
+    no_results=con.NO_RESULTS,
+    calibration_filepath=con.CALIBRATION_FILEPATH,
+    **kwargs
+):
+    # type: (str, str, float|int, List[int], bool, str, str, bool, str, Any) -> None
+    # the rest land in the step's kwargs as they are, or by way of post_process_kwargs
     logging.basicConfig(format=log_format, level=log_level, stream=sys.stdout, force=True)
+    # before any thread starts, so they all inherit it
+    system.cpu_pin(cpus)
+    report.enable(report_every=report_every)
 
 
 CONFIG_PARAMETERS = inspect.signature(config).parameters
@@ -313,7 +497,7 @@ CONFIG_PARAMETERS = inspect.signature(config).parameters
 ALLOW_KIND = {
     inspect._POSITIONAL_OR_KEYWORD,  # type: ignore
 }  # SKIP_KIND = (inspect._VAR_POSITIONAL, inspect._VAR_KEYWORD)
-_ALL_FUNCS = flow.FUNCS + [config]
+_ALL_FUNCS = flow.FUNCS + [config, smart.telemetry_start, watchdog.io_watchdog_start]
 for _func in _ALL_FUNCS:
     _sig = inspect.signature(_func)
     for _k in _sig.parameters:
@@ -355,6 +539,8 @@ def add_argument_to_group_by_func(argument, group, parameters, prepend='--', inc
 def main():
     parser = argparse.ArgumentParser(prog=con.APP_NAME, description=__doc__, formatter_class=stdlib.NiceFormatter)
     operations = parser.add_subparsers(help='different operations we can do')
+    # only the operation asked for gets its arguments, building every operation's costs more than running most of them
+    operation = next((arg for arg in sys.argv[1:] if not arg.startswith('-')), '')
 
     for func in flow.FUNCS:
         op = operations.add_parser(
@@ -364,11 +550,13 @@ def main():
             formatter_class=stdlib.NiceFormatter,
         )
         op.set_defaults(func=func)
+        if func.__name__ != operation:
+            continue
 
-        if func is flow.flow:
+        if func in (flow.flow, flow.sweep):
             # forcibly graft on every single variant of parameter for every flow option
             for flow_func in flow.FUNCS:
-                if flow_func is flow.flow:
+                if flow_func in (flow.flow, flow.sweep):
                     continue
                 group = op.add_argument_group(f'flow - {flow_func.__name__}')
                 parameters = inspect.signature(flow_func).parameters
@@ -387,27 +575,33 @@ def main():
         operation_parameters = inspect.signature(func).parameters
         operation_group = op.add_argument_group('operation')
         telemetry_group = op.add_argument_group('telemetry')
+        watchdog_group = op.add_argument_group('watchdog')
         config_group = op.add_argument_group('config')
 
         for argument in ARGUMENTS:
             # in case we have to modify, and deepcopy doesnt work on lock objects
-            exists_in_one_of_three_places = False
+            exists_in_one_of_four_places = False
             if argument in operation_parameters:
                 group = operation_group
                 parameters = operation_parameters
                 if argument in parameters:
-                    exists_in_one_of_three_places = True
+                    exists_in_one_of_four_places = True
             elif argument in TELEMETRY_PARAMETERS:
                 group = telemetry_group
                 parameters = TELEMETRY_PARAMETERS
                 if argument in parameters:
-                    exists_in_one_of_three_places = True
+                    exists_in_one_of_four_places = True
+            elif argument in WATCHDOG_PARAMETERS:
+                group = watchdog_group
+                parameters = WATCHDOG_PARAMETERS
+                if argument in parameters:
+                    exists_in_one_of_four_places = True
             else:
                 group = config_group
                 parameters = CONFIG_PARAMETERS
                 if argument in parameters:
-                    exists_in_one_of_three_places = True
-            if not exists_in_one_of_three_places:
+                    exists_in_one_of_four_places = True
+            if not exists_in_one_of_four_places:
                 continue
 
             add_argument_to_group_by_func(argument, group, parameters, prepend='--', include_underscore=False)
@@ -426,7 +620,13 @@ def main():
         k: kwargs[k]
         for k in TELEMETRY_PARAMETERS if stdlib.is_optional_with_default(TELEMETRY_SIGNATURE, k)
     }
+    # the latest poll, so results can say which drive and how its S.M.A.R.T. moved
+    telemetry_thread_kwargs['on_sample'] = watchdog.chain(results.sample, telemetry_thread_kwargs.get('on_sample'))
     logging.debug('telemetry_thread_kwargs:\n%s', pprint.pformat(telemetry_thread_kwargs, indent=2))
+    watchdog_kwargs = {
+        k: kwargs[k]
+        for k in WATCHDOG_PARAMETERS if stdlib.is_optional_with_default(WATCHDOG_SIGNATURE, k)
+    }
 
     # func_signature = inspect.signature(func)
     # func_parameters = func_signature.parameters
@@ -440,13 +640,23 @@ def main():
         if not any(
             [
                 func is flow.flow and 'telemetry' in args.steps,
-                func in {smart.telemetry, smart.telemetry_loop, system.create_partitions, system.delete_partitions},
+                func in {
+                    smart.telemetry, smart.telemetry_loop, system.create_partitions, system.delete_partitions,
+                    results.compare, workload.calibrate
+                },
             ]
         ):
-            thread = smart.telemetry_thread(**telemetry_thread_kwargs)
+            thread = smart.telemetry_start(**telemetry_thread_kwargs)
+        watchdog.io_watchdog_start(**watchdog_kwargs)
 
         logging.info('starting %r', func.__name__)
-        func(**kwargs)  # **func_kwargs
+        report.step(func.__name__)
+        results.recorded(
+            func,
+            kwargs,  # **func_kwargs
+            results_filepath=kwargs.get('results_filepath', ''),
+            calibration_filepath=kwargs.get('calibration_filepath', ''),
+        )
     except KeyboardInterrupt:
         logging.warning('ctrl + c detected!')
         logging.debug('ctrl + c detected!', exc_info=True)
@@ -464,6 +674,7 @@ def main():
             logging.info('success!')
         else:
             logging.error('failure!')
+        report.emit('done', success=success, cpu_seconds=report.cpu_seconds())
 
 
 if __name__ == '__main__':
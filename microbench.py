@@ -0,0 +1,415 @@
+'''
+Description:
+    benchmarks of the tool itself rather than of the disks, nothing here touches a real drive
+
+Examples:
+    - everything
+        >>> python microbench.py
+    - just the summary at 2 million rows
+        >>> python microbench.py summarize_crystaldiskinfo_df --rows 2000000
+    - i/o latency jitter with telemetry off, in a thread, in a process
+        >>> python microbench.py telemetry_jitter --duration 10 --poll 0.25
+    - the per chunk overhead of every input_output workload against tmpfs
+        >>> python microbench.py io_loops --size 64MB
+    - how long every operation of main.py takes to get as far as --help, and how much of that is imports
+        >>> python microbench.py startup
+    - save a baseline, then later, anything more than 25% slower than it fails
+        >>> python microbench.py --baseline microbench.json --save
+        >>> python microbench.py --baseline microbench.json --tolerance 0.25
+'''
+# stdlib
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import argparse
+import subprocess
+from typing import Callable, Dict, List, Any  # noqa: F401
+
+# third party
+import numpy as np
+import pandas as pd
+
+# app
+import constants
+import stdlib
+import timing
+
+SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+BENCHMARKS = {}  # type: Dict[str, Callable]
+# which way is better, by the end of a metric's name, see compare
+HIGHER_IS_BETTER = ('_per_sec', )
+LOWER_IS_BETTER = ('_ns', '_us', 'elapsed')
+
+
+def benchmark(func):
+    # type: (Callable) -> Callable
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def synthetic_smart_df(rows=1000000, drives=24):
+    # type: (int, int) -> pd.DataFrame
+    '''
+    Description:
+        telemetry shaped like a long multi-drive soak, "Host Reads" style unit strings and all
+    '''
+    per_drive = rows // drives
+    drive = np.repeat(np.arange(drives), per_drive)
+    tick = np.tile(np.arange(per_drive), drives)
+    reads = (1000 + tick * 3).astype(str)
+    writes = (2000 + tick * 5).astype(str)
+    return pd.DataFrame(
+        {
+            'datetime': pd.Timestamp('2025-01-01') + pd.to_timedelta(tick * 3, unit='s'),
+            'Drive Letter': np.char.add(np.array(['D', 'E', 'F', 'G'])[drive % 4], ':'),
+            'Health Status': 'Good (100 %)',
+            'Disk Number': drive,
+            'Model': 'SYNTHETIC',
+            'Serial Number': np.char.add('SERIAL', drive.astype(str)),
+            'Disk Size': '7681.4 GB',
+            'Transfer Mode': 'PCIe 3.0 x4 | PCIe 3.0 x4',
+            'Power On Count': '91 count',
+            'Host Reads': np.char.add(reads, ' GB'),
+            'Host Writes': np.char.add(writes, ' GB'),
+            'Uncorrectable Error Count': tick // (per_drive // 2 or 1),
+        }
+    )
+
+
+@benchmark
+def bench_summarize_crystaldiskinfo_df(rows=1000000, drives=24, **kwargs):
+    # type: (int, int, Any) -> dict
+    import smart
+    df = synthetic_smart_df(rows=rows, drives=drives)
+    start = time.perf_counter()
+    summary = smart.summarize_crystaldiskinfo_df(df)
+    elapsed = time.perf_counter() - start
+    assert len(summary) == drives, 'one row per drive'
+    return dict(rows=len(df), elapsed=elapsed, rows_per_sec=len(df) / elapsed)
+
+
+def timed(func, repeat=1):
+    # type: (Callable[[], Any], int) -> float
+    '''
+    Description:
+        best of repeat runs of func(), in seconds, the best being the one the least got in the way of
+        a run of something sub-millisecond is a batch of calls, see timing.batched
+    '''
+    return min(timing.batched(func)[0] for _ in range(repeat))
+
+
+@benchmark
+def bench_create_bytearray(repeat=3, **kwargs):
+    # type: (int, Any) -> dict
+    from input_output import create_bytearray
+    results = {}
+    for pattern, size, value, no_cheat in [
+        ('random', constants.MB, constants.VALUE, True),
+        ('constant', constants.MB, 0x45, True),
+        # past 1MB its 1MB repeated, see create_bytearray
+        ('random_repeated', 64 * constants.MB, constants.VALUE, False),
+    ]:
+        elapsed = timed(lambda: create_bytearray(size, value=value, no_cheat=no_cheat), repeat=repeat)
+        results[pattern] = dict(size=size, elapsed=elapsed, bytes_per_sec=size / elapsed)
+    return results
+
+
+@benchmark
+def bench_diff_bytes(repeat=3, **kwargs):
+    # type: (int, Any) -> dict
+    left = bytes(np.random.randint(0, 256, size=constants.MB, dtype=np.uint8))
+    right = bytes(left)
+    elapsed = timed(lambda: stdlib.diff_bytes(left, right), repeat=repeat)  # equal, so it looks at every byte
+    return dict(size=len(left), elapsed=elapsed, bytes_per_sec=len(left) / elapsed)
+
+
+@benchmark
+def bench_crystaldiskinfo_parse(repeat=3, **kwargs):
+    # type: (int, Any) -> dict
+    '''
+    Description:
+        every DiskInfo.txt in notes/, parsed back to back
+    '''
+    import smart
+    texts = []
+    for filepath in sorted(glob.glob(os.path.join(SCRIPT_DIRPATH, 'notes', '**', '*.txt'), recursive=True)):
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as r:
+            texts.append(r.read())
+    assert texts, 'notes/ has the DiskInfo.txt samples'
+    loops = 20
+
+    def parse_all():
+        for _ in range(loops):
+            for text in texts:
+                smart.crystaldiskinfo_parse(text)
+
+    elapsed = timed(parse_all, repeat=repeat)
+    return dict(texts=len(texts), elapsed=elapsed, parse_us=elapsed / (loops * len(texts)) * 1e6)
+
+
+@benchmark
+def bench_size_units(repeat=3, **kwargs):
+    # type: (int, Any) -> dict
+    calls = 100000
+    sizes = ['512mb', '1024.123 gb', '4KB', '69', '0x1000', '7TB']
+    values = [float(ele) for ele in np.random.randint(0, 2**50, size=len(sizes))]
+    convert = timed(lambda: [stdlib.size_unit_convert(sizes[i % len(sizes)]) for i in range(calls)], repeat=repeat)
+    to_size = timed(lambda: [stdlib.bytes_to_size(values[i % len(values)]) for i in range(calls)], repeat=repeat)
+    return dict(size_unit_convert_ns=convert / calls * 1e9, bytes_to_size_ns=to_size / calls * 1e9)
+
+
+@benchmark
+def bench_io_loops(size=16 * constants.MB, dirpath=constants.TMPFS_DIRPATH, **kwargs):
+    # type: (int, str, Any) -> dict
+    '''
+    Description:
+        every input_output workload against a file in tmpfs, where the drive costs next to nothing and whats left
+        is the loop, per chunk at 4KB (mostly overhead) and throughput at 1MB (mostly memcpy)
+        write_fulpak goes in place over a fixed size image, it'd fill tmpfs otherwise
+    '''
+    import input_output
+    byte_array = input_output.create_bytearray(size, value=0x45)
+    data_filepath = os.path.join(dirpath, f'microbench-{os.getpid()}.dat')
+    results = {}  # type: Dict[str, dict]
+    try:
+        for func in [
+            input_output.write_burnin, input_output.write_fulpak, input_output.read_seq, input_output.read_rand
+        ]:
+            results[func.__name__] = {}
+            in_place = func is input_output.write_fulpak
+            for chunk_size in [4 * constants.KB, constants.MB]:
+                with open(data_filepath, 'wb') as wb:
+                    # reads verify against byte_array, fulpak writes in place until 4x its size is full
+                    wb.write(byte_array)
+                    if in_place:
+                        wb.truncate(4 * size)
+                start = time.perf_counter()
+                bytes_io, _, _ = func(
+                    byte_array=byte_array, data_filepath=data_filepath, size=size, chunk_size=chunk_size,
+                    no_delete=True, in_place=in_place
+                )
+                elapsed = time.perf_counter() - start
+                results[func.__name__][stdlib.bytes_to_size(chunk_size, space=False).replace('.000', '')] = dict(
+                    bytes=bytes_io,
+                    elapsed=elapsed,
+                    bytes_per_sec=bytes_io / elapsed,
+                    chunk_ns=elapsed / (bytes_io / chunk_size) * 1e9,
+                )
+    finally:
+        if os.path.isfile(data_filepath):
+            os.remove(data_filepath)
+    return results
+
+
+def import_us(stderr):
+    # type: (str) -> int
+    '''
+    Description:
+        total of the top level imports in python -X importtime output, the nested ones are already in their parents
+    '''
+    total = 0
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and len(fields) == 3 and not fields[2][1:].startswith(' '):
+            cumulative = fields[1].strip()
+            total += int(cumulative) if cumulative.isdigit() else 0
+    return total
+
+
+@benchmark
+def bench_startup(repeat=3, **kwargs):
+    # type: (int, Any) -> dict
+    '''
+    Description:
+        python main.py <operation> --help for every operation, interpreter start, imports and the parser included
+        every health worker pays this, so does every run of a short one like create
+    '''
+    import flow
+    main_filepath = os.path.join(SCRIPT_DIRPATH, 'main.py')
+    results = {}
+    for func in flow.FUNCS:
+        cmd = [sys.executable, main_filepath, func.__name__, '--help']
+        elapsed = timed(lambda: subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True), repeat=repeat)
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + cmd[1:], capture_output=True, text=True, check=True
+        )
+        results[func.__name__] = dict(elapsed=elapsed, import_us=import_us(proc.stderr))
+    return results
+
+
+def latency_stats(latencies):
+    # type: (List[float]) -> dict
+    arr = np.asarray(latencies) * 1e6  # usec
+    return dict(
+        ops=len(arr),
+        mean_us=float(arr.mean()),
+        stdev_us=float(arr.std()),
+        p99_us=float(np.percentile(arr, 99)),
+        max_us=float(arr.max()),
+    )
+
+
+def hot_loop(filepath, duration=5.0, chunk_size=constants.MB):
+    # type: (str, float, int) -> List[float]
+    '''
+    Description:
+        stand-in for the write loop in input_output, returns the latency of every write
+    '''
+    chunk = os.urandom(chunk_size)
+    latencies = []
+    with open(filepath, 'wb') as wb:
+        end = time.perf_counter() + duration
+        while True:
+            start = time.perf_counter()
+            if start > end:
+                break
+            wb.write(chunk)
+            wb.seek(0)
+            latencies.append(time.perf_counter() - start)
+    os.remove(filepath)
+    return latencies
+
+
+@benchmark
+def bench_telemetry_jitter(duration=5.0, poll=0.25, **kwargs):
+    # type: (float, float, Any) -> dict
+    '''
+    Description:
+        latency variance of the hot i/o loop with no telemetry, telemetry in a thread, and telemetry in a process
+        S.M.A.R.T. comes from the recorded smartctl stand-in in tests/data/smartctl, polled much harder than normal
+    '''
+    import tempfile
+    import threading
+    import smart
+    exe = constants.SMARTCTL_EXE
+    constants.SMARTCTL_EXE = os.path.join(SCRIPT_DIRPATH, 'tests', 'data', 'smartctl', 'smartctl')
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tempdir:
+            for mode in ['none', 'thread', 'process']:
+                stop_event = threading.Event()
+                loop_kwargs = dict(
+                    poll=poll,
+                    all_drives=True,
+                    smart_source='smartctl',
+                    smart_filepath=os.path.join(tempdir, mode, 'smart.csv'),
+                    summary_filepath=os.path.join(tempdir, mode, 'summary.csv'),
+                )
+                collector = None
+                if mode == 'thread':
+                    collector = threading.Thread(
+                        target=smart.telemetry_loop, kwargs=dict(stop_event=stop_event, **loop_kwargs)
+                    )
+                    collector.start()
+                elif mode == 'process':
+                    collector = smart.telemetry_spawn(loop_kwargs, stop_event=stop_event)
+                    time.sleep(2)  # let the interpreter spawn and settle, thats a one time cost
+                try:
+                    latencies = hot_loop(os.path.join(tempdir, 'data.dat'), duration=duration)
+                finally:
+                    stop_event.set()
+                    if collector:
+                        collector.join()
+                results[mode] = latency_stats(latencies)
+    finally:
+        constants.SMARTCTL_EXE = exe
+    return results
+
+
+def run(names=None, **kwargs):
+    # type: (List[str]|None, Any) -> Dict[str, dict]
+    results = {}
+    for name in names or list(BENCHMARKS):
+        logging.info('benchmarking %r...', name)
+        results[name] = BENCHMARKS[name](**kwargs)
+        logging.info('%s: %s', name, results[name])
+    return results
+
+
+def flatten(results, prefix=''):
+    # type: (dict, str) -> Dict[str, float]
+    '''
+    Description:
+        >>> flatten({'io_loops': {'read_seq': {'4KB': {'chunk_ns': 900.0}}}})
+        >>> # {'io_loops.read_seq.4KB.chunk_ns': 900.0}
+    '''
+    flat = {}  # type: Dict[str, float]
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix=f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f'{prefix}{key}'] = float(value)
+    return flat
+
+
+def compare(results, baseline, tolerance=0.25):
+    # type: (Dict[str, dict], Dict[str, dict], float) -> List[str]
+    '''
+    Description:
+        every metric in both that got worse than the baseline by more than tolerance (a fraction), in words
+        only metrics whose name says which way is better count, see HIGHER_IS_BETTER and LOWER_IS_BETTER
+    '''
+    slower = []
+    now, then = flatten(results), flatten(baseline)
+    for key in sorted(set(now) & set(then)):
+        if then[key] <= 0:
+            continue
+        change = now[key] / then[key] - 1
+        if key.endswith(HIGHER_IS_BETTER):
+            worse = change < -tolerance
+        elif key.endswith(LOWER_IS_BETTER):
+            worse = change > tolerance
+        else:
+            continue
+        logging.debug('%s: %0.6g -> %0.6g (%+0.1f%%)', key, then[key], now[key], 100 * change)
+        if worse:
+            slower.append(f'{key}: {then[key]:0.6g} -> {now[key]:0.6g} ({100 * change:+0.1f}%)')
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=stdlib.NiceFormatter)
+    parser.add_argument('names', type=str, nargs='*', help=f'benchmarks to run, default all of {list(BENCHMARKS)}')
+    parser.add_argument('--rows', type=int, default=1000000, help='telemetry rows to summarize')
+    parser.add_argument('--drives', type=int, default=24, help='drives the telemetry rows are spread across')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per timed i/o loop')
+    parser.add_argument('--poll', type=float, default=0.25, help='telemetry poll while timing the i/o loop')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of the cpu bound ones, the best counts')
+    parser.add_argument('--size', type=str, default='16MB', help='bytes every i/o loop moves, friendly')
+    parser.add_argument('--dirpath', type=str, default=constants.TMPFS_DIRPATH, help='where the i/o loops run')
+    parser.add_argument('--baseline', type=str, default='', help='json to compare against, made if it isnt there')
+    parser.add_argument('--save', action='store_true', help='overwrite the baseline with these results')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='fraction slower than the baseline that fails')
+    parser.add_argument('--log-level', type=str, default=constants.LOG_LEVEL, choices=constants.LOG_LEVELS)
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmarks {unknown}, choose from {list(BENCHMARKS)}')
+    logging.basicConfig(format=constants.LOG_FORMAT, level=args.log_level, stream=sys.stdout, force=True)
+    results = run(
+        names=args.names, rows=args.rows, drives=args.drives, duration=args.duration, poll=args.poll,
+        repeat=args.repeat, size=stdlib.validate_str_int('size', args.size), dirpath=args.dirpath
+    )
+    if not args.baseline:
+        return
+    slower = []  # type: List[str]
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as r:
+            slower = compare(results, json.load(r), tolerance=args.tolerance)
+        for line in slower:
+            logging.error('slower than the baseline, %s', line)
+        if not slower:
+            logging.info('nothing is more than %0.0f%% slower than "%s"', 100 * args.tolerance, args.baseline)
+    if args.save or not os.path.isfile(args.baseline):
+        with open(args.baseline, 'w', encoding='utf-8') as w:
+            json.dump(results, w, indent=2)
+        logging.info('baseline saved to "%s"', args.baseline)
+    if slower:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
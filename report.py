@@ -0,0 +1,288 @@
+# stdlib
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from typing import IO, Callable, Dict, List, Optional, Any  # noqa: F401
+
+# app
+import constants
+import watchdog
+from stdlib import bytes_to_size
+
+SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+# lines starting with this on a worker's stdout are progress reports, everything else is just log
+SENTINEL = '@@progress '
+STATE = dict(step='', errors=0, enabled=False)  # type: Dict[str, Any]
+LOCK = threading.Lock()
+
+
+def emit(kind, **payload):
+    # type: (str, Any) -> None
+    '''
+    Description:
+        write one progress report as a single line on stdout, no-op unless enable()d
+        kinds: "step", "progress", "error", "done"
+    '''
+    if not STATE['enabled']:
+        return
+    payload.update(kind=kind, time=time.time(), pid=os.getpid())
+    line = (SENTINEL + json.dumps(payload, default=str) + '\n').encode('utf-8')
+    with LOCK:
+        # logs are flushed per record, flush whats left then write the report in one go so it lands whole
+        sys.stdout.flush()
+        os.write(sys.stdout.fileno(), line)
+
+
+def parse(line):
+    # type: (str) -> Optional[dict]
+    if not line.startswith(SENTINEL):
+        return None
+    try:
+        return json.loads(line[len(SENTINEL):])
+    except ValueError:
+        return None
+
+
+def step(name):
+    # type: (str) -> None
+    STATE['step'] = name
+    emit('step', step=name)
+
+
+def cpu_seconds():
+    # type: () -> float
+    '''
+    Description:
+        cpu time this process has used so far, user + system, every thread
+    '''
+    times = os.times()
+    return times.user + times.system
+
+
+class ErrorHandler(logging.Handler):
+    '''
+    Description:
+        every ERROR and up that gets logged is reported, so the coordinator hears about it right away
+    '''
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        # type: (logging.LogRecord) -> None
+        STATE['errors'] += 1
+        emit('error', step=STATE['step'], errors=STATE['errors'], message=record.getMessage())
+
+
+def progress_deltas(seen, interval_max=False):
+    # type: (Dict[int, tuple], bool) -> Dict[str, dict]
+    '''
+    Description:
+        bytes, ops and latency since the last call per data_filepath, from everything in watchdog.PROGRESS
+            and whatever finished (watchdog.FINISHED) since, so a step that ends between calls isnt lost
+        seen carries the state from one call to the next, start with {} and call once to begin from now,
+            else everything still in watchdog.FINISHED counts too
+
+    Arguments:
+        seen: Dict[int, tuple]
+        interval_max: bool
+            default False, latency_max is the slowest op ever, else the slowest since the last call,
+                see watchdog.IOProgress.interval_max_take, only one caller can
+    '''
+    targets = {}  # type: Dict[str, dict]
+    active = list(watchdog.PROGRESS.values())
+    progresses = active + list(watchdog.FINISHED)
+    for p, progress in enumerate(progresses):
+        # the progress itself is kept in seen so its id cant be reused while its there
+        _, bytes_, ops, latency = seen.get(id(progress), (progress, 0, 0, 0.0))
+        if p >= len(active) and progress.ops == ops:
+            continue  # finished and already counted
+        target = targets.setdefault(
+            progress.data_filepath, dict(op=progress.op, bytes=0, ops=0, latency=0.0, latency_max=0.0)
+        )
+        target['bytes'] += progress.bytes - bytes_
+        target['ops'] += progress.ops - ops
+        target['latency'] += progress.latency - latency
+        latency_max = progress.interval_max_take() if interval_max else progress.latency_max
+        target['latency_max'] = max(target['latency_max'], latency_max)
+        seen[id(progress)] = (progress, progress.bytes, progress.ops, progress.latency)
+    for key in set(seen) - {id(progress) for progress in progresses}:
+        del seen[key]
+    return targets
+
+
+def reporter(report_every=constants.REPORT_EVERY, stop_event=constants.STOP_EVENT):
+    # type: (float|int, threading.Event) -> None
+    '''
+    Description:
+        every report_every seconds, total bytes, throughput and mean op latency across everything in watchdog.PROGRESS
+    '''
+    seen = {}  # type: Dict[int, tuple]
+    progress_deltas(seen)
+    total = 0
+    prior = time.perf_counter()
+    prior_cpu = cpu_seconds()
+    while not stop_event.wait(report_every):
+        now = time.perf_counter()
+        cpu = cpu_seconds()
+        targets = progress_deltas(seen, interval_max=True)
+        delta_bytes = sum(target['bytes'] for target in targets.values())
+        delta_ops = sum(target['ops'] for target in targets.values())
+        delta_latency = sum(target['latency'] for target in targets.values())
+        latency_max = max([target['latency_max'] for target in targets.values()] or [0.0])
+        total += delta_bytes
+        emit(
+            'progress',
+            step=STATE['step'],
+            op=next(iter(targets.values()))['op'] if targets else '',
+            bytes=total,
+            throughput=delta_bytes / (now - prior),
+            latency=delta_latency / delta_ops if delta_ops else 0.0,
+            latency_max=latency_max,
+            errors=STATE['errors'],
+            # percent of one core, so a worker saturating 2 cores reads 200
+            cpu=100 * (cpu - prior_cpu) / (now - prior),
+            cpu_seconds=cpu,
+            cpus=sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else [],
+            # throughput of each data_filepath when theres more than one, see flow.flow_targets
+            targets={
+                data_filepath: target['bytes'] / (now - prior) for data_filepath, target in targets.items()
+            } if len(targets) > 1 else {},
+        )
+        prior, prior_cpu = now, cpu
+
+
+def enable(report_every=constants.REPORT_EVERY, stop_event=constants.STOP_EVENT):
+    # type: (float|int, threading.Event) -> Optional[threading.Thread]
+    '''
+    Description:
+        start reporting: step changes, errors as they are logged, progress every report_every seconds
+    '''
+    if report_every <= 0:
+        return None
+    STATE['enabled'] = True
+    logging.getLogger().addHandler(ErrorHandler())
+    t = threading.Thread(
+        target=reporter, kwargs=dict(report_every=report_every, stop_event=stop_event), name='report', daemon=True
+    )
+    t.start()
+    return t
+
+
+async def relay(key, stream, log, on_report):
+    # type: (Any, asyncio.StreamReader, IO[bytes], Callable[[Any, dict], None]) -> None
+    '''
+    Description:
+        coordinator side, one per worker: on_report(key, report) for every report, the rest goes to the log file
+        returns once the worker hangs up
+        a line longer than the stream's limit (a huge traceback, progress bars that only \r) cant be a report,
+            it goes to the log file in pieces
+    '''
+    import asyncio
+    while True:
+        try:
+            raw = await stream.readuntil(b'\n')
+        except asyncio.IncompleteReadError as ire:
+            raw = ire.partial  # the last line, without a newline
+        except asyncio.LimitOverrunError as loe:
+            log.write(await stream.read(loe.consumed))
+            log.flush()
+            continue
+        if not raw:
+            break
+        report = parse(raw.decode('utf-8', errors='replace'))
+        if report is None:
+            log.write(raw)
+            log.flush()
+        else:
+            on_report(key, report)
+
+
+def cpu_ranges(cpus):
+    # type: (List[int]) -> str
+    '''
+    Description:
+        logical cpus as ranges
+        >>> cpu_ranges([0, 1, 2, 3, 8, 10, 11])  # '0-3,8,10-11'
+    '''
+    ranges = []  # type: List[List[int]]
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(start) if start == end else f'{start}-{end}' for start, end in ranges)
+
+
+class Aggregate(object):
+    '''
+    Description:
+        latest state of every worker, folded from their reports, rendered as one table
+    '''
+
+    def __init__(self, keys, started=None):
+        # type: (List[Any], Optional[float]) -> None
+        self.started = started or time.time()
+        self.rows = {
+            key: dict(
+                key=key, state='starting', step='', op='', bytes=0, throughput=0.0, latency=0.0, latency_max=0.0,
+                errors=0, last_error='', cpu=0.0, cpu_seconds=0.0, cpus=[], updated=self.started
+            )
+            for key in keys
+        }  # type: Dict[Any, dict]
+
+    def update(self, key, report):
+        # type: (Any, dict) -> dict
+        row = self.rows[key]
+        row['updated'] = report.get('time', time.time())
+        kind = report.get('kind', '')
+        if kind == 'exit':
+            return row
+        row['state'] = 'running'
+        if kind == 'error':
+            row['last_error'] = report.get('message', '')
+        if kind == 'done':
+            row['state'] = 'done' if report.get('success', False) else 'failed'
+        for field in [
+            'step', 'op', 'bytes', 'throughput', 'latency', 'latency_max', 'errors', 'cpu', 'cpu_seconds', 'cpus'
+        ]:
+            if field in report:
+                row[field] = report[field]
+        return row
+
+    def finish(self, key, exit_code):
+        # type: (Any, int) -> dict
+        row = self.rows[key]
+        row['state'] = 'done' if exit_code == 0 else f'failed ({exit_code})'
+        row['throughput'] = 0.0
+        # over the whole run rather than the last report
+        row['cpu'] = 100 * row['cpu_seconds'] / max(time.time() - self.started, 1e-9)
+        row['updated'] = time.time()
+        return row
+
+    def table(self):
+        # type: () -> str
+        import pandas as pd
+        now = time.time()
+        df = pd.DataFrame(
+            [
+                dict(
+                    drive=row['key'],
+                    state=row['state'],
+                    step=row['step'],
+                    op=row['op'],
+                    done=bytes_to_size(row['bytes']),
+                    throughput=f'{bytes_to_size(row["throughput"])}/s',
+                    latency=f'{row["latency"] * 1000:0.3f}ms',
+                    latency_max=f'{row["latency_max"] * 1000:0.3f}ms',
+                    errors=row['errors'],
+                    cpu=f'{row["cpu"]:0.0f}%',
+                    cpus=cpu_ranges(row['cpus']),
+                    heard=f'{now - row["updated"]:0.0f}s ago',
+                ) for row in self.rows.values()
+            ]
+        )
+        return f'elapsed: {now - self.started:0.0f} sec\n{df.to_string(index=False)}'
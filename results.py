@@ -0,0 +1,391 @@
+'''
+Description:
+    every step's result from every run in one sqlite database, so drives can be compared across runs
+    one row per step: the config, the device (serial and model if S.M.A.R.T. was polled), throughput, latency
+    percentiles and how much the drive's S.M.A.R.T. counters moved during it
+
+Examples:
+    >>> python main.py compare
+    >>> python main.py compare --compare-devices S6B0NL0T123456 --compare-threshold 0.05
+'''
+# stdlib
+import os
+import json
+import socket
+import inspect
+import logging
+import datetime
+import threading
+import contextlib
+from typing import Any, Callable, Dict, List, Optional, Tuple  # noqa: F401
+
+# app
+import constants as con
+import workload
+import timing
+from store import leading_number
+from stdlib import bytes_to_size
+from watchdog import hosting_disk
+
+SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+RUN_ID = f'{con.NOW:%Y%m%d-%H%M%S}-{socket.gethostname()}-{os.getpid()}'
+METRICS = [
+    'bytes', 'ops', 'elapsed', 'throughput', 'iops', 'lat_mean_us', 'lat_p50_us', 'lat_p99_us', 'lat_p999_us',
+    'lat_max_us', 'ceiling_pct', 'sync_elapsed'
+]
+COLUMNS = [
+    'run_id', 'run_time', 'host', 'step', 'target', 'data_filepath', 'disk_number', 'serial', 'model', 'status',
+    'error', 'config'
+] + METRICS + ['smart_deltas', 'detail', 'finished']
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{column} {'REAL' if column in METRICS else 'TEXT'}" for column in COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS results_serial ON results (serial);
+CREATE INDEX IF NOT EXISTS results_run_time ON results (run_time);
+CREATE INDEX IF NOT EXISTS results_target ON results (target);
+'''
+# the config keys that tell one result's label from another, see compare
+LABEL_KEYS = [
+    'size', 'chunk_size', 'rw', 'access', 'iodepth', 'numjobs', 'engine', 'sync', 'smallfiles_count', 'metadata_count'
+]
+# the latest S.M.A.R.T. poll, see sample
+LATEST = {}  # type: Dict[str, Dict[str, dict]]
+LOCK = threading.Lock()
+# set once the first poll is in LATEST
+SAMPLED = threading.Event()
+
+
+def connect(results_filepath=con.RESULTS_FILEPATH):
+    # type: (str) -> sqlite3.Connection
+    '''
+    Description:
+        open (making it if need be) the results database, several processes can write it at once (health workers)
+    '''
+    import sqlite3
+    os.makedirs(os.path.dirname(os.path.abspath(results_filepath)), exist_ok=True)
+    conn = sqlite3.connect(results_filepath, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    # databases from before a column was added get it, empty for their old rows
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(results)')}
+    for column in COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE results ADD COLUMN {column} {'REAL' if column in METRICS else 'TEXT'}")
+    return conn
+
+
+def sample(cdi):
+    # type: (Dict[str, dict]) -> None
+    '''
+    Description:
+        telemetry on_sample, keeps the latest poll around for smart_snapshot
+    '''
+    with LOCK:
+        LATEST.setdefault('first', cdi)
+        LATEST['cdi'] = cdi
+    SAMPLED.set()
+
+
+def latest(wait=0.0, first=False):
+    # type: (float, bool) -> Dict[str, dict]
+    '''
+    Description:
+        the latest S.M.A.R.T. poll, waiting up to wait seconds for the first one, {} if theres none by then
+        or the first poll there ever was, with first
+    '''
+    if wait > 0:
+        SAMPLED.wait(wait)
+    with LOCK:
+        return dict(LATEST.get('first' if first else 'cdi', {}))
+
+
+def smart_snapshot(data_filepath, first=False):
+    # type: (str, bool) -> Tuple[str, dict]
+    '''
+    Description:
+        disk number and latest (or first) S.M.A.R.T. of the disk hosting data_filepath, ('', {}) if theres no telemetry
+    '''
+    cdi = latest(first=first)
+    disk_number = hosting_disk(cdi, data_filepath)
+    return disk_number, dict(cdi.get(disk_number, {}))
+
+
+def smart_deltas(before, after):
+    # type: (dict, dict) -> Dict[str, float]
+    '''
+    Description:
+        how far every numeric S.M.A.R.T. field moved, only the ones that did
+        >>> smart_deltas({'Host Writes': '100 GB'}, {'Host Writes': '104 GB'})  # {'Host Writes': 4.0}
+    '''
+    deltas = {}
+    for key, value in after.items():
+        prior, _ = leading_number(before.get(key, None))
+        now, _ = leading_number(value)
+        if prior is not None and now is not None and now != prior and key != 'Disk Number':
+            deltas[key] = now - prior
+    return deltas
+
+
+def scalars(kwargs):
+    # type: (Dict[str, Any]) -> Dict[str, Any]
+    # the config worth keeping, no paths (thats data_filepath/target), buffers, events or callbacks
+    return {
+        k: v
+        for k, v in sorted(kwargs.items())
+        if isinstance(v, (bool, int, float, str)) and not k.endswith('filepath') and k != 'pattern_name'
+    }
+
+
+def result_metrics(res, elapsed):
+    # type: (Any, float) -> Dict[str, Any]
+    '''
+    Description:
+        METRICS out of whatever a step returned, io_workload/autotune dicts, (bytes, elapsed, byte_array) tuples,
+        suite's DataFrame goes in detail
+    '''
+    import pandas as pd
+    metrics = dict(elapsed=elapsed)  # type: Dict[str, Any]
+    if isinstance(res, dict):
+        metrics.update({k: v for k, v in res.items() if k in METRICS})
+        metrics['detail'] = {k: v for k, v in scalars(res).items() if k not in METRICS}
+    elif isinstance(res, tuple) and res and isinstance(res[0], int):
+        metrics.update(bytes=res[0], throughput=res[0] / elapsed if elapsed > 0 else 0.0)
+    elif isinstance(res, pd.DataFrame):
+        metrics['detail'] = res.to_dict(orient='records')
+    return metrics
+
+
+def ceiling_pct(step, config, throughput, calibration_filepath=con.CALIBRATION_FILEPATH):
+    # type: (str, Dict[str, Any], Optional[float], str) -> Optional[float]
+    '''
+    Description:
+        throughput as a percent of the tool's calibrated ceiling for step and config, None if theres no ceiling
+        logs it, and warns when its close enough to the ceiling that the tool, not the disk, is the limit
+    '''
+    ceiling = workload.ceiling(step, config, calibration_filepath=calibration_filepath)
+    if not ceiling or not throughput or ceiling['bytes_per_sec'] <= 0:
+        return None
+    pct = 100 * throughput / ceiling['bytes_per_sec']
+    log = logging.warning if pct >= 100 * con.CALIBRATE_WARN else logging.info
+    log(
+        '%s at %s/s is %0.0f%% of the tool\'s ceiling of %s/s (%s, %s chunks, %0.1fus cpu per op)%s', step,
+        bytes_to_size(throughput), pct, bytes_to_size(ceiling['bytes_per_sec']), ceiling['key'],
+        bytes_to_size(ceiling['chunk_size']), ceiling['cpu_us_per_op'],
+        ', that says more about the tool than the disk' if pct >= 100 * con.CALIBRATE_WARN else ''
+    )
+    return pct
+
+
+def record(
+    results_filepath,
+    step,
+    data_filepath,
+    config,
+    metrics,
+    before=('', {}),
+    after=('', {}),
+    in_place=con.IN_PLACE,
+    status='ok',
+    error='',
+    calibration_filepath='',
+):
+    # type: (str, str, str, Dict[str, Any], Dict[str, Any], Tuple[str, dict], Tuple[str, dict], bool, str, str, str) -> None  # noqa: E501
+    '''
+    Description:
+        append one step's result, before and after are smart_snapshot()s from either side of it
+            telemetry's first poll tends to land after the first step started, then before is the first poll,
+            smart_deltas is null if theres no poll on one side or the other, {} means nothing moved
+        with a calibration_filepath (see workload.calibrate) its ceiling_pct too
+    '''
+    if status == 'ok' and calibration_filepath:
+        metrics = dict(
+            metrics,
+            ceiling_pct=ceiling_pct(step, config, metrics.get('throughput'), calibration_filepath=calibration_filepath)
+        )
+    if not before[1]:
+        # theres been no poll since, so this one came in during the step
+        before = smart_snapshot(data_filepath, first=True)
+    deltas = None  # type: Optional[Dict[str, float]]
+    # the same poll on both sides (its datetime included) says nothing about the step either
+    if before[1] and after[1] and before[1] != after[1]:
+        deltas = smart_deltas(before[1], after[1])
+    else:
+        logging.info('no S.M.A.R.T. poll on both sides of %s, it has no smart_deltas', step)
+    disk_number, smart_disk = after if after[1] else before
+    row = dict(
+        run_id=RUN_ID,
+        run_time=con.NOW.isoformat(timespec='seconds'),
+        host=socket.gethostname(),
+        step=step,
+        target=workload.tuned_key(data_filepath, in_place=in_place),
+        data_filepath=os.path.abspath(data_filepath),
+        disk_number=disk_number,
+        serial=str(smart_disk.get('Serial Number', '')),
+        model=str(smart_disk.get('Model', '')),
+        status=status,
+        error=error,
+        config=json.dumps(config, sort_keys=True, default=str),
+        smart_deltas=json.dumps(deltas),
+        detail=json.dumps(metrics.get('detail', {}), default=str),
+        finished=datetime.datetime.now().isoformat(timespec='seconds'),
+    )
+    row.update({k: metrics.get(k, None) for k in METRICS})
+    with contextlib.closing(connect(results_filepath)) as conn, conn:
+        conn.execute(
+            f'INSERT INTO results ({", ".join(COLUMNS)}) VALUES ({", ".join("?" for _ in COLUMNS)})',
+            [row[column] for column in COLUMNS],
+        )
+
+
+def recorded(func, kwargs, step='', results_filepath='', calibration_filepath=''):
+    # type: (Callable, Dict[str, Any], str, str, str) -> Any
+    '''
+    Description:
+        func(**kwargs), and if its one of con.RESULTS_STEPS and theres a results_filepath, record how it went
+        failures are recorded too, then raised
+    '''
+    step = step or func.__name__
+    if not results_filepath or step not in con.RESULTS_STEPS:
+        return func(**kwargs)
+    parameters = inspect.signature(func).parameters
+    data_filepath = kwargs.get('data_filepath', con.DATA_FILEPATH)
+    before = smart_snapshot(data_filepath)
+    status, error, res = 'ok', '', None
+    start = timing.ticks()
+    try:
+        res = func(**kwargs)
+        return res
+    except KeyboardInterrupt:
+        status = 'stopped'
+        raise
+    except BaseException as be:
+        status, error = 'failed', repr(be)
+        raise
+    finally:
+        try:
+            record(
+                results_filepath,
+                step,
+                data_filepath,
+                scalars({k: v for k, v in kwargs.items() if k in parameters}),
+                result_metrics(res, timing.since(start)),
+                before=before,
+                after=smart_snapshot(data_filepath),
+                in_place=kwargs.get('in_place', con.IN_PLACE),
+                status=status,
+                error=error,
+                calibration_filepath=calibration_filepath,
+            )
+        except Exception:
+            logging.warning('unable to record %s in "%s"', step, results_filepath, exc_info=True)
+
+
+def label(config):
+    # type: (str) -> str
+    '''
+    Description:
+        >>> label('{"chunk_size": 4096, "iodepth": 32, "value": -1}')  # 'chunk_size=4.000 KB iodepth=32'
+    '''
+    config = json.loads(config)
+    return ' '.join(
+        f'{k}={bytes_to_size(config[k]) if k in ["size", "chunk_size"] and config[k] > 0 else config[k]}'
+        for k in LABEL_KEYS if k in config
+    )
+
+
+def compare(
+    results_filepath=con.RESULTS_FILEPATH,
+    compare_baseline=con.COMPARE_BASELINE,
+    compare_threshold=con.COMPARE_THRESHOLD,
+    compare_devices=con.COMPARE_DEVICES,
+    **kwargs
+):
+    # type: (str, str, float, List[str], Any) -> pd.DataFrame
+    '''
+    Description:
+        Compare every device's latest run of every step against its baseline, flag regressions
+
+    Arguments:
+        results_filepath: str
+            the results database every run records into
+        compare_baseline: str
+            default '', the median of every earlier run of the same step and config on the same device
+            else a run_id, that run is the baseline
+        compare_threshold: float
+            default 0.10, throughput down (or p99 latency up) by more than this fraction is a regression
+        compare_devices: List[str]
+            default [], every device, else only these serials (or targets for devices without one)
+        **kwargs: varkwarguments
+
+    Returns:
+        pd.DataFrame
+            one row per device, step and config: runs, baseline, latest, change, the trend and a verdict
+    '''
+    import pandas as pd
+    if not os.path.isfile(results_filepath):
+        raise FileNotFoundError(f'no results at "{results_filepath}", run some steps first!')
+    with contextlib.closing(connect(results_filepath)) as conn:
+        df = pd.read_sql_query("SELECT * FROM results WHERE status = 'ok' ORDER BY run_time, id", conn)
+    df['device'] = [serial or target for serial, target in zip(df['serial'], df['target'])]
+    if compare_devices:
+        df = df[df['device'].isin(compare_devices)]
+
+    rows = []
+    for (device, step, config), group in df.groupby(['device', 'step', 'config'], sort=False):
+        runs = group.groupby('run_id', sort=False).agg(
+            run_time=('run_time', 'first'), throughput=('throughput', 'mean'), lat_p99_us=('lat_p99_us', 'mean')
+        ).sort_values('run_time')
+        latest = runs.iloc[-1]
+        if compare_baseline:
+            baseline = runs.loc[[compare_baseline]] if compare_baseline in runs.index else runs.iloc[0:0]
+        else:
+            baseline = runs.iloc[:-1]
+        row = dict(
+            device=device,
+            model=group['model'].iloc[-1],
+            step=step,
+            config=label(config),
+            runs=len(runs),
+            latest=latest.name,
+            throughput=latest['throughput'],
+            baseline=float('nan'),
+            change=float('nan'),
+            p99_change=float('nan'),
+            trend=' > '.join(f'{bytes_to_size(ele)}/s' for ele in runs['throughput'].tail(con.COMPARE_TREND)),
+            verdict='new',
+        )
+        if len(baseline) and latest.name not in baseline.index:
+            row['baseline'] = baseline['throughput'].median()
+            if row['baseline'] > 0:
+                row['change'] = latest['throughput'] / row['baseline'] - 1
+            p99 = baseline['lat_p99_us'].median()
+            if p99 == p99 and p99 > 0 and latest['lat_p99_us'] == latest['lat_p99_us']:
+                row['p99_change'] = latest['lat_p99_us'] / p99 - 1
+            regressed = row['change'] < -compare_threshold or row['p99_change'] > compare_threshold
+            row['verdict'] = 'REGRESSED' if regressed else 'ok'
+        rows.append(row)
+
+    result = pd.DataFrame(rows, columns=[
+        'device', 'model', 'step', 'config', 'runs', 'latest', 'throughput', 'baseline', 'change', 'p99_change',
+        'trend', 'verdict'
+    ])
+    if not len(result):
+        logging.warning('nothing to compare in "%s"', results_filepath)
+        return result
+    table = result.drop(columns=['latest']).copy()
+    for column in ['throughput', 'baseline']:
+        table[column] = [f'{bytes_to_size(ele)}/s' if ele == ele else '' for ele in result[column]]
+    for column in ['change', 'p99_change']:
+        table[column] = [f'{ele:+0.1%}' if ele == ele else '' for ele in result[column]]
+    logging.info(
+        'compared against %s\n%s', compare_baseline or 'the median of earlier runs', table.to_string(index=False)
+    )
+    for row in rows:
+        if row['verdict'] == 'REGRESSED':
+            logging.warning(
+                'REGRESSED: %s %s %s, throughput %+0.1f%%, p99 %+0.1f%% vs baseline', row['device'], row['step'],
+                row['config'], 100 * row['change'], 100 * row['p99_change']
+            )
+    return result
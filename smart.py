@@ -2,118 +2,173 @@
 import os
 import sys
 import re
-import csv
+import json
+import shutil
 import time
 import pprint
 import logging
+import logging.handlers
 import datetime
 import threading  # noqa: F401
 import subprocess
-from typing import Tuple, Dict, Optional, Any  # noqa: F401
-
-# third party
-import numpy as np
-import pandas as pd
-import psutil
+import multiprocessing
+import multiprocessing.process  # noqa: F401
+from multiprocessing.connection import Connection  # noqa: F401
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Dict, List, Optional, Callable, Any  # noqa: F401
 
 # app
 import constants
-import third
 import system
+import watchdog
 from stdlib import abspath
+from store import RollupStore, TelemetryStore, store_dirpath
 
 SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+# the only columns summarize_crystaldiskinfo_df needs, so the summary doesnt parse every S.M.A.R.T. attribute
+SUMMARY_COLUMNS = ['datetime', 'Drive Letter'] + constants.CRYSTAL_KEYS
 
+# smartctl --scan, done once, see smartctl
+SMARTCTL_DEVICES = []  # type: List[dict]
+# device name -> disk number, so a drive keeps its number from poll to poll
+SMARTCTL_NUMBERS = {}  # type: Dict[str, str]
 
-def summarize_crystaldiskinfo_df(df):
-    df['datetime'] = pd.to_datetime(df['datetime'])
-    df['Read Perf'] = pd.Series([''] * len(df))
-    df['Write Perf'] = pd.Series([''] * len(df))
-    ilocs = []
-    rows = []
-    for grouping, group_df in df.groupby(['Serial Number']):
-        dts = group_df['datetime']
-        dt_min, dt_max = dts.min(), dts.max()
-        iloc_min = dts.index[dts.argmin()]
-        iloc_max = dts.index[dts.argmax()]
-        ilocs += [iloc_min, iloc_max]
-        elapsed = (dt_max - dt_min).total_seconds()
-
-        reads = group_df['Host Reads']
-        reads_min, reads_max = reads.min(), reads.max()
-        read_throughput, write_throughput = '?', '?'
-        if reads_min == np.nan:
-            reads_min = -1
-            reads_min = -1
-        elif isinstance(reads_min, (int, float)):
-            pass
-        else:
-            unit = reads_min.split()[-1]
-            reads_min, reads_max = reads_min.split()[0], reads_max.split()[0]
-        reads_min, reads_max = float(reads_min), float(reads_max)
-
-        writes = group_df['Host Writes']
-        writes_min, writes_max = writes.min(), writes.max()
-        if writes_min == np.nan:
-            writes_min = -1
-            writes_max = -1
-        elif isinstance(writes_min, (int, float)):
-            pass
-        else:
-            writes_min, writes_max = writes_min.split()[0], writes_max.split()[0]
-        writes_min, writes_max = float(writes_min), float(writes_max)
 
-        if elapsed == 0:
-            read_throughput = f'0 {unit}/s'
-            write_throughput = f'0 {unit}/s'
-        else:
-            read_throughput = f'{(reads_max - reads_min) / elapsed:0.3f} {unit}/s'
-            write_throughput = f'{(writes_max - writes_min) / elapsed:0.3f} {unit}/s'
-        df.loc[group_df.index, 'Read Perf'] = read_throughput
-        df.loc[group_df.index, 'Write Perf'] = write_throughput
-
-        drive_letter = df.iloc[iloc_max]['Drive Letter']
-        disk_size = df.iloc[iloc_max]['Disk Size'].split()
-        disk_size, disk_unit = disk_size[0], disk_size[1]
-        serial = df.iloc[iloc_max]['Serial Number']
-        health = df.iloc[iloc_max]['Health Status']
-        disk_number = df.iloc[iloc_max]['Disk Number']
-        pcs = df.iloc[iloc_max]['Power On Count'].split()[0]
-        xfer = df.iloc[iloc_max]['Transfer Mode'].split(' | ')[-1]  # pcie
-        # text = (
-        #     f'{serial} ({disk_size} {disk_unit}) | {disk_number} | {drive_letter} | '
-        #     f'{health} | Reads: {read_throughput} | Writes: {read_throughput} | '
-        # )
-        row = dict(
-            serial=serial,
-            size=f'{disk_size} {disk_unit}',
-            number=disk_number,
-            letter=drive_letter,
-            health=health,
-            elapsed=f'{elapsed / 3600:0.2f}hrs',
-            reads=f'{reads_max - reads_min} {disk_unit}',
-            writes=f'{writes_max - writes_min} {disk_unit}',
-            read_bw=read_throughput,
-            write_bw=write_throughput,
-            pcs=pcs,
-            pcie=xfer,
-        )
-        for col in constants.CRYSTAL_ERROR_KEYS:
-            if col not in df.columns:
-                continue
-            errs = group_df[col]
-            err_min, err_max = errs.min(), errs.max()
-            if pd.isna(err_min):
-                err_min = 0
-            if pd.isna(err_max):
-                err_max = 0
-            err_delta = err_max - err_min
-            row[f'{col} (Delta)'] = err_delta
+def split_unit(series):
+    # type: (pd.Series) -> Tuple[pd.Series, pd.Series]
+    '''
+    Description:
+        vectorized split of a column of numerics with units, once for the whole column
+        telemetry repeats itself a lot, so only the unique values get parsed and the result is broadcast back
+        >>> split_unit(pd.Series(['1234 GB', 5, None]))  # ([1234.0, 5.0, nan], ['GB', '', ''])
 
-        rows.append(row)
+    Arguments:
+        series: pd.Series
+            mixed column, ex) "1234 GB", "205 count", 954353, NaN
 
-    df = pd.DataFrame(rows)
-    return df
+    Returns:
+        Tuple[pd.Series, pd.Series]
+            numeric (float, NaN if unparseable), unit (str, '' if unitless)
+    '''
+    import pandas as pd
+    import numpy as np
+    codes, uniques = pd.factorize(series)
+    if not len(uniques):
+        # all NaN, ex) a column no drive reports, numpy cant partition an empty str array
+        return pd.Series(np.nan, index=series.index), pd.Series('', index=series.index, dtype=object)
+    text = np.strings.strip(np.asarray(uniques.astype(str), dtype=str))
+    head, _, tail = np.strings.partition(text, ' ')
+    numeric = pd.to_numeric(pd.Series(head, dtype=object), errors='coerce').to_numpy(dtype=float)
+    unit = np.strings.partition(np.strings.lstrip(tail), ' ')[0].astype(object)
+    # factorize marks NaN as -1, so tack on a NaN/'' to the end for those to land on
+    numeric = np.append(numeric, np.nan)[codes]
+    unit = np.append(unit, '')[codes]
+    return pd.Series(numeric, index=series.index), pd.Series(unit, index=series.index, dtype=object)
+
+
+def last_token(series, sep):
+    # type: (pd.Series, str) -> pd.Series
+    '''
+    Description:
+        vectorized series.split(sep)[-1] on the unique values only, NaN stays NaN
+        >>> last_token(pd.Series(['PCIe 3.0 x4 | PCIe 3.0 x4']), ' | ')  # ['PCIe 3.0 x4']
+    '''
+    import pandas as pd
+    import numpy as np
+    codes, uniques = pd.factorize(series)
+    text = np.asarray(uniques.astype(str), dtype=str)
+    tokens = np.strings.rpartition(text, sep)[2].astype(object)
+    return pd.Series(np.append(tokens, np.nan)[codes], index=series.index, dtype=object)
+
+
+def summarize_crystaldiskinfo_df(df):
+    # type: (pd.DataFrame) -> pd.DataFrame
+    '''
+    Description:
+        one row per Serial Number: latest identity, elapsed, read/write deltas and throughput, error deltas
+        units are parsed once per column and everything is reduced in a single groupby().agg
+
+    Arguments:
+        df: pd.DataFrame
+            S.M.A.R.T. rows, at least the SUMMARY_COLUMNS that exist
+
+    Returns:
+        pd.DataFrame
+    '''
+    import pandas as pd
+    import numpy as np
+
+    def column(name):
+        # type: (str) -> pd.Series
+        if name in df.columns:
+            return df[name]
+        return pd.Series(np.nan, index=df.index, dtype=object)
+
+    frame = pd.DataFrame({'serial': column('Serial Number'), 'datetime': pd.to_datetime(column('datetime'))})
+    frame['reads'], frame['reads_unit'] = split_unit(column('Host Reads'))
+    frame['writes'], frame['writes_unit'] = split_unit(column('Host Writes'))
+    # -1 is smartctl_parse's "the drive doesnt say", not a count
+    frame['reads'] = frame['reads'].where(frame['reads'] >= 0)
+    frame['writes'] = frame['writes'].where(frame['writes'] >= 0)
+    frame['disk_size'], frame['disk_unit'] = split_unit(column('Disk Size'))
+    frame['pcs'], _ = split_unit(column('Power On Count'))
+    frame['pcie'] = last_token(column('Transfer Mode'), ' | ')
+    frame['number'] = column('Disk Number')
+    frame['letter'] = column('Drive Letter')
+    frame['health'] = column('Health Status')
+    error_columns = [col for col in constants.CRYSTAL_ERROR_KEYS if col in df.columns]
+    for e, col in enumerate(error_columns):
+        frame[f'error_{e}'] = pd.to_numeric(df[col], errors='coerce')
+
+    aggs = dict(
+        dt_min=('datetime', 'min'),
+        dt_max=('datetime', 'max'),
+        reads_min=('reads', 'min'),
+        reads_max=('reads', 'max'),
+        writes_min=('writes', 'min'),
+        writes_max=('writes', 'max'),
+    )
+    # "last" means at the latest datetime, so sort once and let groupby pick the last non-null
+    for key in ['reads_unit', 'writes_unit', 'disk_size', 'disk_unit', 'pcs', 'pcie', 'number', 'letter', 'health']:
+        aggs[key] = (key, 'last')
+    for e, _ in enumerate(error_columns):
+        aggs[f'error_{e}_min'] = (f'error_{e}', 'min')
+        aggs[f'error_{e}_max'] = (f'error_{e}', 'max')
+    frame = frame.dropna(subset=['serial']).sort_values('datetime', kind='stable')
+    agg = frame.groupby('serial', sort=True).agg(**aggs)
+
+    elapsed = (agg['dt_max'] - agg['dt_min']).dt.total_seconds().fillna(0)
+    per_second = elapsed.where(elapsed > 0)
+    reads = (agg['reads_max'] - agg['reads_min']).fillna(0)
+    writes = (agg['writes_max'] - agg['writes_min']).fillna(0)
+    read_bw = (reads / per_second).fillna(0)
+    write_bw = (writes / per_second).fillna(0)
+
+    def with_unit(values, units, fmt='{}', suffix=''):
+        # type: (pd.Series, pd.Series, str, str) -> np.ndarray
+        # ex) 40.0, GB -> "40.0 GB", 0.167, GB, /s -> "0.167 GB/s", 0.0, '', /s -> "0.000/s"
+        return (values.map(fmt.format) + ' ' + units.fillna('')).str.strip().add(suffix).values
+
+    summary = pd.DataFrame(
+        dict(
+            serial=agg.index,
+            size=with_unit(agg['disk_size'], agg['disk_unit']),
+            number=agg['number'].values,
+            letter=agg['letter'].values,
+            health=agg['health'].values,
+            elapsed=(elapsed / 3600).map('{:0.2f}hrs'.format).values,
+            reads=with_unit(reads, agg['reads_unit']),
+            writes=with_unit(writes, agg['writes_unit']),
+            read_bw=with_unit(read_bw, agg['reads_unit'], fmt='{:0.3f}', suffix='/s'),
+            write_bw=with_unit(write_bw, agg['writes_unit'], fmt='{:0.3f}', suffix='/s'),
+            pcs=agg['pcs'].map(lambda pcs: '' if pd.isna(pcs) else f'{pcs:g}').values,
+            pcie=agg['pcie'].values,
+        )
+    )
+    for e, col in enumerate(error_columns):
+        delta = agg[f'error_{e}_max'].fillna(0) - agg[f'error_{e}_min'].fillna(0)
+        summary[f'{col} (Delta)'] = delta.values
+    return summary
 
 
 def crystaldiskinfo_detect():
@@ -249,8 +304,207 @@ def crystaldiskinfo():
     return crystaldiskinfo_parse(content)
 
 
-def telemetry_smart(stop_event=constants.STOP_EVENT):
-    # type: (threading.Event) -> Tuple[Dict[str, dict], dict]
+def smartctl_detect():
+    # type: () -> int
+    exe = shutil.which(constants.SMARTCTL_EXE)
+    if not exe:
+        logging.warning('smartctl not installed or not on path!')
+        return 1
+    constants.SMARTCTL_EXE = exe
+    return 0
+
+
+def smartctl_json(*args):
+    # type: (str) -> dict
+    '''
+    Description:
+        run smartctl -j with args and return the json
+        smartctl exits with a bitmask, bits 0 and 1 mean it couldnt even talk to the device, the rest are findings
+    '''
+    cmd = [constants.SMARTCTL_EXE, '-j'] + list(args)
+    proc = subprocess.run(cmd, capture_output=True, universal_newlines=True)
+    if proc.returncode & 0b11:
+        raise OSError(f'{subprocess.list2cmdline(cmd)} failed with exit code {proc.returncode}: {proc.stdout.strip()}')
+    return json.loads(proc.stdout)
+
+
+def smartctl_scan():
+    # type: () -> List[dict]
+    '''
+    Returns:
+        List[dict]
+            ex) [{"name": "/dev/sda", "type": "sat", "protocol": "ATA"}, {"name": "/dev/nvme0", "type": "nvme"}]
+    '''
+    return smartctl_json('--scan').get('devices', [])
+
+
+def smartctl_mountpoints():
+    # type: () -> Dict[str, List[str]]
+    import psutil
+    mountpoints = {}  # type: Dict[str, List[str]]
+    for partition in psutil.disk_partitions():
+        mountpoints.setdefault(partition.device, []).append(partition.mountpoint)
+    return mountpoints
+
+
+def smartctl_parse(data, disk_number='', mountpoints=None):
+    # type: (dict, str, Optional[Dict[str, List[str]]]) -> dict
+    '''
+    Description:
+        map smartctl -j -a output onto the same keys crystaldiskinfo_parse produces, see constants.CRYSTAL_KEYS
+        ATA attributes and the NVMe health log are also kept under their own (prettified) names, like crystaldiskinfo
+
+    Arguments:
+        data: dict
+            json from smartctl -j -a
+        disk_number: str
+            what to call it in "Disk Number"
+        mountpoints: Optional[Dict[str, List[str]]]
+            device to mountpoints, "Drive Letter" becomes the mountpoints of the device and its partitions
+
+    Returns:
+        dict
+    '''
+    device = data.get('device', {})
+    name = device.get('name', '')
+    logical_block_size = data.get('logical_block_size', 512)
+    smart_disk = {
+        'datetime': str(datetime.datetime.now()),
+        'Disk Number': disk_number,
+        'Model': data.get('model_name', data.get('model_family', '???')),
+        'Firmware': data.get('firmware_version', ''),
+        'Serial Number': data.get('serial_number', '???'),
+        'Interface': device.get('protocol', ''),
+    }  # type: Dict[str, Any]
+    capacity = data.get('user_capacity', {}).get('bytes', 0) or data.get('nvme_total_capacity', 0)
+    # crystaldiskinfo always has one, everything downstream splits it
+    smart_disk['Disk Size'] = f'{capacity / 1000**3:0.1f} GB' if capacity else '??? GB'
+    if 'power_on_time' in data:
+        smart_disk['Power On Hours'] = f'{data["power_on_time"].get("hours", 0)} hours'
+    if 'power_cycle_count' in data:
+        smart_disk['Power On Count'] = f'{data["power_cycle_count"]} count'
+    if 'temperature' in data:
+        smart_disk['Temperature'] = data['temperature'].get('current')
+
+    speed = data.get('interface_speed', {})
+    if speed:
+        smart_disk['Transfer Mode'] = ' | '.join(
+            speed[key]['string'] for key in ['max', 'current'] if 'string' in speed.get(key, {})
+        )
+    else:
+        smart_disk['Transfer Mode'] = device.get('protocol', '')
+
+    passed = data.get('smart_status', {}).get('passed', None)
+    health = 'Unknown' if passed is None else 'Good' if passed else 'Bad'
+
+    nvme = data.get('nvme_smart_health_information_log', {})
+    if nvme:
+        for key, value in nvme.items():
+            if isinstance(value, (int, float)):
+                smart_disk[key.replace('_', ' ').title()] = value
+        # data units are thousands of 512 byte units, crystaldiskinfo reports GB
+        smart_disk['Host Reads'] = f'{nvme.get("data_units_read", 0) * 512000 // 1000**3} GB'
+        smart_disk['Host Writes'] = f'{nvme.get("data_units_written", 0) * 512000 // 1000**3} GB'
+        smart_disk['Media and Data Integrity Errors'] = nvme.get('media_errors', 0)
+        smart_disk['Number of Error Information Log Entries'] = nvme.get('num_err_log_entries', 0)
+        if 'percentage_used' in nvme:
+            health = f'{health} ({max(0, 100 - nvme["percentage_used"])} %)'
+
+    ata = data.get('ata_smart_attributes', {}).get('table', [])
+    for attribute in ata:
+        raw = attribute.get('raw', {}).get('value', 0)
+        smart_disk[attribute.get('name', str(attribute.get('id'))).replace('_', ' ')] = raw
+        if attribute.get('id') == 184:
+            smart_disk['End to End Error Detection Count'] = raw
+        elif attribute.get('id') == 187:
+            smart_disk['Reported Uncorrectable Errors'] = raw
+        elif attribute.get('id') == 241:
+            smart_disk['Host Writes'] = f'{raw * logical_block_size // 1000**3} GB'
+        elif attribute.get('id') == 242:
+            smart_disk['Host Reads'] = f'{raw * logical_block_size // 1000**3} GB'
+
+    # crystaldiskinfo always has both, -1 is what telemetry_loop takes for a drive that cant say
+    smart_disk.setdefault('Host Reads', -1)
+    smart_disk.setdefault('Host Writes', -1)
+    smart_disk['Health Status'] = health
+    if mountpoints is not None:
+        # the device itself or its partitions, /dev/sda1 or /dev/nvme1n1p2, not /dev/sdaa1 or /dev/nvme10n1
+        owned = re.compile(re.escape(name) + r'(n\d+)?(p?\d+)?')
+        smart_disk['Drive Letter'] = ' '.join(
+            mountpoint for dev, mps in sorted(mountpoints.items()) if owned.fullmatch(dev) for mountpoint in mps
+        )
+    return smart_disk
+
+
+def smartctl(devices=None):
+    # type: (Optional[List[dict]]) -> Dict[str, dict]
+    '''
+    Description:
+        smartctl -j -a every device at the same time and return the same shape as crystaldiskinfo()
+        devices are scanned for once, and keep their disk number for the life of the process (SMARTCTL_NUMBERS),
+            a device that fails a poll is still there, as a row with only what the scan knows, rather than
+            every device after it moving down one
+
+    Arguments:
+        devices: Optional[List[dict]]
+            default the one scan (SMARTCTL_DEVICES), else what smartctl --scan would have returned
+
+    Returns:
+        Dict[str, dict]
+            disk number (order first seen) to S.M.A.R.T. dict
+    '''
+    if devices is None:
+        if not SMARTCTL_DEVICES:
+            SMARTCTL_DEVICES.extend(smartctl_scan())
+        devices = SMARTCTL_DEVICES
+    mountpoints = smartctl_mountpoints()
+
+    def poll(device):
+        # type: (dict) -> Optional[dict]
+        args = ['-a', device['name']]
+        if device.get('type'):
+            args = ['-d', device['type']] + args
+        try:
+            return smartctl_json(*args)
+        except Exception:
+            logging.warning('unable to read S.M.A.R.T. from "%s"', device['name'], exc_info=True)
+            return None
+
+    smart_data = {}  # type: Dict[str, dict]
+    if not devices:
+        return smart_data
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        for device, data in zip(devices, executor.map(poll, devices)):
+            disk_number = SMARTCTL_NUMBERS.setdefault(device['name'], str(len(SMARTCTL_NUMBERS)))
+            if data is None:
+                data = {'device': {'name': device['name'], 'protocol': device.get('protocol', '')}}
+            smart_data[disk_number] = smartctl_parse(data, disk_number=disk_number, mountpoints=mountpoints)
+    return smart_data
+
+
+SMART_SOURCE_FUNCS = {
+    'crystaldiskinfo': crystaldiskinfo,
+    'smartctl': smartctl,
+}  # type: Dict[str, Callable[[], Dict[str, dict]]]
+
+
+def disk_percent(drive_letters):
+    # type: (str) -> str
+    '''
+    Description:
+        disk usage of the first of the "Drive Letter" S.M.A.R.T. reports, ex) "C: D:" or "/ /boot", "?" if none work
+    '''
+    import psutil
+    for path in drive_letters.split():
+        try:
+            return str(psutil.disk_usage(path).percent)
+        except OSError:
+            continue
+    return '?'
+
+
+def telemetry_smart(stop_event=constants.STOP_EVENT, smart_source=constants.SMART_SOURCE):
+    # type: (threading.Event, str) -> Tuple[Dict[str, dict], dict]
     '''
     Basically smart can fail to detect drive letter stuff from time to time, best to wait a while...
     '''
@@ -262,10 +516,10 @@ def telemetry_smart(stop_event=constants.STOP_EVENT):
     #   File "X:\src\chriscarl.tools.analyze-disk-performance\app.py", line 127, in _telemetry
     #     disk_number = letter_map[drive_letter]
     #                   ~~~~~~~~~~^^^^^^^^^^^^^^
-    while True:
+    while not stop_event.is_set():
         try:
-            cdi = crystaldiskinfo()
-            letter_map = {value['Drive Letter']: num for num, value in cdi.items()}
+            cdi = SMART_SOURCE_FUNCS[smart_source]()
+            letter_map = {value.get('Drive Letter', ''): num for num, value in cdi.items()}
             return cdi, letter_map
         except Exception:
             logging.debug('error, trying again in 5 sec...', exc_info=True)
@@ -273,6 +527,7 @@ def telemetry_smart(stop_event=constants.STOP_EVENT):
                 time.sleep(1 / 100)
                 if stop_event.is_set():
                     break
+    return {}, {}
 
 
 def telemetry_loop(
@@ -284,10 +539,12 @@ def telemetry_loop(
     smart_filepath=constants.SMART_FILEPATH,
     data_filepath=constants.DATA_FILEPATH,
     summary_filepath=constants.SUMMARY_FILEPATH,
+    smart_source=constants.SMART_SOURCE,
+    on_sample=None,
     stop_event=constants.STOP_EVENT,
     **kwargs
 ):
-    # type: (bool, bool, bool, bool, float|int, str, str, str, threading.Event, Any) -> None
+    # type: (bool, bool, bool, bool, float|int, str, str, str, str, Optional[Callable], threading.Event, Any) -> None
     '''
     Description:
         Poll telemetry including S.M.A.R.T. and others.
@@ -301,17 +558,25 @@ def telemetry_loop(
             the destination of the actual file to be written since we're operating at the OS level
         smart_filepath: str
             where to save the crystaldisinfo S.M.A.R.T. data
+                rows are appended to csv segments in the directory of the same name (sans extension),
+                and exported to smart_filepath once at the end
         summary_filepath: str
             where to save the final executive summary
         no_crystaldiskinfo: bool
             default False, disable so you can run without admin
         all_drives: bool
             default False, get all drive S.M.A.R.T. data instead of only the drive who hosts the data_filepath
+        smart_source: str
+            where S.M.A.R.T. comes from, crystaldiskinfo (windows) or smartctl (linux, everything else)
+        on_sample: Optional[Callable]
+            called with every S.M.A.R.T. poll (disk number to dict of all drives), ex) a pipe back to the parent
         **kwargs: varkwarguments
 
     Returns:
         bytearray
     '''
+    import pandas as pd
+    import psutil
     if no_telemetry:
         logging.warning('skipping telemetry!')
         return
@@ -332,7 +597,7 @@ def telemetry_loop(
     unit = 'MB'
 
     if not no_admin and not no_crystaldiskinfo:
-        cdi, letter_map = telemetry_smart(stop_event=stop_event)
+        cdi, letter_map = telemetry_smart(stop_event=stop_event, smart_source=smart_source)
         number_map = {v: k for k, v in letter_map.items()}
         logging.debug('letter_map:\n%s', pprint.pformat(letter_map, indent=2))
         if not cdi:
@@ -343,7 +608,10 @@ def telemetry_loop(
         logging.debug('all S.M.A.R.T.:\n%s', cdi_df[summary_columns])
         if drive_letter:
             disk_number = letter_map[drive_letter]
-        columns = third.upsert_df_to_csv(cdi_df, smart_filepath)
+        smart_store = RollupStore(store_dirpath(smart_filepath))
+        smart_store.extend(cdi.values())
+        if callable(on_sample):
+            on_sample(cdi)
 
         for dn, crystal_disk in cdi.items():
             reads = crystal_disk.get('Host Reads', -1)
@@ -354,7 +622,10 @@ def telemetry_loop(
             if reads == -1:
                 # busted drive
                 continue
-            writes = crystal_disk['Host Writes']
+            writes = crystal_disk.get('Host Writes', -1)
+            if writes == -1:
+                # busted drive
+                continue
             if isinstance(writes, int):
                 host_writes = writes
             else:
@@ -371,24 +642,25 @@ def telemetry_loop(
     while not stop_event.is_set():
         # logging.debug('poll: %d', iteration)
         if not no_admin and not no_crystaldiskinfo:
-            cdi = crystaldiskinfo()
-            with open(smart_filepath, 'a', encoding='utf-8', newline='') as a:
-                writer = csv.DictWriter(a, fieldnames=columns)
-                if disk_number:
-                    value = cdi[str(disk_number)]
-                    writer.writerow(value)
-
-                    # logging.debug(
-                    #     'Disk %s (%s) S.M.A.R.T.\n%s', disk_number, drive_letter,
-                    #     pd.DataFrame([{
-                    #         k: v
-                    #         for k, v in value.items() if k in summary_columns
-                    #     }])
-                    # )
+            cdi = SMART_SOURCE_FUNCS[smart_source]()
+            if callable(on_sample):
+                on_sample(cdi)
+            if disk_number:
+                value = cdi.get(str(disk_number), None)
+                if value is not None:
+                    smart_store.append(value)
+
+                # logging.debug(
+                #     'Disk %s (%s) S.M.A.R.T.\n%s', disk_number, drive_letter,
+                #     pd.DataFrame([{
+                #         k: v
+                #         for k, v in value.items() if k in summary_columns
+                #     }])
+                # )
 
-                else:
-                    for value in cdi.values():
-                        writer.writerow(value)
+            else:
+                smart_store.extend(cdi.values())
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
                     logging.debug(
                         '\n%s',
                         pd.DataFrame(
@@ -407,7 +679,7 @@ def telemetry_loop(
                 reads = crystal_disk.get('Drive Letter', '')
                 model = crystal_disk.get('Model', '???')
                 serial = crystal_disk.get('Serial Number', '???')
-                size = ' '.join(crystal_disk['Disk Size'].split()[:2])
+                size = ' '.join(crystal_disk.get('Disk Size', '??? GB').split()[:2])
 
                 reads = crystal_disk.get('Host Reads', -1)
                 if isinstance(reads, int):
@@ -417,12 +689,21 @@ def telemetry_loop(
                 if reads == -1:
                     # busted drive
                     continue
-                writes = crystal_disk['Host Writes']
+                writes = crystal_disk.get('Host Writes', -1)
+                if writes == -1:
+                    # busted drive
+                    continue
                 if isinstance(writes, int):
                     host_writes = writes
                 else:
                     host_writes = int(writes.split()[0])  # GB naturally
 
+                if dn not in prior_rw['reads']:
+                    # a drive we havent seen (or couldnt read) til now, this poll is its baseline
+                    prior_rw['reads'][dn] = host_reads
+                    prior_rw['writes'][dn] = host_writes
+                    bw_rw['reads'][dn] = bw_rw['writes'][dn] = 0
+                    continue
                 prior_reads = prior_rw['reads'][dn]
                 prior_writes = prior_rw['writes'][dn]
 
@@ -436,10 +717,9 @@ def telemetry_loop(
 
                 # only print if disks are active!
                 if read_throughput > 0 or write_throughput > 0:
-                    du = psutil.disk_usage(dl)
                     logging.info(
                         'Disk %s (%s) | %s | %s | Usage: %s of %s | Read: %0.3f %s/sec | Write: %0.3f %s/sec', dn, dl,
-                        model, serial, du.percent, size, read_throughput, unit, write_throughput, unit
+                        model, serial, disk_percent(dl), size, read_throughput, unit, write_throughput, unit
                     )
 
                     # record priors if enough i/o has passed
@@ -461,7 +741,7 @@ def telemetry_loop(
     if not no_admin and not no_crystaldiskinfo:
         logging.info('S.M.A.R.T. Maximum Read/Write Throughput')
         for dn, dl in number_map.items():
-            crystal_disk = cdi[dn]
+            crystal_disk = cdi.get(dn, {})
             if dn not in bw_rw['reads']:
                 continue
             read_throughput = bw_rw['reads'][dn]
@@ -479,11 +759,12 @@ def telemetry_loop(
             )
 
     if not no_admin and not no_crystaldiskinfo:
-        cdi = crystaldiskinfo()
-        df = pd.DataFrame(cdi.values())
-        third.upsert_df_to_csv(df, smart_filepath)
+        cdi = SMART_SOURCE_FUNCS[smart_source]()
+        smart_store.extend(cdi.values())
+        smart_store.close()
+        smart_store.export(smart_filepath)
 
-        cdi_df = pd.read_csv(smart_filepath)
+        cdi_df = smart_store.read(columns=SUMMARY_COLUMNS)
 
         summary_df = summarize_crystaldiskinfo_df(cdi_df)
         summary_df.to_csv(summary_filepath, index=False)
@@ -497,8 +778,9 @@ def telemetry(
     no_admin=constants.NO_ADMIN,
     no_crystaldiskinfo=constants.NO_CRYSTALDISKINFO,
     all_drives=constants.ALL_DRIVES,
+    smart_source=constants.SMART_SOURCE,
 ):
-    # type: (str, str, str, bool, bool, bool) -> None
+    # type: (str, str, str, bool, bool, bool, str) -> None
     '''
     Description:
         Poll telemetry including S.M.A.R.T. and others.
@@ -508,6 +790,8 @@ def telemetry(
             the destination of the actual file to be written since we're operating at the OS level
         smart_filepath: str
             where to save the crystaldisinfo S.M.A.R.T. data
+                rows are appended to csv segments in the directory of the same name (sans extension),
+                and exported to smart_filepath once at the end
         summary_filepath: str
             where to save the final executive summary
         no_admin: bool
@@ -516,10 +800,14 @@ def telemetry(
             default False, disable so you can run without admin
         all_drives: bool
             default False, get all drive S.M.A.R.T. data instead of only the drive who hosts the data_filepath
+        smart_source: str
+            where S.M.A.R.T. comes from, crystaldiskinfo (windows) or smartctl (linux, everything else)
 
     Returns:
         bytearray
     '''
+    import pandas as pd
+    import psutil
     if all_drives:
         drive_letter = ''
     else:
@@ -528,7 +816,7 @@ def telemetry(
     disk_number = ''
 
     if not no_admin and not no_crystaldiskinfo:
-        cdi, letter_map = telemetry_smart()
+        cdi, letter_map = telemetry_smart(smart_source=smart_source)
         logging.debug(pprint.pformat(letter_map, indent=2))
         logging.debug('letter_map:\n%s', pprint.pformat(letter_map, indent=2))
         if not cdi:
@@ -539,12 +827,9 @@ def telemetry(
         logging.debug('\n%s', cdi_df[summary_columns])
         if drive_letter:
             disk_number = letter_map[drive_letter]
-        columns = third.upsert_df_to_csv(cdi_df, smart_filepath)
-
-        with open(smart_filepath, 'a', encoding='utf-8', newline='') as a:
-            writer = csv.DictWriter(a, fieldnames=columns)
-            for value in cdi.values():
-                writer.writerow(value)
+        with TelemetryStore(store_dirpath(smart_filepath)) as smart_store:
+            smart_store.extend(cdi.values())
+        smart_store.export(smart_filepath)
 
         if drive_letter and disk_number:
             df = pd.DataFrame([cdi[str(disk_number)]])
@@ -552,7 +837,7 @@ def telemetry(
             df = pd.DataFrame(cdi.values())
         logging.info('S.M.A.R.T. Telemetry:\n%s', df.to_string(index=False))
 
-        summary_df = summarize_crystaldiskinfo_df(cdi_df)
+        summary_df = summarize_crystaldiskinfo_df(smart_store.read(columns=SUMMARY_COLUMNS))
         summary_df.to_csv(summary_filepath, index=False)
 
     logging.debug('disk_number: %s, drive_letter: %s', disk_number, drive_letter)
@@ -563,6 +848,40 @@ def telemetry(
         logging.info('disk usage (%s|disk %s): %s%%', drive_letter, disk_number, du.percent)
 
 
+def telemetry_check(
+    no_admin=constants.NO_ADMIN,
+    no_crystaldiskinfo=constants.NO_CRYSTALDISKINFO,
+    smart_source=constants.SMART_SOURCE,
+):
+    # type: (bool, bool, str) -> bool
+    '''
+    Description:
+        make sure S.M.A.R.T. can actually be polled before committing to a collector
+
+    Returns:
+        bool
+            no_crystaldiskinfo, forced high if we're not admin but no_admin says thats ok
+    '''
+    logging.debug('checking admin access...')
+    if system.admin_detect() != 0:
+        if no_admin:
+            logging.warning('running without admin privaleges, setting crystaldiskinfo low!')
+            no_crystaldiskinfo = True
+        else:
+            raise RuntimeError('Must be run as administrator or sudo!')
+
+    if not no_crystaldiskinfo:
+        if smart_source == 'smartctl':
+            logging.debug('checking smartctl access...')
+            if smartctl_detect() != 0:
+                raise RuntimeError('Cannot run smartctl!')
+        else:
+            logging.debug('checking CrystalDiskInfo access...')
+            if crystaldiskinfo_detect() != 0:
+                raise RuntimeError('Cannot run CrystalDiskInfo!')
+    return no_crystaldiskinfo
+
+
 def telemetry_thread(
     no_telemetry=constants.NO_TELEMETRY,
     no_admin=constants.NO_ADMIN,
@@ -572,25 +891,18 @@ def telemetry_thread(
     smart_filepath=constants.SMART_FILEPATH,
     data_filepath=constants.DATA_FILEPATH,
     summary_filepath=constants.SUMMARY_FILEPATH,
+    smart_source=constants.SMART_SOURCE,
+    on_sample=None,
     stop_event=constants.STOP_EVENT,
 ):
-    # type: (bool, bool, bool, bool, float|int, str, str, str, threading.Event) -> Optional[threading.Thread]  # noqa: E501
+    # type: (bool, bool, bool, bool, float|int, str, str, str, str, Optional[Callable], threading.Event) -> Optional[threading.Thread]  # noqa: E501
     if no_telemetry:
         logging.warning('skipping telemetry!')
         return None
 
-    logging.debug('checking admin access...')
-    if system.admin_detect() != 0:
-        if no_admin:
-            logging.warning('running without admin privaleges, setting crystaldiskinfo low!')
-            no_crystaldiskinfo = True
-        else:
-            raise RuntimeError('Must be run as administrator or sudo!')
-
-    if not no_crystaldiskinfo:
-        logging.debug('checking CrystalDiskInfo access...')
-        if crystaldiskinfo_detect() != 0:
-            raise RuntimeError('Cannot run CrystalDiskInfo!')
+    no_crystaldiskinfo = telemetry_check(
+        no_admin=no_admin, no_crystaldiskinfo=no_crystaldiskinfo, smart_source=smart_source
+    )
 
     t = threading.Thread(
         target=telemetry_loop,
@@ -604,7 +916,192 @@ def telemetry_thread(
             poll=poll,
             no_crystaldiskinfo=no_crystaldiskinfo,
             all_drives=all_drives,
+            smart_source=smart_source,
+            on_sample=on_sample,
         )
     )
     t.start()
     return t
+
+
+class PipeQueue(object):
+    '''
+    Description:
+        just enough of a queue for logging.handlers.QueueHandler, so the collector logs come out of the parent
+    '''
+
+    def __init__(self, conn):
+        # type: (Connection) -> None
+        self.conn = conn
+
+    def put_nowait(self, record):
+        # type: (logging.LogRecord) -> None
+        self.conn.send(('log', record))
+
+
+def telemetry_child(conn, stop_event, log_level, exes, loop_kwargs):
+    # type: (Connection, Any, int, Tuple[str, str, str], dict) -> None
+    '''
+    Description:
+        entrypoint of the collector process, everything S.M.A.R.T. (polling, parsing, pandas, the store) happens here
+        logs and samples go back to the parent over conn
+    '''
+    constants.CRYSTALDISKINFO_EXE, constants.CRYSTALDISKINFO_TXT, constants.SMARTCTL_EXE = exes
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(PipeQueue(conn))]  # type: ignore
+    root.setLevel(log_level)
+    try:
+        telemetry_loop(on_sample=lambda cdi: conn.send(('sample', cdi)), stop_event=stop_event, **loop_kwargs)
+    except Exception:
+        logging.exception('telemetry collector crashed!')
+        raise
+    finally:
+        conn.close()
+
+
+def telemetry_relay(conn, process, stop_event, child_stop_event, on_sample=None):
+    # type: (Connection, multiprocessing.process.BaseProcess, threading.Event, Any, Optional[Callable]) -> None
+    '''
+    Description:
+        parent side of the collector: forward the stop signal, handle the logs, hand the samples to on_sample
+        exits once the collector hangs up, so joining this thread means the collector is done
+    '''
+    while True:
+        if stop_event.is_set() and not child_stop_event.is_set():
+            child_stop_event.set()
+        try:
+            if not conn.poll(0.1):
+                continue
+            kind, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if kind == 'log':
+            logging.getLogger(payload.name).handle(payload)
+        elif kind == 'sample' and callable(on_sample):
+            on_sample(payload)
+    conn.close()
+    process.join()
+    if process.exitcode:
+        logging.error('telemetry collector exited with %s!', process.exitcode)
+
+
+def telemetry_process(
+    no_telemetry=constants.NO_TELEMETRY,
+    no_admin=constants.NO_ADMIN,
+    no_crystaldiskinfo=constants.NO_CRYSTALDISKINFO,
+    all_drives=constants.ALL_DRIVES,
+    poll=constants.POLL,
+    smart_filepath=constants.SMART_FILEPATH,
+    data_filepath=constants.DATA_FILEPATH,
+    summary_filepath=constants.SUMMARY_FILEPATH,
+    smart_source=constants.SMART_SOURCE,
+    on_sample=None,
+    stop_event=constants.STOP_EVENT,
+):
+    # type: (bool, bool, bool, bool, float|int, str, str, str, str, Optional[Callable], threading.Event) -> Optional[threading.Thread]  # noqa: E501
+    '''
+    Description:
+        same as telemetry_thread, but telemetry_loop runs in its own process so S.M.A.R.T. polling, parsing and
+        csv writing dont fight the i/o loop for the GIL. the returned thread relays logs/samples and the stop_event,
+        join it like telemetry_thread's.
+    '''
+    if no_telemetry:
+        logging.warning('skipping telemetry!')
+        return None
+
+    no_crystaldiskinfo = telemetry_check(
+        no_admin=no_admin, no_crystaldiskinfo=no_crystaldiskinfo, smart_source=smart_source
+    )
+
+    loop_kwargs = dict(
+        no_telemetry=no_telemetry,
+        no_admin=no_admin,
+        smart_filepath=smart_filepath,
+        data_filepath=data_filepath,
+        summary_filepath=summary_filepath,
+        poll=poll,
+        no_crystaldiskinfo=no_crystaldiskinfo,
+        all_drives=all_drives,
+        smart_source=smart_source,
+    )
+    return telemetry_spawn(loop_kwargs, on_sample=on_sample, stop_event=stop_event)
+
+
+def telemetry_spawn(loop_kwargs, on_sample=None, stop_event=constants.STOP_EVENT):
+    # type: (dict, Optional[Callable], threading.Event) -> threading.Thread
+    '''
+    Description:
+        start telemetry_loop(**loop_kwargs) in a spawned process and the relay thread that babysits it, no checks
+    '''
+    context = multiprocessing.get_context('spawn')
+    child_stop_event = context.Event()
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    exes = (constants.CRYSTALDISKINFO_EXE, constants.CRYSTALDISKINFO_TXT, constants.SMARTCTL_EXE)
+    process = context.Process(
+        target=telemetry_child,
+        args=(child_conn, child_stop_event, logging.getLogger().getEffectiveLevel(), exes, loop_kwargs),
+        name='telemetry',
+    )
+    process.start()
+    child_conn.close()  # so the relay sees EOF when the child goes away
+    logging.debug('telemetry collector pid %s', process.pid)
+
+    t = threading.Thread(
+        target=telemetry_relay,
+        args=(parent_conn, process, stop_event, child_stop_event),
+        kwargs=dict(on_sample=on_sample),
+        name='telemetry-relay',
+    )
+    t.start()
+    return t
+
+
+TELEMETRY_MODE_FUNCS = {
+    'process': telemetry_process,
+    'thread': telemetry_thread,
+}  # type: Dict[str, Callable[..., Optional[threading.Thread]]]
+
+
+def telemetry_start(
+    no_telemetry=constants.NO_TELEMETRY,
+    no_admin=constants.NO_ADMIN,
+    no_crystaldiskinfo=constants.NO_CRYSTALDISKINFO,
+    all_drives=constants.ALL_DRIVES,
+    poll=constants.POLL,
+    smart_filepath=constants.SMART_FILEPATH,
+    data_filepath=constants.DATA_FILEPATH,
+    summary_filepath=constants.SUMMARY_FILEPATH,
+    smart_source=constants.SMART_SOURCE,
+    telemetry_mode=constants.TELEMETRY_MODE,
+    smart_rules=constants.SMART_RULES,
+    incident_filepath=constants.INCIDENT_FILEPATH,
+    on_sample=None,
+    stop_event=constants.STOP_EVENT,
+):
+    # type: (bool, bool, bool, bool, float|int, str, str, str, str, str, List[dict], str, Optional[Callable], threading.Event) -> Optional[threading.Thread]  # noqa: E501
+    '''
+    Description:
+        start the telemetry collector in a separate process (default) or a thread, see telemetry_mode
+        every poll is checked against smart_rules as it arrives, see watchdog.SmartWatchdog
+    '''
+    if smart_rules:
+        smart_watchdog = watchdog.SmartWatchdog(
+            rules=smart_rules,
+            incident_filepath=incident_filepath,
+            data_filepath=data_filepath,
+            stop_event=stop_event,
+        )
+        on_sample = watchdog.chain(smart_watchdog, on_sample)
+    return TELEMETRY_MODE_FUNCS[telemetry_mode](
+        no_telemetry=no_telemetry,
+        no_admin=no_admin,
+        no_crystaldiskinfo=no_crystaldiskinfo,
+        all_drives=all_drives,
+        poll=poll,
+        smart_filepath=smart_filepath,
+        data_filepath=data_filepath,
+        summary_filepath=summary_filepath,
+        smart_source=smart_source,
+        on_sample=on_sample,
+        stop_event=stop_event,
+    )
@@ -453,6 +453,8 @@ def validate_str_int(name, value, default=-1):
 
 
 def validate_json(name, value):
+    if not isinstance(value, str):
+        return value  # already parsed, ex) a default
     try:
         return json.loads(value)
     except Exception as ex:
@@ -0,0 +1,496 @@
+# stdlib
+import os
+import csv
+import glob
+import time
+import logging
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Iterable, Tuple  # noqa: F401
+
+# app
+import constants
+
+SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+
+
+def store_dirpath(filepath):
+    # type: (str) -> str
+    '''
+    Description:
+        the segment directory that backs a csv filepath
+        >>> store_dirpath('/tmp/smart.csv')  # '/tmp/smart'
+    '''
+    return os.path.splitext(filepath)[0]
+
+
+def read_header(filepath):
+    # type: (str) -> List[str]
+    with open(filepath, 'r', encoding='utf-8', newline='') as r:
+        reader = csv.reader(r)
+        for row in reader:
+            return row
+    return []
+
+
+def read_last_row(filepath, tail=64 * constants.KB):
+    # type: (str, int) -> dict
+    '''
+    Description:
+        the last row of a csv without reading the whole thing, {} if there are no rows
+    '''
+    header = read_header(filepath)
+    with open(filepath, 'rb') as rb:
+        rb.seek(0, os.SEEK_END)
+        size = rb.tell()
+        rb.seek(max(0, size - tail))
+        lines = rb.read().decode('utf-8', errors='replace').splitlines()
+    lines = [line for line in lines if line.strip()]
+    if len(lines) < 2 and size <= tail:
+        return {}  # header only
+    for row in csv.reader(lines[-1:]):
+        return dict(zip(header, row))
+    return {}
+
+
+def row_timestamp(row, key='datetime'):
+    # type: (dict, str) -> float
+    value = row.get(key, None)
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def leading_number(value):
+    # type: (Any) -> Tuple[Optional[float], str]
+    '''
+    Description:
+        >>> leading_number(8202)  # (8202.0, '')
+        >>> leading_number('8202 GB')  # (8202.0, 'GB')
+        >>> leading_number('Good (100 %)')  # (None, '')
+    '''
+    if isinstance(value, bool):
+        return None, ''
+    if isinstance(value, (int, float)):
+        return (None, '') if value != value else (float(value), '')  # NaN
+    parts = str(value).split()
+    if not parts:
+        return None, ''
+    try:
+        return float(parts[0]), parts[1] if len(parts) > 1 else ''
+    except ValueError:
+        return None, ''
+
+
+class TelemetryStore(object):
+    '''
+    Description:
+        append-only telemetry rows stored as a directory of csv segments, ex) smart/000000.csv, smart/000001.csv
+        rows are buffered in memory and flushed in batches, nothing ever gets read back in order to write
+        if a row shows up with a column the current segment doesnt have, a new segment is started with the union,
+            so new S.M.A.R.T. attributes never force a rewrite of what was already written
+
+    Arguments:
+        dirpath: str
+            directory where the segments live, created if it doesnt exist, existing segments are kept
+        flush_rows: int
+            flush once this many rows are buffered
+        flush_interval: float|int
+            flush if this many seconds passed since the last flush, checked on append
+        segment_rows: int
+            start a new segment once the current one holds this many rows
+        segment_seconds: float|int
+            default -1, else also start a new segment once the current one is this old, so prune has something to cut
+    '''
+
+    def __init__(
+        self,
+        dirpath,
+        flush_rows=constants.STORE_FLUSH_ROWS,
+        flush_interval=constants.STORE_FLUSH_INTERVAL,
+        segment_rows=constants.STORE_SEGMENT_ROWS,
+        segment_seconds=-1,
+    ):
+        # type: (str, int, float|int, int, float|int) -> None
+        self.dirpath = os.path.abspath(dirpath)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.buffer = []  # type: List[dict]
+        self.columns = []  # type: List[str]
+        self.segment = -1
+        self.segment_count = 0
+        self.segment_started = time.time()
+        self.last_flush = time.time()
+        self.lock = threading.Lock()
+        os.makedirs(self.dirpath, exist_ok=True)
+        segments = self.segments()
+        if segments:
+            # never append into an old segment, we dont know what happened to it
+            self.segment = int(os.path.splitext(os.path.basename(segments[-1]))[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def segment_filepath(self, segment):
+        # type: (int) -> str
+        return os.path.join(self.dirpath, f'{segment:06d}.csv')
+
+    def segments(self):
+        # type: () -> List[str]
+        return sorted(glob.glob(os.path.join(self.dirpath, '[0-9]' * 6 + '.csv')))
+
+    def append(self, row):
+        # type: (dict) -> None
+        with self.lock:
+            self.buffer.append(row)
+            due = (
+                len(self.buffer) >= self.flush_rows or time.time() - self.last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def extend(self, rows):
+        # type: (Iterable[dict]) -> None
+        for row in rows:
+            self.append(row)
+
+    def _rotate(self, columns):
+        # type: (List[str]) -> None
+        self.segment += 1
+        self.segment_count = 0
+        self.segment_started = time.time()
+        self.columns = columns
+        with open(self.segment_filepath(self.segment), 'w', encoding='utf-8', newline='') as w:
+            csv.DictWriter(w, fieldnames=self.columns).writeheader()
+        logging.debug('telemetry segment %d with %d columns', self.segment, len(self.columns))
+
+    def _write(self, rows):
+        # type: (List[dict]) -> None
+        if not rows:
+            return
+        with open(self.segment_filepath(self.segment), 'a', encoding='utf-8', newline='') as a:
+            writer = csv.DictWriter(a, fieldnames=self.columns, restval='')
+            writer.writerows(rows)
+
+    def flush(self):
+        # type: () -> int
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+            self.last_flush = time.time()
+            batch = []  # type: List[dict]
+            for row in rows:
+                new_columns = [key for key in row if key not in self.columns]
+                too_old = self.segment_seconds > 0 and time.time() - self.segment_started >= self.segment_seconds
+                if self.segment == -1 or new_columns or self.segment_count >= self.segment_rows or too_old:
+                    self._write(batch)
+                    batch = []
+                    self._rotate(self.columns + new_columns)
+                batch.append(row)
+                self.segment_count += 1
+            self._write(batch)
+            return len(rows)
+
+    def prune(self, cutoff, key='datetime'):
+        # type: (float, str) -> List[str]
+        '''
+        Description:
+            delete whole segments whose newest row is older than cutoff (epoch seconds), never the one being written
+
+        Returns:
+            List[str]
+                the segments that were deleted
+        '''
+        self.flush()
+        pruned = []
+        with self.lock:
+            current = self.segment_filepath(self.segment)
+            for segment in self.segments():
+                if segment == current:
+                    continue
+                last = read_last_row(segment)
+                if not last or row_timestamp(last, key=key) < cutoff:
+                    os.remove(segment)
+                    pruned.append(segment)
+        if pruned:
+            logging.debug('pruned %d segments from "%s"', len(pruned), self.dirpath)
+        return pruned
+
+    def all_columns(self):
+        # type: () -> List[str]
+        columns = []  # type: List[str]
+        for segment in self.segments():
+            for column in read_header(segment):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def read(self, columns=None):
+        # type: (Optional[List[str]]) -> pd.DataFrame
+        '''
+        Description:
+            read every segment back as one DataFrame, parsing only the requested columns
+
+        Arguments:
+            columns: Optional[List[str]]
+                default everything, else only parse these columns, missing ones are skipped
+
+        Returns:
+            pd.DataFrame
+        '''
+        import pandas as pd
+        self.flush()
+        dfs = []
+        for segment in self.segments():
+            if columns is None:
+                df = pd.read_csv(segment)
+            else:
+                df = pd.read_csv(segment, usecols=lambda column: column in columns)
+            if len(df):
+                dfs.append(df)
+        if not dfs:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(dfs, ignore_index=True, sort=False)
+
+    def export(self, filepath):
+        # type: (str) -> List[str]
+        '''
+        Description:
+            stream every segment into one csv (ex: smart.csv) with the union of all columns, linear in rows
+
+        Returns:
+            List[str]
+                the columns of the exported csv
+        '''
+        self.flush()
+        columns = self.all_columns()
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8', newline='') as w:
+            writer = csv.DictWriter(w, fieldnames=columns, restval='')
+            writer.writeheader()
+            for segment in self.segments():
+                with open(segment, 'r', encoding='utf-8', newline='') as r:
+                    writer.writerows(csv.DictReader(r))
+        return columns
+
+    def close(self):
+        # type: () -> None
+        self.flush()
+
+
+def with_unit(value, unit):
+    # type: (float, str) -> Any
+    # ex) 8202.0, GB -> "8202 GB", 12.3456, '' -> 12.346
+    value = int(value) if float(value).is_integer() else round(value, 3)
+    return f'{value} {unit}' if unit else value
+
+
+class RollupStore(object):
+    '''
+    Description:
+        round robin style retention on top of TelemetryStore, so a multi week soak stays bounded to store and summarize
+            - dirpath/raw/: every sample, kept for raw_retention seconds
+            - dirpath/60s/, dirpath/3600s/, ...: one row per key (drive) per bucket, kept for that tiers retention
+        buckets are maintained incrementally as samples arrive, a bucket is written once a sample lands past it
+        a bucket row has the last value of every column plus "{col} (min)", "{col} (max)", "{col} (mean)" for anything
+            numeric (units like "GB" are kept), "datetime" is the first sample and "datetime (last)" the last one
+
+    Arguments:
+        dirpath: str
+            directory where the raw and tier segments live
+        key: str
+            column that identifies a drive, buckets are per key
+        raw_retention: float|int
+            seconds of raw samples to keep, -1 keeps everything
+        tiers: List[Tuple[int, float|int]]
+            (bucket seconds, retention seconds) finest first, -1 retention keeps everything
+        segment_rows: int
+            passed on to every TelemetryStore
+    '''
+
+    def __init__(
+        self,
+        dirpath,
+        key='Serial Number',
+        raw_retention=constants.ROLLUP_RAW_RETENTION,
+        tiers=constants.ROLLUP_TIERS,
+        segment_rows=constants.STORE_SEGMENT_ROWS,
+    ):
+        # type: (str, str, float|int, List[Tuple[int, float|int]], int) -> None
+        self.dirpath = os.path.abspath(dirpath)
+        self.key = key
+        self.raw_retention = raw_retention
+        self.tiers = sorted(tiers)
+        # rotate a few times per retention window so pruning frees space in reasonable steps
+        self.raw = TelemetryStore(
+            os.path.join(self.dirpath, 'raw'), segment_rows=segment_rows, segment_seconds=raw_retention / 4
+        )
+        self.tier_stores = {
+            width: TelemetryStore(
+                os.path.join(self.dirpath, f'{width}s'), segment_rows=segment_rows, segment_seconds=retention / 4
+            )
+            for width, retention in self.tiers
+        }  # type: Dict[int, TelemetryStore]
+        self.buckets = {}  # type: Dict[Tuple[str, int], dict]
+        self.latest = 0.0
+        self.last_prune = 0.0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _bucket_row(self, bucket):
+        # type: (dict) -> dict
+        row = dict(bucket['last'])
+        row['datetime'] = bucket['first']
+        row['datetime (last)'] = bucket['last'].get('datetime', '')
+        row['samples'] = bucket['samples']
+        for column, (minimum, maximum, total, count, unit) in bucket['stats'].items():
+            row[f'{column} (min)'] = with_unit(minimum, unit)
+            row[f'{column} (max)'] = with_unit(maximum, unit)
+            row[f'{column} (mean)'] = with_unit(total / count, unit)
+        return row
+
+    def _update(self, row, timestamp):
+        # type: (dict, float) -> None
+        key = str(row.get(self.key, ''))
+        for width, _ in self.tiers:
+            index = int(timestamp // width)
+            bucket = self.buckets.get((key, width), None)
+            if bucket is not None and bucket['index'] != index:
+                self.tier_stores[width].append(self._bucket_row(bucket))
+                bucket = None
+            if bucket is None:
+                bucket = dict(index=index, first=row.get('datetime', ''), samples=0, stats={})
+                self.buckets[(key, width)] = bucket
+            bucket['last'] = row
+            bucket['samples'] += 1
+            stats = bucket['stats']
+            for column, value in row.items():
+                if column == self.key or column in constants.ROLLUP_IGNORE_KEYS:
+                    continue
+                number, unit = leading_number(value)
+                if number is None:
+                    continue
+                if column not in stats:
+                    stats[column] = [number, number, number, 1, unit]
+                    continue
+                stat = stats[column]
+                stat[0] = min(stat[0], number)
+                stat[1] = max(stat[1], number)
+                stat[2] += number
+                stat[3] += 1
+
+    def append(self, row):
+        # type: (dict) -> None
+        timestamp = row_timestamp(row)
+        self.raw.append(row)
+        with self.lock:
+            self._update(row, timestamp)
+            self.latest = max(self.latest, timestamp)
+            due = self.latest - self.last_prune >= constants.ROLLUP_PRUNE_INTERVAL
+            if due:
+                self.last_prune = self.latest
+        if due:
+            self.prune()
+
+    def extend(self, rows):
+        # type: (Iterable[dict]) -> None
+        for row in rows:
+            self.append(row)
+
+    def prune(self):
+        # type: () -> List[str]
+        '''
+        Description:
+            drop raw and tier segments that fell out of their retention, relative to the newest sample
+        '''
+        pruned = []
+        if self.raw_retention > 0:
+            pruned += self.raw.prune(self.latest - self.raw_retention)
+        for width, retention in self.tiers:
+            if retention > 0:
+                pruned += self.tier_stores[width].prune(self.latest - retention)
+        return pruned
+
+    def flush(self):
+        # type: () -> int
+        return self.raw.flush() + sum(store.flush() for store in self.tier_stores.values())
+
+    def read(self, columns=None):
+        # type: (Optional[List[str]]) -> pd.DataFrame
+        '''
+        Description:
+            raw samples plus two rows per bucket: its min values at its first datetime, its last values at its last
+            thats enough for min/max/first/last style summaries (summarize_crystaldiskinfo_df) over the whole run,
+                while only ever parsing a bounded number of rows
+
+        Arguments:
+            columns: Optional[List[str]]
+                default everything, else only these columns
+
+        Returns:
+            pd.DataFrame
+        '''
+        import pandas as pd
+        if columns is None:
+            columns = self.raw.all_columns()
+            for store in self.tier_stores.values():
+                for column in store.all_columns():
+                    if column not in columns and not column.endswith((' (min)', ' (max)', ' (mean)', ' (last)')):
+                        columns.append(column)
+        wanted = set(columns) | {f'{column} (min)' for column in columns} | {'datetime (last)'}
+        dfs = [self.raw.read(columns=columns)]
+        for store in self.tier_stores.values():
+            df = store.read(columns=list(wanted))
+            if not len(df):
+                continue
+            present = [column for column in columns if column in df.columns]
+            start = df[present].copy()
+            for column in present:
+                if f'{column} (min)' in df.columns:
+                    start[column] = df[f'{column} (min)'].where(df[f'{column} (min)'].notna(), df[column])
+            end = df[present].copy()
+            if 'datetime (last)' in df.columns:
+                end['datetime'] = df['datetime (last)']
+            dfs += [start, end]
+        dfs = [df for df in dfs if len(df)]
+        if not dfs:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(dfs, ignore_index=True, sort=False)
+
+    def export(self, filepath):
+        # type: (str) -> List[str]
+        '''
+        Description:
+            raw samples to filepath (ex: smart.csv), each tier next to it (ex: smart.60s.csv, smart.3600s.csv)
+        '''
+        base, ext = os.path.splitext(filepath)
+        columns = self.raw.export(filepath)
+        for width, store in self.tier_stores.items():
+            store.export(f'{base}.{width}s{ext}')
+        return columns
+
+    def close(self):
+        # type: () -> None
+        '''
+        Description:
+            write out the buckets that are still open, a partial bucket beats losing the tail of the run
+        '''
+        with self.lock:
+            for (_, width), bucket in self.buckets.items():
+                self.tier_stores[width].append(self._bucket_row(bucket))
+            self.buckets = {}
+        self.raw.close()
+        for store in self.tier_stores.values():
+            store.close()
@@ -1,11 +1,12 @@
 # stdlib
 import os
+import sys
 import json
 import logging
+import glob
 import subprocess
 from typing import List, Optional, Dict, Any  # noqa: F401
 
-# third party
 from stdlib import abspath
 import constants
 
@@ -14,6 +15,12 @@ SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
 
 def admin_detect():
     # type: () -> int
+    if sys.platform != 'win32':
+        if os.geteuid() != 0:
+            logging.warning('Not root!')
+            return 1
+        logging.debug('Root detected!')
+        return 0
     try:
         admin_ps1 = abspath(SCRIPT_DIRPATH, r"scripts\win32\admin.ps1")
         subprocess.check_call(['powershell', admin_ps1])
@@ -180,3 +187,101 @@ def read_disks(ignore_partitions=constants.IGNORE_PARTITIONS, include_partitions
                 )
 
     return disk_number_to_letter
+
+
+def cpus_available():
+    # type: () -> List[int]
+    '''
+    Description:
+        logical cpus this process is allowed on, which may already be fewer than the machine has (taskset, cgroups)
+    '''
+    import psutil
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    try:
+        return sorted(psutil.Process().cpu_affinity())
+    except (AttributeError, psutil.Error):  # macos has neither
+        return list(range(constants.CPU_COUNT))
+
+
+def cpu_topology(dirpath=constants.CPU_TOPOLOGY_DIRPATH, available=None):
+    # type: (str, Optional[List[int]]) -> List[List[int]]
+    '''
+    Description:
+        physical cores as lists of their logical cpus (hyperthread siblings), ordered by socket then core
+        only cpus this process is allowed on (or available), every logical cpu is its own core if the topology
+            isnt readable
+        >>> cpu_topology()  # [[0, 8], [1, 9], ..., [7, 15]]
+    '''
+    available = set(cpus_available() if available is None else available)
+    cores = {}  # type: Dict[tuple, List[int]]
+    for cpu_dirpath in glob.glob(os.path.join(dirpath, 'cpu[0-9]*')):
+        cpu = int(os.path.basename(cpu_dirpath)[len('cpu'):])
+        if cpu not in available:
+            continue
+        try:
+            with open(os.path.join(cpu_dirpath, 'topology', 'physical_package_id')) as r:
+                package = int(r.read())
+            with open(os.path.join(cpu_dirpath, 'topology', 'core_id')) as r:
+                core = int(r.read())
+        except (OSError, ValueError):
+            logging.debug('cpu topology unreadable at %s, treating every cpu as a core', cpu_dirpath)
+            return [[cpu] for cpu in sorted(available)]
+        cores.setdefault((package, core), []).append(cpu)
+    if not cores:
+        return [[cpu] for cpu in sorted(available)]
+    return [sorted(cores[key]) for key in sorted(cores)]
+
+
+def cpu_sets(workers, topology=None):
+    # type: (int, Optional[List[List[int]]]) -> List[List[int]]
+    '''
+    Description:
+        split the cores evenly into one set per worker, siblings stay together and neighbors share a socket
+        more workers than cores wraps around, so some end up sharing
+
+    Arguments:
+        workers: int
+            how many sets
+        topology: Optional[List[List[int]]]
+            default None for cpu_topology(), else cores as lists of logical cpus
+
+    Returns:
+        List[List[int]]
+            logical cpus for each worker
+    '''
+    cores = topology or cpu_topology()
+    if workers <= 0 or not cores:
+        return []
+    if workers > len(cores):
+        logging.warning('%d workers on %d cores, some will have to share', workers, len(cores))
+    per_worker = max(1, len(cores) // workers)
+    return [
+        sorted(cpu for c in range(per_worker) for cpu in cores[(w * per_worker + c) % len(cores)])
+        for w in range(workers)
+    ]
+
+
+def cpu_pin(cpus):
+    # type: (List[int]) -> bool
+    '''
+    Description:
+        pin this process to cpus, threads started afterwards inherit it, so do this first thing
+
+    Returns:
+        bool
+            True if pinned
+    '''
+    import psutil
+    if not cpus:
+        return False
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+        else:
+            psutil.Process().cpu_affinity(list(cpus))
+    except (AttributeError, OSError, ValueError, psutil.Error):
+        logging.warning('unable to pin to cpus %s', cpus, exc_info=True)
+        return False
+    logging.debug('pinned to cpus %s', cpus)
+    return True
@@ -0,0 +1,68 @@
+# stdlib imports
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import benchmarks  # noqa: E402
+
+
+def test_orchestrate_timeouts_and_drive_stops():
+    sleeper = [sys.executable, '-c', 'import time; time.sleep(60)']
+    drive_stop_event = threading.Event()
+    threading.Timer(0.5, drive_stop_event.set).start()
+    with tempfile.TemporaryDirectory() as tempdir:
+        workers = {
+            'good': ([sys.executable, '-c', 'print("hello")'], os.path.join(tempdir, 'good.stdout')),
+            'slow': (sleeper, os.path.join(tempdir, 'slow.stdout')),
+            'bad': (sleeper, os.path.join(tempdir, 'bad.stdout')),
+        }
+        start = time.time()
+        exit_codes = asyncio.run(
+            benchmarks.orchestrate(workers, poll=0.2, timeout=2, drive_stop_events={'bad': drive_stop_event})
+        )
+        elapsed = time.time() - start
+        with open(os.path.join(tempdir, 'good.stdout')) as r:
+            assert r.read().strip() == 'hello'
+
+    assert exit_codes['good'] == 0
+    assert exit_codes['slow'] != 0 and exit_codes['bad'] != 0
+    assert elapsed < 10, 'nobody waits on the sleepers'
+
+
+def test_health_targets():
+    with tempfile.TemporaryDirectory() as tempdir:
+        images = [os.path.join(tempdir, f'disk{i}.img') for i in range(2)]
+        for image in images:
+            with open(image, 'wb') as wb:
+                wb.truncate(8 * constants.MB)
+        exit_codes = benchmarks.health(
+            targets=images, size=constants.MB, iterations=1, poll=0.2, worker_report_every=-1, pin_workers=True,
+            no_telemetry=True, stop_event=threading.Event()
+        )
+        assert exit_codes == {'0': 0, '1': 0}
+        assert not constants.DRIVE_STOP_EVENTS, 'no S.M.A.R.T., no per drive events'
+        for image in images:
+            assert os.path.getsize(image) == 8 * constants.MB, 'images are written in place, never resized or removed'
+
+        # directories get a data file, fulpak would fill the whole tmp disk so dont actually run one
+        assert benchmarks.target_to_data_filepath(tempdir, '2') == (os.path.join(tempdir, '2-health.dat'), False)
+        assert benchmarks.target_to_data_filepath(images[0], '0') == (images[0], True)
+
+
+def test_target_stop_key():
+    cdi = {
+        '0': {'Drive Letter': '/ /boot', 'Serial Number': '???'},
+        '1': {'Drive Letter': '/mnt/a', 'Serial Number': 'S6B0NL0T123456'},
+    }
+    assert benchmarks.target_stop_key(cdi, '/mnt/a/0-health.dat') == 'S6B0NL0T123456', 'serials survive renumbering'
+    assert benchmarks.target_stop_key(cdi, '/home/disk.img') == '0', 'else the disk number'
+    assert benchmarks.target_stop_key({}, '/mnt/a/0-health.dat') == '', 'unknown, so not registered'
@@ -0,0 +1,53 @@
+# stdlib imports
+import os
+import sys
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import filesystem  # noqa: E402
+
+
+def test_smallfiles_phases():
+    with tempfile.TemporaryDirectory() as tempdir:
+        data_filepath = os.path.join(tempdir, 'data.dat')
+        result = filesystem.smallfiles(
+            data_filepath=data_filepath, smallfiles_count=50, smallfiles_sizes=[constants.KB, 3 * constants.KB],
+            sync='end', tree_depth=2, tree_fanout=3, numjobs=4, no_delete=True
+        )
+        root = os.path.join(tempdir, 'data.smallfiles')
+        sizes = sorted(os.path.getsize(os.path.join(dirpath, filename)) for dirpath, _, filenames in os.walk(root)
+                       for filename in filenames)
+        assert sizes == [constants.KB] * 25 + [3 * constants.KB] * 25
+        assert len(os.listdir(os.path.join(root, 'd02'))) == 3
+        assert result['create_ops'] == result['read_ops'] == 50 and 'delete_ops' not in result, 'no_delete'
+        assert result['create_bytes'] == result['read_bytes'] == 50 * 2 * constants.KB
+        assert 0 < result['sync_lat_p50_us'] <= result['sync_lat_max_us'] <= result['create_lat_max_us']
+
+        result = filesystem.smallfiles(data_filepath=os.path.join(tempdir, 'other.dat'), smallfiles_count=10)
+        assert result['ops'] == 30 and result['delete_ops_per_sec'] > 0
+        assert sorted(os.listdir(tempdir)) == ['data.smallfiles'], 'cleaned up after itself'
+
+
+def test_metadata_phases():
+    with tempfile.TemporaryDirectory() as tempdir:
+        data_filepath = os.path.join(tempdir, 'data.dat')
+        result = filesystem.metadata(
+            data_filepath=data_filepath, metadata_count=40, tree_depth=2, tree_fanout=3, numjobs=4, no_delete=True
+        )
+        root = os.path.join(tempdir, 'data.metadata')
+        assert sorted(os.listdir(os.path.join(root, 'd01', 'd02'))) == [
+            'f00000005.renamed', 'f00000014.renamed', 'f00000023.renamed', 'f00000032.renamed'
+        ]
+        assert result['mkdir_ops'] == result['readdir_ops'] == 3 + 9
+        assert result['create_ops'] == result['stat_ops'] == result['rename_ops'] == 40
+        assert 'unlink_ops' not in result and 'rmdir_ops' not in result, 'no_delete'
+
+        result = filesystem.metadata(data_filepath=os.path.join(tempdir, 'other.dat'), metadata_count=10, numjobs=2)
+        assert result['unlink_ops'] == 10 and result['rmdir_ops'] == result['mkdir_ops'] == 16 + 256
+        assert 0 < result['stat_lat_p50_us'] <= result['stat_lat_max_us']
+        assert sorted(os.listdir(tempdir)) == ['data.metadata'], 'cleaned up after itself'
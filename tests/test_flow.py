@@ -0,0 +1,85 @@
+# stdlib imports
+import os
+import sys
+import tempfile
+import threading
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import flow  # noqa: E402
+
+
+def test_flow_targets_fail_on_their_own():
+    with tempfile.TemporaryDirectory() as tempdir:
+        good = [os.path.join(tempdir, 'a.dat'), os.path.join(tempdir, 'b.dat')]
+        bad = os.path.join(tempdir, 'missing', 'c.dat')
+        stop_event = threading.Event()
+        try:
+            flow.flow(
+                steps=['write_burnin', 'read_seq'],
+                flow_iterations=3,
+                data_filepath=good[0],
+                flow_targets=[good[1], bad],
+                size=constants.MB,
+                no_delete=True,
+                stop_event=stop_event,
+            )
+            assert False, 'c.dat cant be written'
+        except RuntimeError as re:
+            assert str(re).startswith('1 / 3 targets failed: "' + bad), re
+        assert not stop_event.is_set(), 'one target finishing or failing doesnt stop the others, or the caller'
+        assert os.listdir(tempdir) == [], 'the good targets finished and cleaned up'
+
+
+def test_sweep_resumes():
+    with tempfile.TemporaryDirectory() as tempdir:
+        kwargs = dict(
+            sweep_step='io_workload',
+            sweep_chunk_sizes=[4 * constants.KB, 64 * constants.KB],
+            sweep_iodepths=[1, 2],
+            sweep_numjobs=[1, 2],
+            sweep_filepath=os.path.join(tempdir, 'sweep.csv'),
+            data_filepath=os.path.join(tempdir, 'data.dat'),
+            size=constants.MB,
+            rw='read',
+            stop_event=threading.Event(),
+        )
+        df = flow.sweep(sweep_only=[{'chunk_size': '4KB', 'iodepth': 2}], **kwargs)
+        assert len(df) == 2 and set(df['numjobs']) == {1, 2}
+        df = flow.sweep(**kwargs)
+        assert len(df) == 8, 'the 2 done already are skipped, not redone'
+        assert (df['status'] == 'ok').all()
+        assert not df.duplicated(flow.SWEEP_KEYS).any()
+        assert sorted(os.listdir(tempdir)) == ['sweep.csv']
+
+
+def test_flow_stats_rejects_outliers():
+    assert flow.mad_outliers([100, 101, 99, 100, 40]) == [False, False, False, False, True]
+    assert flow.mad_outliers([100, 100, 100, 40]) == [False, False, False, True]
+    assert flow.mad_outliers([100, 40]) == [False, False], 'too few to tell'
+    iterations = [{'1-read_seq': dict(throughput=value, elapsed=1.0)} for value in [100.0, 101.0, 99.0, 100.0, 40.0]]
+    df = flow.flow_stats(iterations).set_index('metric')
+    assert df.loc['throughput', 'n'] == 4 and df.loc['throughput', 'rejected'] == 1
+    assert df.loc['throughput', 'mean'] == 100.0 and df.loc['throughput', 'min'] == 99.0
+    assert 0 < df.loc['throughput', 'ci'] < 2
+    df = flow.flow_stats(iterations, flow_outliers=-1).set_index('metric')
+    assert df.loc['throughput', 'n'] == 5 and df.loc['throughput', 'min'] == 40.0
+
+
+def test_flow_keeps_every_iteration():
+    with tempfile.TemporaryDirectory() as tempdir:
+        df = flow.flow(
+            steps=['write_burnin', 'read_seq'],
+            flow_iterations=3,
+            data_filepath=os.path.join(tempdir, 'data.dat'),
+            size=constants.MB,
+            no_delete=True,
+            stop_event=threading.Event(),
+        )
+        throughput = df[df['metric'] == 'throughput']
+        assert throughput['step'].tolist() == ['1-write_burnin', '2-read_seq']
+        assert (throughput['n'] + throughput['rejected'] == 3).all()
@@ -0,0 +1,86 @@
+# stdlib imports
+import os
+import sys
+import tempfile
+import subprocess
+from multiprocessing import shared_memory
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import input_output  # noqa: E402
+
+
+def test_shared_pattern_outlives_its_workers():
+    size = 3 * constants.MB + 5
+    pattern = input_output.pattern_share(size=size)
+    try:
+        view = input_output.pattern_attach(pattern.name, size=size)
+        assert len(view) == size and view.readonly
+        assert view[:constants.MB] == view[constants.MB:2 * constants.MB], 'cheating repeats the first 1MB'
+        assert input_output.get_byte_array(pattern_name=pattern.name, size=size) == view
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            data_filepath = os.path.join(tempdir, 'data.dat')
+            for _ in range(2):  # the first worker leaving must not take the pattern with it
+                subprocess.check_call(
+                    [
+                        sys.executable, os.path.join(ROOT_DIRPATH, 'main.py'), 'flow', '--steps', 'write_burnin',
+                        'read_seq', '--data-filepath', data_filepath, '--size', str(size), '--pattern-name',
+                        pattern.name, '--no-telemetry', '--flow-iterations', '2'
+                    ],
+                    stdout=subprocess.DEVNULL,
+                )  # read_seq verifies what write_burnin wrote against the same pattern
+    finally:
+        del view
+        input_output.pattern_unshare(pattern.name)
+
+    try:
+        shared_memory.SharedMemory(name=pattern.name).close()
+        assert False, 'the coordinator unlinks it'
+    except FileNotFoundError:
+        pass
+
+
+def test_sync_policies():
+    with tempfile.TemporaryDirectory() as tempdir:
+        data_filepath = os.path.join(tempdir, 'data.dat')
+        syncs = {}
+        for sync in constants.SYNCS:
+            syncer = input_output.Syncer(sync, sync_every=constants.MB)
+            with open(data_filepath, 'wb', opener=syncer.opener) as wb:
+                for _ in range(8):
+                    syncer.wrote(wb, wb.write(bytes(512 * constants.KB)))
+                syncer.end(wb)
+            syncs[sync] = len(syncer.latencies)
+            assert syncer.elapsed >= 0 and os.path.getsize(data_filepath) == 4 * constants.MB
+        assert syncs == dict(none=0, end=1, bytes=4, op=8, dsync=0)
+
+        for sync, sync_every in [('never', constants.MB), ('bytes', -1)]:
+            try:
+                input_output.Syncer(sync, sync_every=sync_every)
+                assert False, f'{sync} {sync_every} should have raised'
+            except ValueError:
+                pass
+
+        bytes_written, _, _ = input_output.write_burnin(
+            data_filepath=data_filepath, size=2 * constants.MB, chunk_size=64 * constants.KB, sync='op'
+        )
+        assert bytes_written == 2 * constants.MB and not os.path.exists(data_filepath)
+
+
+def test_write_fulpak_fills_an_image_to_the_last_byte():
+    with tempfile.TemporaryDirectory() as tempdir:
+        image = os.path.join(tempdir, 'disk.img')
+        with open(image, 'wb') as wb:
+            wb.truncate(constants.MB + 512 * constants.KB)
+        # a pattern under 1MB, the tail is less than one 1MB increment
+        bytes_written, _, _ = input_output.write_fulpak(
+            data_filepath=image, size=512 * constants.KB, chunk_size=64 * constants.KB, value=7, in_place=True
+        )
+        assert bytes_written == constants.MB + 512 * constants.KB
+        with open(image, 'rb') as rb:
+            assert rb.read()[-16:] == bytes([7] * 16), 'the end of the image is written too'
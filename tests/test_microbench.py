@@ -0,0 +1,40 @@
+# stdlib imports
+import os
+import sys
+import subprocess
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import microbench  # noqa: E402
+
+
+def test_compare_against_baseline():
+    with tempfile.TemporaryDirectory() as tempdir:
+        baseline = microbench.run(names=['io_loops'], size=constants.MB, dirpath=tempdir)
+        assert os.listdir(tempdir) == []
+    assert set(baseline['io_loops']) == {'write_burnin', 'write_fulpak', 'read_seq', 'read_rand'}
+    assert baseline['io_loops']['write_fulpak']['4KB']['bytes'] > constants.MB, 'in place, more than one pass'
+    assert microbench.compare(baseline, baseline) == []
+    slower = dict(baseline, io_loops=dict(baseline['io_loops'], read_seq={'4KB': dict(
+        baseline['io_loops']['read_seq']['4KB'], chunk_ns=baseline['io_loops']['read_seq']['4KB']['chunk_ns'] * 2
+    )}))
+    assert microbench.compare(slower, baseline) == [
+        f'io_loops.read_seq.4KB.chunk_ns: {baseline["io_loops"]["read_seq"]["4KB"]["chunk_ns"]:0.6g} -> '
+        f'{slower["io_loops"]["read_seq"]["4KB"]["chunk_ns"]:0.6g} (+100.0%)'
+    ]
+
+
+def test_startup_leaves_the_heavy_imports_to_the_steps():
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(ROOT_DIRPATH, 'main.py'), 'create', '--help'],
+        capture_output=True, text=True, check=True
+    )
+    assert '--no-cheat' in proc.stdout
+    imported = {line.split('|')[2].strip() for line in proc.stderr.splitlines() if line.startswith('import time:')}
+    assert not imported & {'pandas', 'numpy', 'psutil', 'asyncio', 'sqlite3'}
+    assert microbench.import_us(proc.stderr) > 0
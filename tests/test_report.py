@@ -0,0 +1,100 @@
+# stdlib imports
+import os
+import sys
+import asyncio
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import report  # noqa: E402
+import watchdog  # noqa: E402
+
+WORKER = '''
+import sys, time, logging
+sys.path.insert(0, sys.argv[1])
+import report, watchdog
+logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+report.enable(report_every=0.05)
+report.step('write_burnin')
+with watchdog.IOProgress('data.dat') as progress:
+    for offset in range(20):
+        progress.begin('write', offset)
+        progress.end(1024)
+        logging.info('wrote %d', offset)
+        time.sleep(0.01)
+logging.error('uh oh')
+report.emit('done', success=False)
+'''
+
+
+async def worker(log, on_report):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-c', WORKER, ROOT_DIRPATH, stdout=asyncio.subprocess.PIPE
+    )
+    await report.relay('1', process.stdout, log, on_report)
+    return await process.wait()
+
+
+def test_worker_reports_reach_the_coordinator():
+    aggregate = report.Aggregate(['1'])
+    kinds = []
+
+    def on_report(key, message):
+        kinds.append(message['kind'])
+        aggregate.update(key, message)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        log_filepath = os.path.join(tempdir, 'worker.stdout')
+        with open(log_filepath, 'wb') as log:
+            assert asyncio.run(worker(log, on_report)) == 0
+        with open(log_filepath, 'rb') as rb:
+            logs = rb.read().decode()
+
+    assert 'wrote 19' in logs and report.SENTINEL not in logs, 'logs and reports are split apart'
+    row = aggregate.rows['1']
+    assert kinds[0] == 'step' and kinds[-1] == 'done'
+    assert 'progress' in kinds and 'error' in kinds
+    assert row['bytes'] > 0 and row['errors'] == 1 and row['state'] == 'failed'
+    assert 'write_burnin' in aggregate.table()
+
+
+def test_progress_deltas_count_finished_and_interval_max():
+    seen = {}
+    report.progress_deltas(seen)
+    with watchdog.IOProgress('deltas.dat') as progress:
+        progress.begin('write', 0)
+        progress.latency_max = progress.interval_max = 9.0  # a slow op, before the first interval
+        progress.end(1024)
+        assert report.progress_deltas(seen, interval_max=True)['deltas.dat']['latency_max'] >= 9.0
+        progress.begin('write', 1024)
+        progress.end(4096)
+    # ended and deregistered between two calls
+    target = report.progress_deltas(seen, interval_max=True)['deltas.dat']
+    assert target['bytes'] == 4096 and target['ops'] == 1, 'what it did after the last look still counts'
+    assert target['latency_max'] < 9.0, 'the slowest op of this interval, not ever'
+    assert 'deltas.dat' not in report.progress_deltas(seen), 'and only the once'
+
+
+def test_relay_survives_a_line_over_the_limit():
+    reports = []
+
+    async def relayed(log):
+        # a 3KB line with a 1KB limit, then a report
+        line = b'x' * 3000 + b'\n' + (report.SENTINEL + '{"kind": "done"}\n').encode()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-c', f'import sys; sys.stdout.buffer.write({line!r})',
+            stdout=asyncio.subprocess.PIPE, limit=1024
+        )
+        await report.relay('1', process.stdout, log, lambda key, message: reports.append(message))
+        return await process.wait()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        log_filepath = os.path.join(tempdir, 'worker.stdout')
+        with open(log_filepath, 'wb') as log:
+            assert asyncio.run(relayed(log)) == 0
+        with open(log_filepath, 'rb') as rb:
+            assert rb.read() == b'x' * 3000 + b'\n', 'the long line is in the log, whole'
+    assert [message['kind'] for message in reports] == ['done'], 'and reports after it still arrive'
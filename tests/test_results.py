@@ -0,0 +1,68 @@
+# stdlib imports
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import results  # noqa: E402
+
+
+def test_compare_flags_regression():
+    with tempfile.TemporaryDirectory() as tempdir:
+        results_filepath = os.path.join(tempdir, 'results.sqlite')
+        data_filepath = os.path.join(tempdir, 'data.dat')
+        config = dict(chunk_size=4 * constants.KB, iodepth=32)
+        run_id = results.RUN_ID
+        try:
+            for r, (throughput, p99) in enumerate([(100e6, 500.0), (104e6, 480.0), (98e6, 510.0), (70e6, 900.0)]):
+                results.RUN_ID = f'run{r}'
+                before = ('1', {'Serial Number': 'SERIAL1', 'Model': 'SYNTHETIC', 'Host Writes': f'{r * 10} GB'})
+                after = ('1', dict(before[1], **{'Host Writes': f'{r * 10 + 4} GB'}))
+                results.record(
+                    results_filepath, 'io_workload', data_filepath, config,
+                    dict(throughput=throughput, lat_p99_us=p99), before=before, after=after
+                )
+        finally:
+            results.RUN_ID = run_id
+        df = results.compare(results_filepath=results_filepath)
+        assert len(df) == 1 and df['device'].iloc[0] == 'SERIAL1' and df['runs'].iloc[0] == 4
+        assert df['verdict'].iloc[0] == 'REGRESSED' and round(df['change'].iloc[0], 2) == -0.3
+        df = results.compare(results_filepath=results_filepath, compare_baseline='run2', compare_threshold=0.8)
+        assert df['verdict'].iloc[0] == 'ok', 'under 80% worse than run2, p99 too'
+
+
+def test_recorded_deltas_from_a_poll_during_the_step():
+    with tempfile.TemporaryDirectory() as tempdir:
+        results_filepath = os.path.join(tempdir, 'results.sqlite')
+        data_filepath = os.path.join(tempdir, 'data.dat')
+
+        def poll(host_writes):
+            return {'0': {'datetime': f'2026-10-19 12:00:{host_writes % 60}', 'Drive Letter': tempdir, 'Host Writes': f'{host_writes} GB'}}
+
+        def read_seq(data_filepath='', stop_event=None):
+            # telemetry's first two polls only land once the step is going
+            results.sample(poll(100))
+            results.sample(poll(104))
+
+        def read_rand(data_filepath='', stop_event=None):
+            pass
+
+        latest = dict(results.LATEST)
+        results.LATEST.clear()
+        try:
+            results.recorded(read_seq, dict(data_filepath=data_filepath), results_filepath=results_filepath)
+            results.recorded(read_rand, dict(data_filepath=data_filepath), results_filepath=results_filepath)
+        finally:
+            results.LATEST.clear()
+            results.LATEST.update(latest)
+        with sqlite3.connect(results_filepath) as conn:
+            rows = dict(conn.execute('SELECT step, smart_deltas FROM results').fetchall())
+        assert json.loads(rows['read_seq']) == {'Host Writes': 4.0}, 'against the first poll, not {}'
+        assert json.loads(rows['read_rand']) is None, 'no poll during it, so no deltas rather than none moved'
@@ -0,0 +1,122 @@
+# stdlib imports
+import os
+import sys
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# third party imports
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+# app imports
+import constants  # noqa: E402
+import smart  # noqa: E402
+
+
+def test_split_unit():
+    numeric, unit = smart.split_unit(pd.Series(['1234 GB', 5, None, '400.0 GB (8.4/137.4)', '----']))
+    assert numeric.tolist()[:2] == [1234.0, 5.0]
+    assert np.isnan(numeric[2]) and np.isnan(numeric[4])
+    assert unit.tolist() == ['GB', '', '', 'GB', '']
+    numeric, unit = smart.split_unit(pd.Series([np.nan, None], dtype=object))
+    assert numeric.isna().all() and unit.tolist() == ['', ''], 'a column nobody reports'
+
+
+def test_summarize_crystaldiskinfo_df():
+    df = pd.DataFrame(
+        {
+            'datetime': ['2025-01-01 00:00:00', '2025-01-01 01:00:00', '2025-01-01 00:00:00', '2025-01-01 00:30:00'],
+            'Serial Number': ['A', 'A', 'B', 'B'],
+            'Drive Letter': ['D:', 'D:', 'E:', 'E:'],
+            'Disk Size': ['400.0 GB (8.4/137.4/400.0/400.0)'] * 2 + ['7681.4 GB'] * 2,
+            'Health Status': ['Good (100 %)', 'Caution (90 %)', 'Good (92 %)', 'Good (92 %)'],
+            'Disk Number': [1, 1, 2, 2],
+            'Power On Count': ['205 count'] * 2 + ['91 count'] * 2,
+            'Transfer Mode': ['SATA/600 | SATA/600'] * 2 + ['PCIe 3.0 x4 | PCIe 3.0 x4'] * 2,
+            # lexically "9 GB" > "3600 GB", numerically its not
+            'Host Reads': ['9 GB', '3609 GB', np.nan, np.nan],
+            'Host Writes': ['100 GB', '100 GB', '10 GB', '1810 GB'],
+            'Uncorrectable Error Count': [0, 3, np.nan, np.nan],
+        }
+    )
+    summary = smart.summarize_crystaldiskinfo_df(df).set_index('serial')
+    assert summary.loc['A', 'health'] == 'Caution (90 %)', 'latest health wins'
+    assert summary.loc['A', 'reads'] == '3600.0 GB'
+    assert summary.loc['A', 'read_bw'] == '1.000 GB/s'
+    assert summary.loc['A', 'pcie'] == 'SATA/600'
+    assert summary.loc['A', 'Uncorrectable Error Count (Delta)'] == 3
+    assert summary.loc['B', 'write_bw'] == '1.000 GB/s'
+    assert summary.loc['B', 'read_bw'] == '0.000/s', 'missing reads are not an error'
+    assert summary.loc['B', 'Uncorrectable Error Count (Delta)'] == 0
+
+
+def test_smartctl_recorded():
+    exe = constants.SMARTCTL_EXE
+    constants.SMARTCTL_EXE = os.path.join(ROOT_DIRPATH, 'tests', 'data', 'smartctl', 'smartctl')
+    smart.SMARTCTL_DEVICES.clear()
+    smart.SMARTCTL_NUMBERS.clear()
+    try:
+        smart_data = smart.smartctl()
+        sda, nvme0 = list(smart.SMARTCTL_DEVICES)
+        gone = {'name': '/dev/sdz', 'type': 'sat', 'protocol': 'ATA'}
+        renumbered = smart.smartctl(devices=[gone, nvme0, sda])
+    finally:
+        constants.SMARTCTL_EXE = exe
+        smart.SMARTCTL_DEVICES.clear()
+        smart.SMARTCTL_NUMBERS.clear()
+
+    assert renumbered['0']['Serial Number'] == smart_data['0']['Serial Number'], 'numbers stick to the device'
+    assert renumbered['1']['Serial Number'] == smart_data['1']['Serial Number']
+    assert renumbered['2']['Serial Number'] == '???', 'a failed poll is a placeholder, not a gap'
+    assert renumbered['2']['Health Status'] == 'Unknown'
+    assert renumbered['2']['Disk Size'] == '??? GB', 'always there, telemetry_loop splits it'
+    assert renumbered['2']['Host Reads'] == renumbered['2']['Host Writes'] == -1, 'both, and busted'
+
+    assert list(smart_data) == ['0', '1']
+    for smart_disk in smart_data.values():
+        for key in constants.CRYSTAL_KEYS:
+            if key in ['End to End Error Detection Count', 'Reported Uncorrectable Errors']:
+                continue  # ATA only
+            if key in ['Media and Data Integrity Errors', 'Number of Error Information Log Entries']:
+                continue  # NVMe only
+            if key in ['Uncorrectable Error Count', 'End-to-End Error Detection/Correction Count']:
+                continue  # vendor specific names
+            assert key in smart_disk, f'{key!r} missing from {smart_disk["Model"]}'
+
+    sata, nvme = smart_data['0'], smart_data['1']
+    assert sata['Serial Number'] == 'BTTV2295047P400HGN'
+    assert sata['Disk Size'] == '400.1 GB'
+    assert sata['Transfer Mode'] == '6.0 Gb/s | 6.0 Gb/s'
+    assert sata['Host Writes'] == '29823 GB'
+    assert sata['Reported Uncorrectable Errors'] == 2
+    assert sata['Health Status'] == 'Good'
+    assert nvme['Health Status'] == 'Good (92 %)'
+    assert nvme['Host Writes'] == '29937 GB'
+    assert nvme['Number of Error Information Log Entries'] == 3
+
+    summary = smart.summarize_crystaldiskinfo_df(pd.DataFrame(smart_data.values()))
+    assert len(summary) == 2
+
+
+def test_smartctl_parse_mountpoints():
+    mountpoints = {
+        '/dev/sda1': ['/'],
+        '/dev/sda2': ['/boot'],
+        '/dev/sdaa1': ['/mnt/aa'],
+        '/dev/nvme1n1p1': ['/mnt/nvme'],
+        '/dev/nvme10n1': ['/mnt/nvme10'],
+    }
+    sda = smart.smartctl_parse({'device': {'name': '/dev/sda'}}, mountpoints=mountpoints)
+    assert sda['Drive Letter'] == '/ /boot', 'not /dev/sdaa'
+    nvme = smart.smartctl_parse({'device': {'name': '/dev/nvme1'}}, mountpoints=mountpoints)
+    assert nvme['Drive Letter'] == '/mnt/nvme', 'the controller owns its namespaces, not /dev/nvme10'
+
+
+def test_smartctl_parse_reads_without_writes():
+    data = {'serial_number': 'R', 'ata_smart_attributes': {'table': [{'id': 242, 'raw': {'value': 2 * 10**9}}]}}
+    smart_disk = smart.smartctl_parse(data)
+    assert smart_disk['Host Reads'] == '1024 GB' and smart_disk['Host Writes'] == -1
+    summary = smart.summarize_crystaldiskinfo_df(pd.DataFrame([smart_disk, dict(smart_disk, datetime='2099-01-01 00:00:00.000000')]))
+    assert summary['writes'].iloc[0] == '0.0', 'the drive cant say, so nothing rather than -1s'
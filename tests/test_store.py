@@ -0,0 +1,74 @@
+# stdlib imports
+import os
+import sys
+import datetime
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+from store import RollupStore, TelemetryStore, read_header  # noqa: E402
+
+
+def test_append_only_schema_evolution():
+    with tempfile.TemporaryDirectory() as tempdir:
+        with TelemetryStore(os.path.join(tempdir, 'smart'), flush_rows=2) as store:
+            store.extend([{'a': 1, 'b': 2}, {'a': 3, 'b': 4}, {'a': 5}])
+            first_segment = store.segments()[0]
+            with open(first_segment, 'rb') as rb:
+                before = rb.read()
+            store.append({'a': 6, 'b': 7, 'c': 8})
+
+        segments = store.segments()
+        assert len(segments) == 2, 'a new column starts a new segment'
+        with open(first_segment, 'rb') as rb:
+            assert rb.read().startswith(before), 'written rows are never rewritten'
+        assert read_header(segments[-1]) == ['a', 'b', 'c']
+
+        df = store.read(columns=['a', 'c'])
+        assert df.columns.tolist() == ['a', 'c']
+        assert df['a'].tolist() == [1, 3, 5, 6]
+
+        columns = store.export(os.path.join(tempdir, 'smart.csv'))
+        assert columns == ['a', 'b', 'c']
+
+
+def test_reopen_continues_in_new_segment():
+    with tempfile.TemporaryDirectory() as tempdir:
+        with TelemetryStore(tempdir) as store:
+            store.append({'a': 1})
+        with TelemetryStore(tempdir) as store:
+            store.append({'a': 2})
+        assert len(store.segments()) == 2
+        assert store.read()['a'].tolist() == [1, 2]
+
+
+def test_rollup_tiers_and_retention():
+    start = datetime.datetime(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tempdir:
+        store = RollupStore(tempdir, raw_retention=600, tiers=[(60, 3600), (3600, -1)], segment_rows=10)
+        for second in range(0, 2 * 3600, 3):
+            store.append({
+                'datetime': str(start + datetime.timedelta(seconds=second)),
+                'Serial Number': 'A',
+                'Host Writes': f'{1000 + second} GB',
+                'Health Status': 'Good (100 %)',
+            })
+        store.close()
+
+        raw = store.raw.read()
+        assert len(raw) < 2 * 3600 / 3 / 2, 'old raw segments were pruned'
+        assert raw['Host Writes'].iloc[-1] == '8197 GB'
+
+        hourly = store.tier_stores[3600].read()
+        assert hourly['samples'].tolist() == [1200, 1200]
+        assert hourly['Host Writes (min)'].tolist() == ['1000 GB', '4600 GB']
+        assert hourly['Host Writes (max)'].tolist() == ['4597 GB', '8197 GB']
+        assert hourly['Host Writes (mean)'].iloc[0] == '2798.5 GB'
+        assert len(store.tier_stores[60].read()) < 120, 'old minute buckets were pruned'
+
+        df = store.read(columns=['datetime', 'Serial Number', 'Host Writes'])
+        writes = df['Host Writes'].str.split().str[0].astype(float)
+        assert (writes.min(), writes.max()) == (1000, 8197), 'the whole run survives in the rollups'
@@ -0,0 +1,32 @@
+# stdlib imports
+import os
+import sys
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import system  # noqa: E402
+
+
+def test_cpu_topology_and_sets():
+    with tempfile.TemporaryDirectory() as tempdir:
+        # 2 sockets x 2 cores x 2 threads, linux numbers siblings n and n + cores
+        for cpu in range(8):
+            topology_dirpath = os.path.join(tempdir, f'cpu{cpu}', 'topology')
+            os.makedirs(topology_dirpath)
+            with open(os.path.join(topology_dirpath, 'physical_package_id'), 'w') as w:
+                w.write(f'{(cpu % 4) // 2}\n')
+            with open(os.path.join(topology_dirpath, 'core_id'), 'w') as w:
+                w.write(f'{cpu % 2}\n')
+        os.makedirs(os.path.join(tempdir, 'cpufreq'))  # not a cpu
+        topology = system.cpu_topology(dirpath=tempdir, available=list(range(8)))
+        assert topology == [[0, 4], [1, 5], [2, 6], [3, 7]]
+        assert system.cpu_topology(dirpath=tempdir, available=[0, 1, 4]) == [[0, 4], [1]], 'only allowed cpus'
+
+    assert system.cpu_sets(2, topology=topology) == [[0, 1, 4, 5], [2, 3, 6, 7]], 'siblings and sockets together'
+    assert system.cpu_sets(4, topology=topology) == topology
+    assert system.cpu_sets(6, topology=topology)[4:] == [[0, 4], [1, 5]], 'more workers than cores share'
+    assert system.cpu_sets(0, topology=topology) == []
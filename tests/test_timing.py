@@ -0,0 +1,24 @@
+# stdlib imports
+import os
+import sys
+import time
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import timing  # noqa: E402
+
+
+def test_batched_only_batches_what_the_clock_cant_see():
+    assert timing.OVERHEAD_NS >= 0
+    assert timing.since(timing.ticks()) < 0.001
+
+    per_call, calls = timing.batched(lambda: None, min_batch=0.005)
+    assert calls > 1000, 'a no-op has to be repeated a lot before 5ms goes by'
+    assert 0 <= per_call < 1e-5
+
+    per_call, calls = timing.batched(lambda: time.sleep(0.02), min_batch=0.005)
+    assert calls == 1
+    assert per_call >= 0.019
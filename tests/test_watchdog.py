@@ -0,0 +1,116 @@
+# stdlib imports
+import os
+import sys
+import json
+import tempfile
+import time
+import threading
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import watchdog  # noqa: E402
+
+
+D, E = ('D:', 'E:') if sys.platform == 'win32' else ('/mnt/d', '/mnt/e')
+
+
+def sample(errors=0, health='Good (100 %)'):
+    return {
+        '1': {'Serial Number': 'A', 'Drive Letter': D, 'Health Status': health, 'Uncorrectable Error Count': errors},
+        '2': {'Serial Number': 'B', 'Drive Letter': E, 'Health Status': 'Good (100 %)'},
+    }
+
+
+def test_rule_check():
+    rule = dict(keys=['Uncorrectable Error Count'], delta=2, health=['Caution'], health_percent=50)
+    assert watchdog.rule_check(rule, sample()['1'], sample(errors=1)['1']) is None
+    assert watchdog.rule_check(rule, sample()['1'], sample(errors=2)['1'])['values'] == {
+        'Uncorrectable Error Count': [0, 2]
+    }
+    assert watchdog.rule_check(rule, sample()['1'], sample(health='Caution (90 %)')['1'])
+    assert watchdog.rule_check(rule, sample()['1'], sample(health='Good (49 %)')['1'])
+
+
+def test_default_rules_tolerate_nvme_error_log():
+    rules = {rule['name']: rule for rule in constants.SMART_RULES}
+    baseline = {'Media and Data Integrity Errors': 0, 'Number of Error Information Log Entries': 10}
+    logged = dict(baseline, **{'Number of Error Information Log Entries': 12})
+    assert watchdog.rule_check(rules['errors'], baseline, logged) is None
+    assert watchdog.rule_check(rules['error_log'], baseline, logged) is None, 'a few entries are benign'
+    assert watchdog.rule_check(rules['errors'], baseline, dict(baseline, **{'Media and Data Integrity Errors': 1}))
+
+
+def test_drive_scope_stops_only_that_drive():
+    stop_event, drive_event = threading.Event(), threading.Event()
+    constants.DRIVE_STOP_EVENTS['1'] = drive_event
+    try:
+        with tempfile.TemporaryDirectory() as tempdir:
+            incident_filepath = os.path.join(tempdir, 'incidents.jsonl')
+            smart_watchdog = watchdog.SmartWatchdog(incident_filepath=incident_filepath, stop_event=stop_event)
+            assert smart_watchdog(sample()) == [], 'first sample is the baseline'
+            incidents = smart_watchdog(sample(errors=3))
+            assert smart_watchdog(sample(errors=4)) == [], 'a rule trips once per drive'
+            with open(incident_filepath) as r:
+                recorded = [json.loads(line) for line in r]
+    finally:
+        constants.DRIVE_STOP_EVENTS.pop('1')
+
+    assert [incident['rule'] for incident in incidents] == ['errors']
+    assert recorded[0]['serial'] == 'A' and recorded[0]['stopped'] == 'drive'
+    assert drive_event.is_set() and not stop_event.is_set()
+
+
+def test_unregistered_drive_stops_workload_only_if_it_hosts_it():
+    stop_event = threading.Event()
+    smart_watchdog = watchdog.SmartWatchdog(incident_filepath='', data_filepath=f'{E}/data.dat', stop_event=stop_event)
+    smart_watchdog(sample())
+    assert smart_watchdog(sample(errors=1))[0]['stopped'] == ''
+    assert not stop_event.is_set()
+    assert watchdog.hosting_disk(sample(), f'{D}/data.dat') == '1'
+
+
+def test_io_watchdog_cancels_a_stalled_op():
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=watchdog.io_watchdog,
+        kwargs=dict(stall_seconds=0.2, stall_action='cancel', poll=0.05, stop_event=stop_event),
+    )
+    thread.start()
+    try:
+        with watchdog.IOProgress('hung.dat') as hung, watchdog.IOProgress('fine.dat') as fine:
+            hung.begin('write', 4096)
+            for offset in range(0, 10):
+                fine.begin('write', offset)
+                fine.end(1)
+                time.sleep(0.05)
+            assert hung.stopped(stop_event) and not fine.stopped(stop_event)
+        assert watchdog.PROGRESS == {}
+    finally:
+        stop_event.set()
+        thread.join()
+
+
+def test_io_watchdog_throughput_floor():
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=watchdog.io_watchdog,
+        kwargs=dict(throughput_floor=1e9, floor_window=0.2, stall_action='cancel', poll=0.05, stop_event=stop_event),
+    )
+    thread.start()
+    try:
+        with watchdog.IOProgress('slow.dat') as slow, watchdog.IOProgress('tree/') as metadata:
+            for offset in range(0, 10):
+                slow.begin('read', offset)
+                slow.end(1)
+                metadata.begin('stat', 0)
+                metadata.end(0)
+                time.sleep(0.05)
+            assert slow.stopped(stop_event)
+            assert not metadata.stopped(stop_event), 'ops that move no data arent a collapse'
+    finally:
+        stop_event.set()
+        thread.join()
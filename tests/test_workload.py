@@ -0,0 +1,75 @@
+# stdlib imports
+import os
+import sys
+import tempfile
+
+ROOT_DIRPATH = os.path.dirname(os.path.dirname(__file__))
+
+sys.path.insert(0, ROOT_DIRPATH)
+
+# app imports
+import constants  # noqa: E402
+import workload  # noqa: E402
+
+
+def test_io_workload_one_pass():
+    with tempfile.TemporaryDirectory() as tempdir:
+        data_filepath = os.path.join(tempdir, 'data.dat')
+        for engine in workload.engine_available():
+            for rw in constants.RWS:
+                for access in constants.ACCESSES:
+                    result = workload.io_workload(
+                        data_filepath=data_filepath, size=4 * constants.MB, chunk_size=64 * constants.KB, rw=rw,
+                        access=access, iodepth=3, numjobs=2, engine=engine, no_delete=True
+                    )
+                    assert result['ops'] == 64 and result['bytes'] == 4 * constants.MB, 'every job does its share'
+                    assert 0 < result['lat_p50_us'] <= result['lat_p99_us'] <= result['lat_max_us']
+                    assert os.path.getsize(data_filepath) == 4 * constants.MB
+        workload.io_workload(data_filepath=data_filepath, chunk_size=constants.MB)  # its size, then its gone
+        assert not os.path.exists(data_filepath)
+
+
+def test_suite_grid():
+    with tempfile.TemporaryDirectory() as tempdir:
+        data_filepath = os.path.join(tempdir, 'CDM.dat')
+        df = workload.suite(
+            data_filepath=data_filepath, size=2 * constants.MB, suite_runs=2, suite_duration=0.05, suite_rest=0
+        )
+        assert df['test'].tolist() == [name for name, _, _, _, _ in constants.SUITE_TESTS]
+        assert (df['read'] > 0).all() and (df['write'] > 0).all()
+        assert not os.path.exists(data_filepath)
+
+
+def test_autotune_then_tuned():
+    with tempfile.TemporaryDirectory() as tempdir:
+        data_filepath = os.path.join(tempdir, 'tune.dat')
+        tuned_filepath = os.path.join(tempdir, 'tuned.json')
+        tuning = workload.autotune(
+            data_filepath=data_filepath, size=4 * constants.MB, autotune_trial=0.05,
+            autotune_chunk_sizes=[64 * constants.KB, constants.MB], autotune_iodepths=[1, 2], autotune_numjobs=[1, 2],
+            tuned_filepath=tuned_filepath
+        )
+        assert 1 <= tuning['trials'] <= 8 and tuning['throughput'] > 0
+        assert not os.path.exists(data_filepath)
+        kwargs = dict(data_filepath=os.path.join(tempdir, 'other.dat'), chunk_size=-1, iodepth=1)
+        assert workload.tuned_apply(kwargs, tuned_filepath=tuned_filepath) == tuning, 'same mount, same tuning'
+        assert kwargs['chunk_size'] == tuning['chunk_size'] and kwargs['iodepth'] == tuning['iodepth']
+        assert 'numjobs' not in kwargs, 'only what the step takes'
+
+
+def test_calibrate_ceiling():
+    with tempfile.TemporaryDirectory() as tempdir:
+        calibration_filepath = os.path.join(tempdir, 'calibration.json')
+        df = workload.calibrate(
+            size=constants.MB, calibrate_chunk_sizes=[64 * constants.KB], calibrate_duration=0.05,
+            calibration_filepath=calibration_filepath
+        )
+        assert (df['bytes_per_sec'] > 0).all() and (df['cpu_us_per_op'] > 0).all()
+        assert {'write_burnin', 'write_fulpak', 'read_seq', 'read_rand'} < set(df['key'])
+        ceiling = workload.ceiling(
+            'io_workload', dict(rw='write', access='rand', chunk_size=4 * constants.KB),
+            calibration_filepath=calibration_filepath
+        )
+        assert ceiling['chunk_size'] == 64 * constants.KB, 'the nearest one calibrated'
+        assert ceiling['bytes_per_sec'] == df[df['key'] == ceiling['key']]['bytes_per_sec'].max()
+        assert workload.ceiling('suite', {}, calibration_filepath=calibration_filepath) == {}
@@ -0,0 +1,95 @@
+'''
+Description:
+    one clock for every elapsed and latency the tool measures, time.perf_counter_ns
+    monotonic, the best resolution the platform has, and unlike time.time() it isnt stepped or slewed by NTP
+
+    reading the clock isnt free, OVERHEAD_NS is what a back to back pair of reads costs, measured once at import,
+    and since() takes it back off, otherwise a 4KB op on a fast device is part clock
+    anything shorter than a few clock reads cant be timed one at a time at all, batched repeats it until it can
+    only microbench batches: its ops are the same call over and over, the workloads' are not
+        - a rate over a whole phase/step (filesystem.phase ops_per_sec, iops, throughput) is already one batch,
+            every op in it under the one pair of clock reads
+        - create, mkdir, unlink and rename cant be repeated on the same item, and stat-ing one path over and over
+            only measures the dentry cache, so their per op latencies are timed one at a time, less OVERHEAD_NS
+
+Examples:
+    - elapsed
+        >>> start = ticks(); do_io(); elapsed = since(start)  # seconds
+    - a sub-millisecond op
+        >>> per_call, calls = batched(lambda: os.urandom(4096))
+'''
+# stdlib
+import time
+import statistics
+from typing import Any, Callable, Tuple  # noqa: F401
+
+# app
+import constants
+
+
+def overhead_ns(samples=constants.TIMING_SAMPLES):
+    # type: (int) -> int
+    '''
+    Description:
+        what reading the clock twice in a row costs, the median over samples so a preempted pair doesnt count
+    '''
+    clock = time.perf_counter_ns
+    deltas = []
+    for _ in range(samples):
+        start = clock()
+        deltas.append(clock() - start)
+    return int(statistics.median(deltas))
+
+
+OVERHEAD_NS = overhead_ns()
+RESOLUTION_NS = time.get_clock_info('perf_counter').resolution * 1e9
+
+
+def ticks():
+    # type: () -> int
+    '''
+    Description:
+        now in nanoseconds from an arbitrary point, only good for differences, see since
+    '''
+    return time.perf_counter_ns()
+
+
+def since(start):
+    # type: (int) -> float
+    '''
+    Description:
+        seconds since start = ticks(), less the clock's own overhead, never negative
+    '''
+    return max(time.perf_counter_ns() - start - OVERHEAD_NS, 0) / 1e9
+
+
+def batched(func, min_batch=constants.TIMING_MIN_BATCH, max_calls=constants.TIMING_MAX_CALLS):
+    # type: (Callable[[], Any], float, int) -> Tuple[float, int]
+    '''
+    Description:
+        time func() in batches of calls that grow until one takes at least min_batch seconds, then the
+            per call time of that batch, the clock's resolution and overhead are a rounding error by then
+        ops that take longer than min_batch on their own are called just the once
+
+    Arguments:
+        func: Callable[[], Any]
+        min_batch: float
+            seconds, the shortest batch that counts
+        max_calls: int
+            the most calls in a batch, in case func is so quick it never gets there
+
+    Returns:
+        Tuple[float, int]
+            seconds per call, calls in the batch that counted
+    '''
+    calls = 1
+    while True:
+        start = ticks()
+        for _ in range(calls):
+            func()
+        elapsed = since(start)
+        if elapsed >= min_batch or calls >= max_calls:
+            return elapsed / calls, calls
+        # straight to about enough when the last batch gives an idea, doubling when it was too quick to tell
+        estimate = int(calls * min_batch / elapsed * 1.2) if elapsed > 0 else calls * 2
+        calls = min(max(estimate, calls * 2), max_calls)
@@ -0,0 +1,408 @@
+# stdlib
+import os
+import re
+import json
+import time
+import logging
+import datetime
+import threading
+import collections
+from typing import Deque, Dict, List, Optional, Callable, Tuple, Any  # noqa: F401
+
+# third party
+
+# app
+import constants
+import timing
+from store import leading_number
+
+SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+HEALTH_PERCENT_REGEX = re.compile(r'\((\d+(?:\.\d+)?) ?%\)')
+PROGRESS = {}  # type: Dict[str, IOProgress]
+# the last ones out of PROGRESS, so whatever they did since report.progress_deltas last looked still counts
+FINISHED = collections.deque(maxlen=1024)  # type: Deque[IOProgress]
+
+
+def disk_identity(smart_disk, disk_number=''):
+    # type: (dict, str) -> str
+    # serials survive re-enumeration, disk numbers dont
+    return str(smart_disk.get('Serial Number', '') or disk_number)
+
+
+def hosting_disk(cdi, filepath):
+    # type: (Dict[str, dict], str) -> str
+    '''
+    Description:
+        the disk number whose "Drive Letter" hosts filepath, longest mountpoint wins, '' if none do
+        >>> hosting_disk({'1': {'Drive Letter': 'D:'}}, 'D:/temp/data.dat')  # '1'
+        >>> hosting_disk({'0': {'Drive Letter': '/ /boot'}, '1': {'Drive Letter': '/mnt/a'}}, '/mnt/a/data.dat')  # '1'
+    '''
+    filepath = os.path.abspath(filepath).replace('\\', '/')
+    drive, _ = os.path.splitdrive(filepath)
+    best, best_length = '', -1
+    for disk_number, smart_disk in cdi.items():
+        for mount in str(smart_disk.get('Drive Letter', '') or '').split():
+            if drive:
+                matches = mount.rstrip(':/\\').upper() == drive.rstrip(':').upper()
+            else:
+                matches = filepath == mount or filepath.startswith(mount.rstrip('/') + '/')
+            if matches and len(mount) > best_length:
+                best, best_length = disk_number, len(mount)
+    return best
+
+
+def rule_check(rule, baseline, smart_disk):
+    # type: (dict, dict, dict) -> Optional[dict]
+    '''
+    Description:
+        evaluate one rule against the first (baseline) and latest S.M.A.R.T. of a drive
+
+    Arguments:
+        rule: dict
+            keys: List[str]
+                any of these going up by at least "delta" (default 1) since the baseline trips the rule
+            health: List[str]
+                "Health Status" starting with any of these trips the rule, ex) ["Caution", "Bad"]
+            health_percent: float|int
+                "Health Status" percentage below this trips the rule, ex) "Good (4 %)" < 5
+        baseline: dict
+            the first S.M.A.R.T. seen for the drive
+        smart_disk: dict
+            the latest
+
+    Returns:
+        Optional[dict]
+            None if all is well, else {"reason": str, "values": {key: [baseline, latest]}}
+    '''
+    for key in rule.get('keys', []):
+        before, _ = leading_number(baseline.get(key, None))
+        after, _ = leading_number(smart_disk.get(key, None))
+        if before is None or after is None:
+            continue
+        if after - before >= rule.get('delta', 1):
+            return dict(reason=f'{key!r} went from {before:g} to {after:g}', values={key: [before, after]})
+
+    health = str(smart_disk.get('Health Status', '') or '')
+    for status in rule.get('health', []):
+        if health.startswith(status):
+            values = {'Health Status': [baseline.get('Health Status'), health]}
+            return dict(reason=f'health is {health!r}', values=values)
+    if 'health_percent' in rule:
+        match = HEALTH_PERCENT_REGEX.search(health)
+        if match and float(match.group(1)) < rule['health_percent']:
+            return dict(
+                reason=f'health {health!r} below {rule["health_percent"]} %',
+                values={'Health Status': [baseline.get('Health Status'), health]},
+            )
+    return None
+
+
+class SmartWatchdog(object):
+    '''
+    Description:
+        evaluates rules against every S.M.A.R.T. poll as it arrives (pass it as telemetry on_sample),
+        so a drive that starts throwing errors is stopped in minutes rather than at the end of the run
+        every rule trips at most once per drive, each trip appends an incident to incident_filepath (jsonl)
+        what gets stopped:
+            - scope "all": stop_event, everything
+            - scope "drive": the drive's event in constants.DRIVE_STOP_EVENTS (disk number or serial) if registered,
+                else stop_event if the drive hosts data_filepath (or data_filepath is unknown), else nothing
+
+    Arguments:
+        rules: List[dict]
+            see rule_check, plus "name" and "scope"
+        incident_filepath: str
+            where incidents are appended
+        data_filepath: str
+            default '' (unknown), the file under test
+        stop_event: threading.Event
+            stops the whole workload
+        on_incident: Optional[Callable]
+            called with every incident dict
+    '''
+
+    def __init__(
+        self,
+        rules=constants.SMART_RULES,
+        incident_filepath=constants.INCIDENT_FILEPATH,
+        data_filepath='',
+        stop_event=constants.STOP_EVENT,
+        on_incident=None,
+    ):
+        # type: (List[dict], str, str, threading.Event, Optional[Callable]) -> None
+        self.rules = rules
+        self.incident_filepath = incident_filepath
+        self.data_filepath = data_filepath
+        self.stop_event = stop_event
+        self.on_incident = on_incident
+        self.baselines = {}  # type: Dict[str, dict]
+        self.tripped = set()  # type: set
+        self.incidents = []  # type: List[dict]
+        self.lock = threading.Lock()
+
+    def __call__(self, cdi):
+        # type: (Dict[str, dict]) -> List[dict]
+        return self.evaluate(cdi)
+
+    def evaluate(self, cdi):
+        # type: (Dict[str, dict]) -> List[dict]
+        incidents = []
+        with self.lock:
+            for disk_number, smart_disk in cdi.items():
+                identity = disk_identity(smart_disk, disk_number)
+                if identity not in self.baselines:
+                    self.baselines[identity] = smart_disk
+                    continue
+                for rule in self.rules:
+                    name = rule.get('name', '?')
+                    if (identity, name) in self.tripped:
+                        continue
+                    result = rule_check(rule, self.baselines[identity], smart_disk)
+                    if result is None:
+                        continue
+                    self.tripped.add((identity, name))
+                    incident = dict(
+                        datetime=str(datetime.datetime.now()),
+                        rule=name,
+                        scope=rule.get('scope', 'drive'),
+                        disk_number=disk_number,
+                        serial=smart_disk.get('Serial Number', ''),
+                        model=smart_disk.get('Model', ''),
+                        drive_letter=smart_disk.get('Drive Letter', ''),
+                        **result
+                    )
+                    incident['stopped'] = self.stop(incident, cdi)
+                    incidents.append(incident)
+            self.incidents.extend(incidents)
+        for incident in incidents:
+            self.record(incident)
+        return incidents
+
+    def stop(self, incident, cdi):
+        # type: (dict, Dict[str, dict]) -> str
+        '''
+        Returns:
+            str
+                what was stopped, "all", "drive", or "" if the drive isnt under test
+        '''
+        if incident['scope'] == 'all':
+            self.stop_event.set()
+            return 'all'
+        for key in [incident['disk_number'], incident['serial']]:
+            event = constants.DRIVE_STOP_EVENTS.get(str(key), None)
+            if event is not None:
+                event.set()
+                return 'drive'
+        if not self.data_filepath or hosting_disk(cdi, self.data_filepath) in ('', incident['disk_number']):
+            self.stop_event.set()
+            return 'all'
+        return ''
+
+    def record(self, incident):
+        # type: (dict) -> None
+        logging.critical(
+            'S.M.A.R.T. watchdog %r tripped on disk %s (%s | %s): %s, stopped: %s', incident['rule'],
+            incident['disk_number'], incident['model'], incident['serial'], incident['reason'],
+            incident['stopped'] or 'nothing, not under test'
+        )
+        if self.incident_filepath:
+            os.makedirs(os.path.dirname(os.path.abspath(self.incident_filepath)), exist_ok=True)
+            with open(self.incident_filepath, 'a', encoding='utf-8') as a:
+                a.write(json.dumps(incident, default=str) + '\n')
+        if callable(self.on_incident):
+            self.on_incident(incident)
+
+
+def chain(*callbacks):
+    # type: (Optional[Callable]) -> Optional[Callable]
+    '''
+    Description:
+        one on_sample out of several, Nones are skipped
+    '''
+    callbacks = tuple(callback for callback in callbacks if callable(callback))
+    if not callbacks:
+        return None
+    if len(callbacks) == 1:
+        return callbacks[0]
+
+    def chained(*args, **kwargs):
+        for callback in callbacks:
+            callback(*args, **kwargs)
+
+    return chained
+
+
+class IOProgress(object):
+    '''
+    Description:
+        what a workload is doing to data_filepath right now, cheap enough to update around every single read/write
+        registered in PROGRESS while in use (with statement) so io_watchdog can see ops that never come back
+        >>> with IOProgress(data_filepath) as progress:
+        >>>     progress.begin('write', offset)
+        >>>     bytes_written += progress.end(wb.write(chunk))
+        several threads on the same file each need their own, registered under their own key
+        >>> with IOProgress(data_filepath, key=f'{data_filepath}#{thread}') as progress:
+    '''
+
+    def __init__(self, data_filepath, key=None):
+        # type: (str, Optional[str]) -> None
+        self.data_filepath = data_filepath
+        self.key = key or data_filepath
+        self.op = ''
+        self.offset = 0
+        self.started = 0  # timing.ticks() of the op in flight, 0 if none
+        self.bytes = 0
+        self.ops = 0
+        self.latency = 0.0  # sum, in seconds
+        self.latency_max = 0.0
+        self.interval_max = 0.0  # since the last interval_max_take
+        self.cancel_event = threading.Event()
+
+    def __enter__(self):
+        PROGRESS[self.key] = self
+        return self
+
+    def __exit__(self, *args):
+        if PROGRESS.get(self.key, None) is self:
+            del PROGRESS[self.key]
+            FINISHED.append(self)
+
+    def begin(self, op, offset):
+        # type: (str, int) -> None
+        self.op = op
+        self.offset = offset
+        self.started = timing.ticks()
+
+    def end(self, nbytes):
+        # type: (int) -> int
+        latency = timing.since(self.started)
+        self.bytes += nbytes
+        self.ops += 1
+        self.latency += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+        if latency > self.interval_max:
+            self.interval_max = latency
+        self.started = 0
+        return nbytes
+
+    def interval_max_take(self):
+        # type: () -> float
+        '''
+        Description:
+            the slowest op since the last call, and start over, theres only the one interval so only one caller,
+                report.reporter
+        '''
+        interval_max, self.interval_max = self.interval_max, 0.0
+        return interval_max
+
+    def stopped(self, stop_event):
+        # type: (threading.Event) -> bool
+        return stop_event.is_set() or self.cancel_event.is_set()
+
+
+def io_watchdog(
+    stall_seconds=constants.STALL_SECONDS,
+    throughput_floor=constants.THROUGHPUT_FLOOR,
+    floor_window=constants.FLOOR_WINDOW,
+    stall_action=constants.STALL_ACTION,
+    poll=constants.IO_WATCHDOG_POLL,
+    stop_event=constants.STOP_EVENT,
+):
+    # type: (float|int, int, float|int, str, float|int, threading.Event) -> None
+    '''
+    Description:
+        watch every registered IOProgress for a single op in flight longer than stall_seconds,
+            or throughput over the last floor_window seconds under throughput_floor (unless it was all ops that
+            move no data, like filesystem.metadata's), and then stall_action:
+            - log: just say so, with the op and offset involved
+            - cancel: the current step stops at its next chunk, the flow moves on
+            - abort: set stop_event, and if the op still hasnt returned after another stall_seconds, exit the process
+                with constants.STALL_EXIT_CODE, a read/write stuck in the kernel cant be interrupted any other way
+    '''
+    history = {}  # type: Dict[int, Deque[Tuple[float, int, int]]]
+    flagged = set()  # type: set
+    while not stop_event.wait(poll):
+        now = timing.ticks() / 1e9
+        progresses = list(PROGRESS.values())
+        for key in set(history) - {id(progress) for progress in progresses}:
+            del history[key]
+        for progress in progresses:
+            reason = ''
+            started = progress.started
+            stuck = timing.since(started) if started else 0.0
+            if stuck > stall_seconds:
+                reason = f'{progress.op} at offset {progress.offset} stuck for {stuck:0.1f} sec'
+
+            samples = history.setdefault(id(progress), collections.deque())
+            samples.append((now, progress.bytes, progress.ops))
+            while len(samples) > 1 and now - samples[1][0] >= floor_window:
+                samples.popleft()
+            span = now - samples[0][0]
+            # ops that move no data (mkdir, stat, unlink...) going by are progress, not a collapse
+            metadata_only = progress.bytes == samples[0][1] and progress.ops > samples[0][2]
+            if not reason and throughput_floor > 0 and span >= floor_window and not metadata_only:
+                throughput = (progress.bytes - samples[0][1]) / span
+                if throughput < throughput_floor:
+                    reason = (
+                        f'{progress.op} throughput {throughput / constants.MB:0.3f} MB/s '
+                        f'< {throughput_floor / constants.MB:0.3f} MB/s over {span:0.1f} sec '
+                        f'near offset {progress.offset}'
+                    )
+
+            if not reason:
+                flagged.discard(id(progress))
+                continue
+            if id(progress) in flagged:
+                continue  # once per episode
+            flagged.add(id(progress))
+            logging.error('i/o watchdog: "%s" %s, action: %s', progress.data_filepath, reason, stall_action)
+            if stall_action == 'cancel':
+                progress.cancel_event.set()
+            elif stall_action == 'abort':
+                stop_event.set()
+                if started and not wait_until(lambda: progress.started != started, stall_seconds):
+                    logging.critical('i/o watchdog: "%s" never came back, aborting!', progress.data_filepath)
+                    logging.shutdown()
+                    os._exit(constants.STALL_EXIT_CODE)
+
+
+def wait_until(predicate, timeout, interval=0.1):
+    # type: (Callable[[], bool], float|int, float) -> bool
+    end = time.time() + timeout
+    while time.time() < end:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+def io_watchdog_start(
+    stall_seconds=constants.STALL_SECONDS,
+    throughput_floor=constants.THROUGHPUT_FLOOR,
+    floor_window=constants.FLOOR_WINDOW,
+    stall_action=constants.STALL_ACTION,
+    stop_event=constants.STOP_EVENT,
+):
+    # type: (float|int, int, float|int, str, threading.Event) -> Optional[threading.Thread]
+    '''
+    Description:
+        start io_watchdog in a daemon thread, nothing if both stall_seconds and throughput_floor are -1
+    '''
+    if stall_seconds <= 0 and throughput_floor <= 0:
+        logging.debug('i/o watchdog disabled')
+        return None
+    t = threading.Thread(
+        target=io_watchdog,
+        kwargs=dict(
+            stall_seconds=stall_seconds if stall_seconds > 0 else float('inf'),
+            throughput_floor=throughput_floor,
+            floor_window=floor_window,
+            stall_action=stall_action,
+            stop_event=stop_event,
+        ),
+        name='io-watchdog',
+        daemon=True,
+    )
+    t.start()
+    return t
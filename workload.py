@@ -0,0 +1,782 @@
+'''
+Description:
+    fio style i/o against one file: numjobs jobs, each keeping iodepth reads or writes in flight, on an engine
+    where input_output's workloads verify every byte, these only measure, throughput, iops and latency percentiles
+
+    suite is CrystalDiskMark's default profile built out of them
+    autotune searches chunk_size, iodepth and numjobs for the best of them on a target, --tuned uses what it found
+    calibrate measures the tool's own ceiling, every workload against null/zero devices and tmpfs, see ceiling
+
+Engines:
+    sync: every in flight op has its own unbuffered file object, seek then read/write, works everywhere
+    psync: every job has one file descriptor that its threads os.pread/os.pwrite at their offsets, no seeks, posix
+    auto: the fastest one this platform has
+'''
+# stdlib
+import os
+import json
+import math
+import datetime
+import random
+import logging
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Tuple  # noqa: F401
+
+# app
+import constants as con
+import timing
+from stdlib import bytes_to_size
+from watchdog import IOProgress
+from report import cpu_seconds
+from input_output import create_bytearray, target_capacity, pattern_attach, pattern_share, pattern_unshare
+from input_output import write_burnin, write_fulpak, read_seq, read_rand, Syncer
+
+SCRIPT_DIRPATH = os.path.abspath(os.path.dirname(__file__))
+
+
+def engine_pick(engine=con.ENGINE):
+    # type: (str) -> str
+    if engine == 'auto':
+        return 'psync' if hasattr(os, 'pread') and hasattr(os, 'pwrite') else 'sync'
+    if engine == 'psync' and not hasattr(os, 'pread'):
+        raise ValueError(f'engine {engine!r} is not available on this platform, use one of {engine_available()}!')
+    if engine not in con.ENGINES:
+        raise ValueError(f'engine {engine!r} not in {con.ENGINES}!')
+    return engine
+
+
+def engine_available():
+    # type: () -> List[str]
+    return [engine for engine in con.ENGINES if engine != 'psync' or hasattr(os, 'pread')]
+
+
+def layout(data_filepath, size, chunk_size=con.CHUNK_SIZE, value=con.VALUE, stop_event=con.STOP_EVENT):
+    # type: (str, int, int, int, threading.Event) -> None
+    '''
+    Description:
+        lay a file out to size before reading it, skipped if its already at least that big
+    '''
+    if os.path.isfile(data_filepath) and os.path.getsize(data_filepath) >= size:
+        return
+    logging.info('laying out %s at "%s"...', bytes_to_size(size), data_filepath)
+    chunk = create_bytearray(min(chunk_size, con.MB) if chunk_size > 0 else con.MB, value=value, no_cheat=True)
+    with open(data_filepath, 'wb') as wb:
+        written = 0
+        while written < size and not stop_event.is_set():
+            written += wb.write(chunk[:size - written])
+
+
+def latency_stats(latencies):
+    # type: (List[float]) -> Dict[str, float]
+    import numpy as np
+    if not latencies:
+        return dict(lat_mean_us=0.0, lat_p50_us=0.0, lat_p99_us=0.0, lat_p999_us=0.0, lat_max_us=0.0)
+    arr = np.asarray(latencies) * 1e6  # usec
+    p50, p99, p999 = np.percentile(arr, [50, 99, 99.9])
+    return dict(
+        lat_mean_us=float(arr.mean()),
+        lat_p50_us=float(p50),
+        lat_p99_us=float(p99),
+        lat_p999_us=float(p999),
+        lat_max_us=float(arr.max()),
+    )
+
+
+def io_workload(
+    data_filepath=con.DATA_FILEPATH,
+    size=con.SIZE,
+    value=con.VALUE,
+    chunk_size=con.CHUNK_SIZE,
+    rw=con.RW,
+    access=con.ACCESS,
+    iodepth=con.IODEPTH,
+    numjobs=con.NUMJOBS,
+    engine=con.ENGINE,
+    duration=con.DURATION,
+    no_delete=con.NO_DELETE,
+    in_place=con.IN_PLACE,
+    pattern_name=con.PATTERN_NAME,
+    sync=con.SYNC,
+    sync_every=con.SYNC_EVERY,
+    stop_event=con.STOP_EVENT,
+    **kwargs
+):
+    # type: (str, int, int, int, str, str, int, int, str, float|int, bool, bool, str, str, int, threading.Event, Any) -> Dict[str, Any]  # noqa: E501
+    '''
+    Description:
+        Read or write a file at a queue depth with several jobs, fio style
+
+    Arguments:
+        data_filepath: str
+            the destination of the actual file to be written since we're operating at the OS level
+        size: int
+            -1 for the size of the existing file (or image/device in place), else bytes to span
+        value: int
+            -1 for random, else, [0,255] repeat the same value for all bytes written
+        chunk_size: int
+            default 1MB, bytes per read/write, a.k.a. block size
+        rw: str
+            read or write
+        access: str
+            seq, every job walks its own slice of the file in order
+            rand, every job darts around the whole file
+        iodepth: int
+            default 1, ops each job keeps in flight, one thread each
+        numjobs: int
+            default 1, independent jobs
+        engine: str
+            default auto, see the module docstring
+        duration: float|int
+            -1 for one pass over size, else keep going (wrapping around) for this many seconds
+        no_delete: bool
+            default False, opt out of self-cleanup
+        in_place: bool
+            default False, data_filepath is a file image or block device, never (re)create or remove it
+        pattern_name: str
+            default '', else write from this pattern_share()d pattern rather than making one
+        sync: str
+            default none, writes only, when to make them durable, see input_output.Syncer, every thread syncs its
+                own writes, elapsed includes the time it takes, lat_* doesnt (except dsync, where its the write)
+        sync_every: int
+            default 64MB, bytes between each thread's syncs when sync is bytes
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        Dict[str, Any]
+            config and results, bytes, ops, elapsed, throughput (bytes/s), iops, lat_*_us, sync_elapsed, syncs
+    '''
+    if rw not in con.RWS:
+        raise ValueError(f'rw {rw!r} not in {con.RWS}!')
+    if access not in con.ACCESSES:
+        raise ValueError(f'access {access!r} not in {con.ACCESSES}!')
+    if iodepth < 1 or numjobs < 1:
+        raise ValueError(f'iodepth and numjobs must be positive, provided {iodepth} and {numjobs}!')
+    engine = engine_pick(engine)
+    if size == con.SIZE:
+        if not in_place and not os.path.isfile(data_filepath):
+            raise ValueError('size must be provided unless data_filepath already exists!')
+        size = target_capacity(data_filepath) if in_place else os.path.getsize(data_filepath)
+    chunks = size // chunk_size
+    if chunks < numjobs:
+        raise ValueError(f'size {size} is too small for {numjobs} jobs of {chunk_size} byte chunks!')
+
+    if rw == 'read' and not in_place:
+        layout(data_filepath, size, chunk_size=chunk_size, value=value, stop_event=stop_event)
+    elif rw == 'write' and not in_place and not os.path.isfile(data_filepath):
+        open(data_filepath, 'wb').close()
+    if pattern_name:
+        chunk = pattern_attach(pattern_name, size=chunk_size)
+    else:
+        chunk = memoryview(create_bytearray(chunk_size, value=value))
+
+    logging.info(
+        '%s %s, %s chunks over %s, iodepth=%d, numjobs=%d, engine=%s', access, rw, bytes_to_size(chunk_size),
+        bytes_to_size(size), iodepth, numjobs, engine
+    )
+    sync = sync if rw == 'write' else 'none'
+    flags = (os.O_RDONLY if rw == 'read' else os.O_WRONLY) | getattr(os, 'O_BINARY', 0) | Syncer(sync, sync_every).flags
+    per_job = chunks // numjobs
+    deadline = timing.ticks() + int(duration * 1e9) if duration > 0 else float('inf')
+    latencies = []  # type: List[List[float]]
+    totals = []  # type: List[int]
+    errors = []  # type: List[BaseException]
+    sync_latencies = []  # type: List[float]
+    lock = threading.Lock()
+    preadv = getattr(os, 'preadv', None)  # straight into the buffer, no new bytes per op
+
+    def run(job, depth, counter, fd):
+        # type: (int, int, itertools.count, int) -> None
+        lats = []  # type: List[float]
+        done = 0
+        rng = random.Random(job * iodepth + depth)
+        buffer = bytearray(chunk_size)
+        syncer = Syncer(sync, sync_every)
+        fo = None
+        if engine == 'sync':
+            fo = open(data_filepath, 'rb' if rw == 'read' else 'r+b', buffering=0, opener=syncer.opener)
+        try:
+            with IOProgress(data_filepath, key=f'{data_filepath}#{job}.{depth}') as progress:
+                while not progress.stopped(stop_event):
+                    op = next(counter)
+                    if duration <= 0 and op >= per_job:
+                        break
+                    start = timing.ticks()
+                    if start > deadline:
+                        break
+                    if access == 'seq':
+                        offset = (job * per_job + op % per_job) * chunk_size
+                    else:
+                        offset = rng.randrange(chunks) * chunk_size
+                    progress.begin(rw, offset)
+                    if fo is None:
+                        if rw == 'read':
+                            nbytes = preadv(fd, [buffer], offset) if preadv else len(os.pread(fd, chunk_size, offset))
+                        else:
+                            nbytes = os.pwrite(fd, chunk, offset)
+                    else:
+                        fo.seek(offset)
+                        nbytes = fo.readinto(buffer) if rw == 'read' else fo.write(chunk)
+                    done += progress.end(nbytes)
+                    lats.append(timing.since(start))
+                    syncer.wrote(fd if fo is None else fo, nbytes)
+            syncer.end(fd if fo is None else fo)
+        except BaseException as be:
+            errors.append(be)
+        finally:
+            if fo is not None:
+                fo.close()
+            with lock:
+                latencies.append(lats)
+                totals.append(done)
+                sync_latencies.extend(syncer.latencies)
+
+    fds = [os.open(data_filepath, flags) if engine == 'psync' else -1 for _ in range(numjobs)]
+    threads = [
+        threading.Thread(
+            target=run, args=(job, depth, counter, fds[job]), name=f'io-{job}.{depth}', daemon=True
+        )
+        for job, counter in enumerate(itertools.count() for _ in range(numjobs))
+        for depth in range(iodepth)
+    ]
+    start = timing.ticks()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = timing.since(start)
+        for fd in fds:
+            if fd >= 0:
+                os.close(fd)
+        if not no_delete and not in_place and os.path.isfile(data_filepath):
+            logging.warning('removing data_filepath "%s"', data_filepath)
+            os.remove(data_filepath)
+    if errors:
+        raise errors[0]
+
+    bytes_io = sum(totals)
+    ops = sum(len(lats) for lats in latencies)
+    result = dict(
+        engine=engine,
+        rw=rw,
+        access=access,
+        chunk_size=chunk_size,
+        iodepth=iodepth,
+        numjobs=numjobs,
+        size=size,
+        bytes=bytes_io,
+        ops=ops,
+        elapsed=elapsed,
+        throughput=bytes_io / elapsed if elapsed > 0 else 0.0,
+        iops=ops / elapsed if elapsed > 0 else 0.0,
+        sync=sync,
+        sync_elapsed=sum(sync_latencies),
+        syncs=len(sync_latencies),
+    )
+    result.update(latency_stats([lat for lats in latencies for lat in lats]))
+    logging.info(
+        '%s %s: %s in %0.3f sec, throughput=%s/s, iops=%0.0f, p50=%0.1fus, p99=%0.1fus', access, rw,
+        bytes_to_size(bytes_io), elapsed, bytes_to_size(result['throughput']), result['iops'], result['lat_p50_us'],
+        result['lat_p99_us']
+    )
+    if sync != 'none':
+        logging.info('sync=%s, %d syncs took %0.3f sec across threads', sync, len(sync_latencies), sum(sync_latencies))
+    return result
+
+
+def suite(
+    data_filepath=con.DATA_FILEPATH,
+    size=con.SIZE,
+    value=con.VALUE,
+    engine=con.ENGINE,
+    suite_runs=con.SUITE_RUNS,
+    suite_duration=con.SUITE_DURATION,
+    suite_rest=con.SUITE_REST,
+    no_delete=con.NO_DELETE,
+    in_place=con.IN_PLACE,
+    stop_event=con.STOP_EVENT,
+    **kwargs
+):
+    # type: (str, int, int, str, int, float|int, float|int, bool, bool, threading.Event, Any) -> pd.DataFrame
+    '''
+    Description:
+        CrystalDiskMark's default profile, SEQ1M Q8T1, SEQ1M Q1T1, RND4K Q32T16, RND4K Q1T1, read then write
+
+    Arguments:
+        data_filepath: str
+            the test file, laid out once up front like CrystalDiskMark's
+        size: int
+            -1 for 1GiB (CrystalDiskMark's default), else bytes
+        value: int
+            -1 for random, else, [0,255] repeat the same value for all bytes
+        engine: str
+            default auto, the fastest this platform has
+        suite_runs: int
+            default 5, runs of every test, the best one counts (as CrystalDiskMark does)
+        suite_duration: float|int
+            default 5, seconds per run
+        suite_rest: float|int
+            default 5, seconds to let the drive settle between runs
+        no_delete: bool
+            default False, opt out of self-cleanup
+        in_place: bool
+            default False, data_filepath is a file image or block device, never (re)create or remove it
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        pd.DataFrame
+            one row per test, MB/s (decimal, 1MB = 1000000 bytes, like CrystalDiskMark) and iops for read and write
+    '''
+    import pandas as pd
+    size = con.GB if size == con.SIZE else size
+    if not in_place:
+        layout(data_filepath, size, value=value, stop_event=stop_event)
+    rows = {name: dict(test=name) for name, _, _, _, _ in con.SUITE_TESTS}
+    first = True
+    try:
+        for rw in con.RWS:
+            for name, access, chunk_size, iodepth, numjobs in con.SUITE_TESTS:
+                for run in range(suite_runs):
+                    if stop_event.is_set():
+                        break
+                    if not first and stop_event.wait(suite_rest):
+                        break
+                    first = False
+                    logging.info('%s %s, run %d / %d...', name, rw, run + 1, suite_runs)
+                    result = io_workload(
+                        data_filepath=data_filepath, size=size, value=value, chunk_size=chunk_size, rw=rw,
+                        access=access, iodepth=iodepth, numjobs=numjobs, engine=engine, duration=suite_duration,
+                        no_delete=True, in_place=in_place, stop_event=stop_event,
+                    )
+                    row = rows[name]
+                    if result['throughput'] / 1e6 > row.get(rw, -1.0):
+                        row.update({
+                            rw: result['throughput'] / 1e6,
+                            f'{rw}_iops': result['iops'],
+                            f'{rw}_lat_us': result['lat_mean_us'],
+                        })
+    finally:
+        if not no_delete and not in_place and os.path.isfile(data_filepath):
+            os.remove(data_filepath)
+
+    df = pd.DataFrame(list(rows.values()))
+    grid = pd.DataFrame(
+        {
+            'Read [MB/s]': [f'{row.get("read", float("nan")):0.2f}' for row in rows.values()],
+            'Write [MB/s]': [f'{row.get("write", float("nan")):0.2f}' for row in rows.values()],
+        },
+        index=list(rows),
+    )
+    logging.info('"%s", %s, %s\n%s', data_filepath, bytes_to_size(size), engine_pick(engine), grid.to_string())
+    return df
+
+
+def tuned_key(data_filepath, in_place=con.IN_PLACE):
+    # type: (str, bool) -> str
+    '''
+    Description:
+        what tunings are kept under, the device for in place targets, else the drive or mount data_filepath lives on
+        >>> tuned_key('D:/tmp/data.dat')  # 'D:'
+        >>> tuned_key('/mnt/d/tmp/data.dat')  # '/mnt/d'
+        >>> tuned_key('/dev/sdb', in_place=True)  # '/dev/sdb'
+    '''
+    data_filepath = os.path.abspath(data_filepath)
+    if in_place:
+        return data_filepath
+    drive, _ = os.path.splitdrive(data_filepath)
+    if drive:
+        return drive
+    path = os.path.dirname(data_filepath)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def tuned_load(tuned_filepath=con.TUNED_FILEPATH):
+    # type: (str) -> Dict[str, dict]
+    if not os.path.isfile(tuned_filepath):
+        return {}
+    with open(tuned_filepath, 'r', encoding='utf-8') as r:
+        return json.load(r)
+
+
+def tuned_apply(kwargs, tuned_filepath=con.TUNED_FILEPATH):
+    # type: (Dict[str, Any], str) -> Dict[str, Any]
+    '''
+    Description:
+        overwrite chunk_size, iodepth and numjobs in kwargs (the ones it has) with what autotune found for its target
+        returns the tuning, {} if there isnt one
+    '''
+    data_filepath = kwargs.get('data_filepath', con.DATA_FILEPATH)
+    key = tuned_key(data_filepath, in_place=kwargs.get('in_place', con.IN_PLACE))
+    tuning = tuned_load(tuned_filepath).get(key, {})
+    if not tuning:
+        logging.warning('no tuning for "%s" in "%s", run autotune against it first', key, tuned_filepath)
+        return {}
+    logging.info(
+        'tuned for "%s" on %s (%s %s, %s): chunk_size=%s, iodepth=%d, numjobs=%d', key, tuning['tuned'],
+        tuning['access'], tuning['rw'], tuning['objective'], bytes_to_size(tuning['chunk_size']), tuning['iodepth'],
+        tuning['numjobs']
+    )
+    for field in ['chunk_size', 'iodepth', 'numjobs']:
+        if field in kwargs:
+            kwargs[field] = tuning[field]
+    size = kwargs.get('size', con.SIZE)
+    if 'chunk_size' in kwargs and size > 0 and size % tuning['chunk_size'] != 0:
+        logging.warning(
+            'tuned chunk_size %s does not evenly divide size %s, read_rand will refuse it',
+            bytes_to_size(tuning['chunk_size']), bytes_to_size(size)
+        )
+    return tuning
+
+
+def autotune(
+    data_filepath=con.DATA_FILEPATH,
+    size=con.SIZE,
+    value=con.VALUE,
+    rw=con.RW,
+    access=con.ACCESS,
+    engine=con.ENGINE,
+    autotune_objective=con.AUTOTUNE_OBJECTIVE,
+    autotune_slo=con.AUTOTUNE_SLO,
+    autotune_trial=con.AUTOTUNE_TRIAL,
+    autotune_chunk_sizes=con.AUTOTUNE_CHUNK_SIZES,
+    autotune_iodepths=con.AUTOTUNE_IODEPTHS,
+    autotune_numjobs=con.AUTOTUNE_NUMJOBS,
+    tuned_filepath=con.TUNED_FILEPATH,
+    no_delete=con.NO_DELETE,
+    in_place=con.IN_PLACE,
+    stop_event=con.STOP_EVENT,
+    **kwargs
+):
+    # type: (str, int, int, str, str, str, str, float|int, float|int, List[int], List[int], List[int], str, bool, bool, threading.Event, Any) -> Dict[str, Any]  # noqa: E501
+    '''
+    Description:
+        Search chunk_size, iodepth and numjobs for the best io_workload on a target, save it for --tuned
+        coordinate descent, sweep one of the three with the other two held at the best so far, then the next,
+        until a whole pass changes nothing (or con.AUTOTUNE_PASSES), every config is tried at most once
+
+    Arguments:
+        data_filepath: str
+            the test file, laid out once up front, or the file image or block device if in_place
+        size: int
+            -1 for 1GiB (or the whole image/device in place), else bytes
+        value: int
+            -1 for random, else, [0,255] repeat the same value for all bytes
+        rw: str
+            read or write
+        access: str
+            seq or rand
+        engine: str
+            default auto, the fastest this platform has
+        autotune_objective: str
+            throughput, the most bytes/s
+            iops, the most ops/s
+        autotune_slo: float|int
+            -1 for none, else p99 latency in usec a config must stay under to count, the least bad wins if none do
+        autotune_trial: float|int
+            default 2, seconds every config gets
+        autotune_chunk_sizes: List[int]
+            the chunk_sizes to search
+        autotune_iodepths: List[int]
+            the iodepths to search
+        autotune_numjobs: List[int]
+            the numjobs to search
+        tuned_filepath: str
+            where the result is kept alongside every other target's, see tuned_key
+        no_delete: bool
+            default False, opt out of self-cleanup
+        in_place: bool
+            default False, data_filepath is a file image or block device, never (re)create or remove it
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        Dict[str, Any]
+            the winning io_workload result plus objective, slo and trials
+    '''
+    import pandas as pd
+    if autotune_objective not in con.AUTOTUNE_OBJECTIVES:
+        raise ValueError(f'autotune_objective {autotune_objective!r} not in {con.AUTOTUNE_OBJECTIVES}!')
+    space = dict(
+        chunk_size=sorted(autotune_chunk_sizes), iodepth=sorted(autotune_iodepths), numjobs=sorted(autotune_numjobs)
+    )
+    if not all(space.values()):
+        raise ValueError(f'nothing to search, provided {space}!')
+    if size == con.SIZE:
+        size = target_capacity(data_filepath) if in_place else con.GB
+    if not in_place:
+        layout(data_filepath, size, value=value, stop_event=stop_event)
+
+    def score(result):
+        # type: (Dict[str, Any]) -> Tuple[bool, float]
+        # anything inside the slo beats everything outside it, outside it the lower p99 the better
+        if autotune_slo > 0 and result['lat_p99_us'] > autotune_slo:
+            return False, -result['lat_p99_us']
+        return True, result[autotune_objective]
+
+    trials = {}  # type: Dict[Tuple[int, int, int], Dict[str, Any]]
+
+    def trial(config):
+        # type: (Dict[str, int]) -> Dict[str, Any]
+        key = (config['chunk_size'], config['iodepth'], config['numjobs'])
+        if key not in trials:
+            logging.info(
+                'trial %d, chunk_size=%s, iodepth=%d, numjobs=%d...', len(trials) + 1,
+                bytes_to_size(config['chunk_size']), config['iodepth'], config['numjobs']
+            )
+            trials[key] = io_workload(
+                data_filepath=data_filepath, size=size, value=value, rw=rw, access=access, engine=engine,
+                duration=autotune_trial, no_delete=True, in_place=in_place, stop_event=stop_event, **config
+            )
+        return trials[key]
+
+    # big chunks move bytes, small ones move ops
+    target = con.MB if autotune_objective == 'throughput' else 4 * con.KB
+    best = dict(
+        chunk_size=min(space['chunk_size'], key=lambda chunk_size: abs(chunk_size - target)),
+        iodepth=space['iodepth'][0],
+        numjobs=space['numjobs'][0],
+    )
+    try:
+        best_result = trial(best)
+        for _ in range(con.AUTOTUNE_PASSES):
+            moved = False
+            for field, candidates in space.items():
+                for candidate in candidates:
+                    config = dict(best, **{field: candidate})
+                    if stop_event.is_set() or config == best:
+                        continue
+                    if config['chunk_size'] * config['numjobs'] > size:
+                        logging.debug('skipping %s, %s is too small for it', config, bytes_to_size(size))
+                        continue
+                    result = trial(config)
+                    if score(result) > score(best_result):
+                        best, best_result, moved = config, result, True
+            if not moved or stop_event.is_set():
+                break
+    finally:
+        if not no_delete and not in_place and os.path.isfile(data_filepath):
+            os.remove(data_filepath)
+
+    df = pd.DataFrame(list(trials.values()))
+    df['throughput'] = df['throughput'].apply(lambda throughput: f'{bytes_to_size(throughput)}/s')
+    df['chunk_size'] = df['chunk_size'].apply(bytes_to_size)
+    columns = ['chunk_size', 'iodepth', 'numjobs', 'throughput', 'iops', 'lat_p99_us']
+    logging.info('trials\n%s', df[columns].to_string(index=False))
+    if not score(best_result)[0]:
+        logging.warning('nothing stayed under the p99 slo of %0.1fus, keeping the lowest p99', autotune_slo)
+
+    key = tuned_key(data_filepath, in_place=in_place)
+    tuning = dict(
+        best_result,
+        objective=autotune_objective,
+        slo=autotune_slo,
+        trials=len(trials),
+        tuned=datetime.datetime.now().isoformat(timespec='seconds'),
+    )
+    tuned = tuned_load(tuned_filepath)
+    tuned[key] = tuning
+    os.makedirs(os.path.dirname(os.path.abspath(tuned_filepath)), exist_ok=True)
+    with open(tuned_filepath, 'w', encoding='utf-8') as w:
+        json.dump(tuned, w, indent=2)
+    logging.info(
+        'tuned "%s" for %s: chunk_size=%s, iodepth=%d, numjobs=%d, throughput=%s/s, iops=%0.0f, p99=%0.1fus, '
+        'saved to "%s"', key, autotune_objective, bytes_to_size(best['chunk_size']), best['iodepth'], best['numjobs'],
+        bytes_to_size(best_result['throughput']), best_result['iops'], best_result['lat_p99_us'], tuned_filepath
+    )
+    return tuning
+
+
+def calibration_key(step, engine='', rw='', access=''):
+    # type: (str, str, str, str) -> str
+    '''
+    Description:
+        >>> calibration_key('read_seq')  # 'read_seq'
+        >>> calibration_key('io_workload', 'psync', 'read', 'rand')  # 'io_workload psync read rand'
+    '''
+    return ' '.join(ele for ele in [step, engine, rw, access] if ele)
+
+
+def ceiling(step, config, calibration_filepath=con.CALIBRATION_FILEPATH):
+    # type: (str, Dict[str, Any], str) -> Dict[str, Any]
+    '''
+    Description:
+        the calibrated ceiling of step run with config, at the nearest chunk_size calibrated, {} if never calibrated
+    '''
+    if not calibration_filepath or not os.path.isfile(calibration_filepath):
+        return {}
+    with open(calibration_filepath, 'r', encoding='utf-8') as r:
+        calibration = json.load(r)
+    if step == 'io_workload':
+        key = calibration_key(
+            step, engine_pick(config.get('engine', con.ENGINE)), config.get('rw', con.RW),
+            config.get('access', con.ACCESS)
+        )
+    else:
+        key = calibration_key(step)
+    chunk_size = config.get('chunk_size', con.CHUNK_SIZE)
+    chunks = calibration.get(key, {})
+    if not chunks or chunk_size <= 0:
+        return {}
+    nearest = min(chunks, key=lambda ele: abs(math.log(int(ele) / chunk_size)))
+    return dict(chunks[nearest], key=key, chunk_size=int(nearest))
+
+
+def calibrate_cell(func, kwargs, duration, stop_event=con.STOP_EVENT):
+    # type: (Callable, Dict[str, Any], float|int, threading.Event) -> Dict[str, Any]
+    '''
+    Description:
+        func(**kwargs) over and over for duration seconds, io_workload just the once, it has a duration of its own
+        bytes, ops, elapsed and process cpu seconds
+    '''
+    cpu = cpu_seconds()
+    if func is io_workload:
+        res = func(duration=duration, stop_event=stop_event, **kwargs)
+        return dict(bytes=res['bytes'], ops=res['ops'], elapsed=res['elapsed'], cpu=cpu_seconds() - cpu)
+    cell_stop_event = threading.Event()
+    timer = threading.Timer(duration, cell_stop_event.set)
+    bytes_io = 0
+    start = timing.ticks()
+    timer.start()
+    try:
+        while not cell_stop_event.is_set() and not stop_event.is_set():
+            # (bytes, elapsed or throughput, byte_array)
+            bytes_io += func(stop_event=cell_stop_event, **kwargs)[0]
+    finally:
+        timer.cancel()
+    return dict(
+        bytes=bytes_io,
+        ops=bytes_io // kwargs['chunk_size'],
+        elapsed=timing.since(start),
+        cpu=cpu_seconds() - cpu,
+    )
+
+
+def calibrate(
+    size=con.SIZE,
+    calibrate_chunk_sizes=con.CALIBRATE_CHUNK_SIZES,
+    calibrate_duration=con.CALIBRATE_DURATION,
+    calibration_filepath=con.CALIBRATION_FILEPATH,
+    stop_event=con.STOP_EVENT,
+    **kwargs
+):
+    # type: (int, List[int], float|int, str, threading.Event, Any) -> pd.DataFrame
+    '''
+    Description:
+        Measure the tool's own ceiling, every workload and engine against null/zero devices and tmpfs
+        there the device costs next to nothing, so the best of them is as fast as the tool can go at a chunk_size
+        later results are annotated with their percent of it (see results), near 100% is the tool, not the disk
+        writes go to the null device and tmpfs, reads come from the zero device and tmpfs, one job one deep
+
+    Arguments:
+        size: int
+            -1 for 16MB, else bytes, the pattern, tmpfs gets an image 4x this
+        calibrate_chunk_sizes: List[int]
+            default 4KB 64KB 1MB, every one MUST evenly divide size
+        calibrate_duration: float|int
+            default 2, seconds per workload, engine, device and chunk_size
+        calibration_filepath: str
+            where the ceilings are kept, see ceiling
+        stop_event: threading.Event
+            a way to short circuit exit if stop_event.is_set()
+        **kwargs: varkwarguments
+
+    Returns:
+        pd.DataFrame
+            one row per workload, engine, device and chunk_size, throughput, iops and cpu usec per op
+    '''
+    import pandas as pd
+    size = con.CALIBRATE_SIZE if size == con.SIZE else size
+    for chunk_size in calibrate_chunk_sizes:
+        if size % chunk_size != 0:
+            raise ValueError(f'chunk_size {chunk_size} must evenly divide size {size}!')
+    image = os.path.join(con.TMPFS_DIRPATH, f'calibrate-{os.getpid()}.dat')
+    devices = dict(null=con.NULL_FILEPATH, zero=con.ZERO_FILEPATH, tmpfs=image)
+    # zeros, so reads from the zero device verify like any other, io_workload's made once rather than every cell
+    byte_array = create_bytearray(size, value=0)
+    pattern_name = pattern_share(size=max(calibrate_chunk_sizes), value=0, stop_event=stop_event).name
+    cells = []  # type: List[Tuple[str, Callable, str, Dict[str, Any]]]
+    for func, device in [
+        (write_burnin, 'null'), (write_burnin, 'tmpfs'), (write_fulpak, 'tmpfs'), (read_seq, 'zero'),
+        (read_seq, 'tmpfs'), (read_rand, 'tmpfs')
+    ]:
+        # writes in place, so theres no removing or recreating and fulpak stops at the end of the image
+        in_place = func in (write_burnin, write_fulpak)
+        cells.append((func.__name__, func, device, dict(byte_array=byte_array, no_delete=True, in_place=in_place)))
+    for engine in engine_available():
+        if engine == 'auto':
+            continue
+        for rw in con.RWS:
+            for access in con.ACCESSES:
+                for device in ['null' if rw == 'write' else 'zero', 'tmpfs']:
+                    cells.append((
+                        calibration_key('io_workload', engine, rw, access), io_workload, device,
+                        dict(
+                            size=size, rw=rw, access=access, engine=engine, no_delete=True, in_place=True,
+                            pattern_name=pattern_name
+                        )
+                    ))
+
+    rows = []
+    try:
+        with open(image, 'wb') as wb:
+            for _ in range(4):
+                wb.write(byte_array)
+        for chunk_size in calibrate_chunk_sizes:
+            for c, (key, func, device, cell_kwargs) in enumerate(cells):
+                if stop_event.is_set():
+                    break
+                if not devices[device]:
+                    continue
+                logging.info('calibrating %s on %s at %s chunks...', key, device, bytes_to_size(chunk_size))
+                cell = calibrate_cell(
+                    func, dict(cell_kwargs, data_filepath=devices[device], chunk_size=chunk_size), calibrate_duration,
+                    stop_event=stop_event
+                )
+                rows.append(dict(
+                    key=key,
+                    device=device,
+                    chunk_size=chunk_size,
+                    bytes_per_sec=cell['bytes'] / cell['elapsed'],
+                    iops=cell['ops'] / cell['elapsed'],
+                    cpu_us_per_op=cell['cpu'] / cell['ops'] * 1e6 if cell['ops'] else float('nan'),
+                ))
+    finally:
+        pattern_unshare(pattern_name)
+        if os.path.isfile(image):
+            os.remove(image)
+
+    df = pd.DataFrame(rows, columns=['key', 'device', 'chunk_size', 'bytes_per_sec', 'iops', 'cpu_us_per_op'])
+    calibration = {}  # type: Dict[str, dict]
+    if os.path.isfile(calibration_filepath):
+        with open(calibration_filepath, 'r', encoding='utf-8') as r:
+            calibration = json.load(r)
+    for (key, chunk_size), group in df.groupby(['key', 'chunk_size']):
+        best = group.loc[group['bytes_per_sec'].idxmax()]
+        calibration.setdefault(key, {})[str(chunk_size)] = dict(
+            bytes_per_sec=float(best['bytes_per_sec']),
+            iops=float(best['iops']),
+            cpu_us_per_op=float(best['cpu_us_per_op']),
+            device=best['device'],
+            calibrated=datetime.datetime.now().isoformat(timespec='seconds'),
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(calibration_filepath)), exist_ok=True)
+    with open(calibration_filepath, 'w', encoding='utf-8') as w:
+        json.dump(calibration, w, indent=2)
+
+    if len(df):
+        table = df.copy()
+        table['chunk_size'] = table['chunk_size'].apply(bytes_to_size)
+        table['bytes_per_sec'] = [f'{bytes_to_size(ele)}/s' for ele in df['bytes_per_sec']]
+        table['iops'] = df['iops'].round(0)
+        table['cpu_us_per_op'] = df['cpu_us_per_op'].round(2)
+        logging.info('tool ceilings, saved to "%s"\n%s', calibration_filepath, table.to_string(index=False))
+    return df